@@ -0,0 +1,116 @@
+"""
+Admission control for the expensive part of a request: at most
+max_active requests run it at once, up to max_queue more wait their turn
+(first come, first served) for at most max_wait seconds, and the rest are
+turned away at once with a Retry-After estimate. A burst of uploads then
+costs a bounded amount of memory and waiting instead of piling up.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+
+class Overloaded(Exception):
+    """No slot is free and the queue is full (or the wait timed out); retry after retry_after seconds."""
+    def __init__(self, retry_after):
+        super().__init__(f'Server busy, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('since', 'event', 'admitted')
+
+    def __init__(self):
+        self.since = time.monotonic()
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class Slot:
+    """A place granted by AdmissionLimiter.acquire(); release() it when done (again is a no-op)."""
+    __slots__ = ('limiter', 'waited', 'since', 'released')
+
+    def __init__(self, limiter, waited):
+        self.limiter = limiter
+        self.waited = waited  # seconds spent in the queue
+        self.since = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter._release(time.monotonic() - self.since)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class AdmissionLimiter:
+    """
+    Counting semaphore with a bounded FIFO wait queue. acquire() returns a
+    Slot or raises Overloaded.
+    """
+
+    # Weight of the latest hold time in the running average used for Retry-After
+    SMOOTHING = 0.2
+
+    def __init__(self, max_active, max_queue=0, max_wait=10.0, max_retry_after=60):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_retry_after = max_retry_after
+        self.active = 0
+        self._waiters = deque()
+        self._average_hold = 1.0
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def oldest_wait(self):
+        """Seconds the request at the head of the queue has been waiting (0 with an empty queue)."""
+        with self._lock:
+            return time.monotonic() - self._waiters[0].since if self._waiters else 0.0
+
+    def retry_after(self):
+        """Whole seconds until a slot is likely to be free for a new request."""
+        with self._lock:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self):
+        # Everyone ahead has to go through a slot first
+        estimate = self._average_hold * (len(self._waiters) + 1) / self.max_active
+        return max(1, min(self.max_retry_after, math.ceil(estimate)))
+
+    def acquire(self):
+        with self._lock:
+            if self.active < self.max_active and not self._waiters:
+                self.active += 1
+                return Slot(self, 0.0)
+            if len(self._waiters) >= self.max_queue:
+                raise Overloaded(self._retry_after_locked())
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if not waiter.admitted:
+                self._waiters.remove(waiter)
+                raise Overloaded(self._retry_after_locked())
+        # The releasing request handed its place over; active already counts it
+        return Slot(self, time.monotonic() - waiter.since)
+
+    def _release(self, held):
+        with self._lock:
+            self._average_hold += self.SMOOTHING * (held - self._average_hold)
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.admitted = True
+                waiter.event.set()
+            else:
+                self.active -= 1
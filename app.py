@@ -1,149 +1,636 @@
-from flask import Flask, render_template, request, send_file, jsonify, render_template_string
+from flask import Flask, render_template, request, send_file, send_from_directory, jsonify, render_template_string, make_response, url_for, Response, stream_with_context
+import hashlib
+import io
 import os
 import tempfile
+import zipfile
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from werkzeug.utils import secure_filename
-from generate_html import parse_word_document, generate_html as generate_html_content
-import shutil
+from generate_html import parse_word_document, match_car_images
+from categories import RULES
+from template_service import render_to_string, render_stream, template_version
+from result_cache import ResultCache, make_cache_key
+from jobs import JobManager, JobQueueFull, DONE, FAILED
+from batch import convert_guide
+from minify import minify_html
+from precompress import compress, negotiate, StreamCompressor
+from bulk import plan_bulk_zip, iter_conversions, stream_zip
+import metrics
+from images import ImageOptimizer, HAVE_PILLOW, VARIANT_VERSION
+from warmup import warm_up
+from upload_intake import UploadError, FileField, read_files, validate_docx, validate_archive, read_docx_entry
+from admission import AdmissionLimiter, Overloaded
+from parse_budget import BudgetedParser, ParseBudgetExceeded
 from pathlib import Path
 from datetime import datetime
 
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Per-file limits of the upload form, checked while the body streams in
+app.config['MAX_DOCX_BYTES'] = int(os.environ.get('VPG_MAX_DOCX_BYTES', 10 * 1024 * 1024))
+app.config['MAX_IMAGE_BYTES'] = int(os.environ.get('VPG_MAX_IMAGE_BYTES', 8 * 1024 * 1024))
+app.config['MAX_IMAGES'] = int(os.environ.get('VPG_MAX_IMAGES', 16))
+# Zip bomb guard: total size of the .docx once extracted
+app.config['MAX_DOCX_UNCOMPRESSED_BYTES'] = int(os.environ.get('VPG_MAX_DOCX_UNCOMPRESSED_BYTES',
+                                                               200 * 1024 * 1024))
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+# Rendered guides are cached by content hash (docx bytes + images + template)
+app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('VPG_RESULT_CACHE_ENTRIES', 64))
+app.config['RESULT_CACHE_DIR'] = os.environ.get('VPG_RESULT_CACHE_DIR', '')
+# Larger pages are streamed without being kept, so they never sit whole in memory
+app.config['RESULT_CACHE_MAX_PAGE_CHARS'] = int(os.environ.get('VPG_RESULT_CACHE_MAX_PAGE_CHARS', 4 * 1024 * 1024))
+
+# Background conversions for POST /jobs (an API; the upload page uses /upload).
+# Job state is kept per worker process, see JobManager.
+app.config['JOB_WORKERS'] = int(os.environ.get('VPG_JOB_WORKERS', 2))
+app.config['JOB_MAX_PENDING'] = int(os.environ.get('VPG_JOB_MAX_PENDING', 32))
+app.config['JOB_RESULT_TTL'] = int(os.environ.get('VPG_JOB_RESULT_TTL', 600))  # seconds
+app.config['JOB_MAX_RESULTS'] = int(os.environ.get('VPG_JOB_MAX_RESULTS', 32))  # finished jobs kept
+
+# Worker processes for POST /bulk (created on first use)
+app.config['BULK_WORKERS'] = int(os.environ.get('VPG_BULK_WORKERS', os.cpu_count() or 1))
+# Zip bomb guard for POST /bulk: entries and total extracted size of the ZIP,
+# checked before anything is read. Each .docx in it gets the upload form's checks.
+app.config['MAX_BULK_ENTRIES'] = int(os.environ.get('VPG_MAX_BULK_ENTRIES', 1000))
+app.config['MAX_BULK_UNCOMPRESSED_BYTES'] = int(os.environ.get('VPG_MAX_BULK_UNCOMPRESSED_BYTES',
+                                                               512 * 1024 * 1024))
+
+# Resized WebP/JPEG variants of uploaded car images (needs Pillow). Variants
+# are written to IMAGE_DIR (also served from /images/) and pages link to them
+# under IMAGE_BASE_URL, the place they are published to. Without one, pages
+# keep the original image URLs: a downloaded guide must not depend on this
+# app or its temp dir.
+app.config['IMAGE_DIR'] = os.environ.get('VPG_IMAGE_DIR', os.path.join(tempfile.gettempdir(), 'vpg-images'))
+app.config['IMAGE_BASE_URL'] = os.environ.get('VPG_IMAGE_BASE_URL', '')
+app.config['OPTIMIZE_IMAGES'] = (HAVE_PILLOW and bool(app.config['IMAGE_BASE_URL'])
+                                 and os.environ.get('VPG_OPTIMIZE_IMAGES', '1') != '0')
+app.config['IMAGE_WORKERS'] = int(os.environ.get('VPG_IMAGE_WORKERS', 4))
+
+# Convert a built-in sample guide at import time so the first request doesn't
+# pay for it. With gunicorn's preload_app (see gunicorn_config.py) this runs
+# once in the master and the workers inherit the warm state.
+app.config['WARM_UP'] = os.environ.get('VPG_WARM_UP', '1') != '0'
+
+# Optional post-render stage: minified pages, and gzip/Brotli responses picked
+# from Accept-Encoding. Pages are compressed as they render and stream out; a
+# page is compressed once per encoding and the compressed bytes are kept in
+# encoded_cache, next to the render in result_cache.
+app.config['MINIFY_HTML'] = os.environ.get('VPG_MINIFY_HTML', '0') == '1'
+app.config['COMPRESS_HTML'] = os.environ.get('VPG_COMPRESS_HTML', '1') != '0'
+app.config['ENCODED_CACHE_ENTRIES'] = int(os.environ.get('VPG_ENCODED_CACHE_ENTRIES', 128))
+
+# Admission control for /upload: at most UPLOAD_CONCURRENCY uploads are parsed
+# and rendered at once per worker, up to UPLOAD_QUEUE more wait for a slot (for
+# at most UPLOAD_QUEUE_TIMEOUT seconds) and the rest get 503 with Retry-After.
+# UPLOAD_CONCURRENCY=0 turns the limit off.
+app.config['UPLOAD_CONCURRENCY'] = int(os.environ.get('VPG_UPLOAD_CONCURRENCY', 2))
+app.config['UPLOAD_QUEUE'] = int(os.environ.get('VPG_UPLOAD_QUEUE', 8))
+app.config['UPLOAD_QUEUE_TIMEOUT'] = float(os.environ.get('VPG_UPLOAD_QUEUE_TIMEOUT', 10))
+# Parse budget: uploads are parsed in worker processes (see parse_budget.py),
+# and a document that takes longer than PARSE_TIMEOUT seconds or more than
+# PARSE_MEMORY_MB MB is rejected with a 422 instead of stalling the worker.
+# PARSE_TIMEOUT=0 parses in the request thread with no budget; PARSE_MEMORY_MB=0
+# sets no memory limit. One parse process per upload slot and job worker.
+app.config['PARSE_TIMEOUT'] = float(os.environ.get('VPG_PARSE_TIMEOUT', 30))
+app.config['PARSE_MEMORY_MB'] = int(os.environ.get('VPG_PARSE_MEMORY_MB', 1024))
+app.config['PARSE_WORKERS'] = int(os.environ.get('VPG_PARSE_WORKERS',
+                                                 max(1, app.config['UPLOAD_CONCURRENCY']) + app.config['JOB_WORKERS']))
+
+# Identical uploads wait for the one already converting the page, at most as
+# long as its parse may take; after that they convert it themselves
+result_cache = ResultCache(max_entries=app.config['RESULT_CACHE_ENTRIES'],
+                           disk_dir=app.config['RESULT_CACHE_DIR'],
+                           wait_timeout=app.config['PARSE_TIMEOUT'] or None,
+                           max_entry_chars=app.config['RESULT_CACHE_MAX_PAGE_CHARS'])
+encoded_cache = ResultCache(max_entries=app.config['ENCODED_CACHE_ENTRIES'], max_chars=32 * 1024 * 1024,
+                            wait_timeout=app.config['PARSE_TIMEOUT'] or None,
+                            max_entry_chars=app.config['RESULT_CACHE_MAX_PAGE_CHARS'])
+job_manager = JobManager(workers=app.config['JOB_WORKERS'],
+                         max_pending=app.config['JOB_MAX_PENDING'],
+                         result_ttl=app.config['JOB_RESULT_TTL'],
+                         max_results=app.config['JOB_MAX_RESULTS'])
+upload_limiter = (AdmissionLimiter(app.config['UPLOAD_CONCURRENCY'], app.config['UPLOAD_QUEUE'],
+                                   app.config['UPLOAD_QUEUE_TIMEOUT'])
+                  if app.config['UPLOAD_CONCURRENCY'] > 0 else None)
+budgeted_parser = (BudgetedParser(app.config['PARSE_WORKERS'], app.config['PARSE_TIMEOUT'],
+                                  app.config['PARSE_MEMORY_MB'], warm_up=app.config['WARM_UP'])
+                   if app.config['PARSE_TIMEOUT'] > 0 else None)
+if upload_limiter is not None:
+    metrics.UPLOADS_ACTIVE.set_function(lambda: upload_limiter.active)
+    metrics.UPLOAD_QUEUE_DEPTH.set_function(lambda: upload_limiter.waiting)
+    metrics.UPLOAD_OLDEST_WAIT.set_function(upload_limiter.oldest_wait)
+image_optimizer = (ImageOptimizer(app.config['IMAGE_DIR'], app.config['IMAGE_BASE_URL'],
+                                  workers=app.config['IMAGE_WORKERS'])
+                   if app.config['OPTIMIZE_IMAGES'] else None)
 
 ALLOWED_EXTENSIONS = {'docx'}
+ALLOWED_ARCHIVE_EXTENSIONS = {'zip'}
 ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
 
+VIEW_KEYWORDS = {
+    'front': ['front', 'fron', 'fro'],
+    'side': ['side', 'sid'],
+    'rear': ['rear', 'rea'],
+    'quarter': ['quarter', 'quattr', 'quater', 'quar', 'qua']
+}
+
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def detect_image_views(filenames):
+    """
+    Assign image filenames to car views from keywords in the filename.
+    Images without a keyword fill the first free view.
+    Returns a dict of view -> secure filename.
+    """
+    image_paths = {}
+    for filename in filenames:
+        # Detect view type from filename
+        filename_lower = filename.lower()
+        detected_view = None
+        
+        for view, keywords in VIEW_KEYWORDS.items():
+            if any(keyword in filename_lower for keyword in keywords):
+                detected_view = view
+                break
+        
+        # If no view detected, assign to first available slot
+        if not detected_view:
+            for view in ['front', 'side', 'rear', 'quarter']:
+                if view not in image_paths:
+                    detected_view = view
+                    break
+        
+        if detected_view and detected_view not in image_paths:
+            # Keep the original filename
+            image_paths[detected_view] = secure_filename(filename)
+    return image_paths
+
 @app.route('/')
 def index():
     return render_template('upload.html')
 
+def car_images_for(filenames):
+    """Build the view -> image URL map for a set of uploaded image filenames."""
+    # Detect view type from image filenames; only the names are used
+    image_paths = detect_image_views(filenames)
+    
+    # Same matching find_car_images() does on the saved 'Car images' folder
+    car_images = match_car_images(list(image_paths.values()))
+    
+    # Override car_images with uploaded images using the same URL pattern as generate_html.py
+    for view, filename in image_paths.items():
+        if filename:
+            car_images[view] = f'https://admin.Newparts.com/var/theme/images/{filename}'
+    return car_images
+
+def upload_fields():
+    """Rules for the file fields of the upload form."""
+    return {
+        'docx_file': FileField(frozenset(ALLOWED_EXTENSIONS), app.config['MAX_DOCX_BYTES'], 1, 'Document file',
+                               'Invalid document file. Only .docx files are allowed'),
+        'car_images': FileField(frozenset(ALLOWED_IMAGE_EXTENSIONS), app.config['MAX_IMAGE_BYTES'],
+                                app.config['MAX_IMAGES'], 'Car image',
+                                'Invalid image file: {filename}. Only .jpg, .jpeg, .png files are allowed'),
+    }
+
+def read_upload():
+    """
+    Validate the .docx + car images form of the current request.
+    Returns (docx_bytes, image_files) or raises UploadError; image_files is
+    a list of (filename, image_bytes) for upload_images().
+    """
+    # The body is parsed as it arrives: wrong file types and oversized files
+    # are rejected before the rest of the upload is read
+    files = read_files(request, upload_fields())
+    
+    # Check if files are present
+    if 'docx_file' not in files:
+        raise UploadError('No document file provided')
+    
+    docx_file = files['docx_file']
+    
+    if docx_file.filename == '':
+        raise UploadError('No document file selected')
+    
+    # Get car images (multiple files from single input)
+    car_images_files = files.getlist('car_images')
+    
+    # Validate at least some images are provided
+    if not car_images_files or len(car_images_files) == 0:
+        raise UploadError('Please provide at least one car image')
+    
+    # Everything below runs in memory: no temp dirs, no os.chdir, so the
+    # handler is safe to run from several threads per worker
+    docx_bytes = docx_file.read()
+    
+    # Catch corrupt documents and zip bombs before anything parses them
+    validate_docx(docx_bytes, app.config['MAX_DOCX_UNCOMPRESSED_BYTES'])
+    
+    image_files = [(img_file.filename, img_file.read()) for img_file in car_images_files
+                   if img_file and img_file.filename != '']
+    
+    return docx_bytes, image_files
+
+def upload_images(image_files):
+    """
+    The view -> image URL map of the uploaded images, and the images
+    themselves as an UploadedImages (None when image optimization is off).
+    Needs no request, so jobs run it in the background.
+    """
+    with metrics.stage('images'):
+        car_images = car_images_for([filename for filename, _ in image_files])
+    images = UploadedImages(car_images, image_files) if image_optimizer is not None else None
+    return car_images, images
+
+class UploadedImages:
+    """
+    The uploaded image used for each view, kept as bytes until a page needs
+    its optimized variants: a cached page never runs the optimizer.
+    """
+
+    def __init__(self, car_images, image_files):
+        files_by_name = {secure_filename(filename): image_bytes for filename, image_bytes in image_files}
+        self.images = {}
+        for view, url in car_images.items():
+            filename = url.rsplit('/', 1)[-1] if url else ''
+            if filename in files_by_name:
+                self.images[view] = (filename, files_by_name[filename])
+
+    def cache_key(self):
+        """Everything the variants depend on, for make_cache_key()."""
+        return {'base_url': image_optimizer.base_url, 'version': VARIANT_VERSION,
+                'views': {view: [filename, hashlib.sha256(image_bytes).hexdigest()]
+                          for view, (filename, image_bytes) in self.images.items()}}
+
+    def variants(self):
+        """Build resized variants of the image used for each view (one pool task per view)."""
+        if not self.images:
+            return {}
+        with metrics.stage('optimize'):
+            return image_optimizer.optimize(self.images)
+
+def render_version():
+    """Template and category rules versions plus the output options, for cache keys."""
+    version = f'{template_version()}+rules:{RULES.version}'
+    return version + ('+minify' if app.config['MINIFY_HTML'] else '')
+
+def upload_cache_key(docx_bytes, car_images, images):
+    """Same document + images + template always renders the same page."""
+    return make_cache_key(docx_bytes, car_images, render_version(), images.cache_key() if images else None)
+
+def parse_guide(docx_bytes, car_images, images):
+    """Parse an uploaded guide and attach the optimized image variants for the template."""
+    if budgeted_parser is None:
+        data = parse_word_document(io.BytesIO(docx_bytes), car_images=car_images)
+    else:
+        try:
+            data = budgeted_parser.parse(docx_bytes, car_images=car_images)
+        except ParseBudgetExceeded as e:
+            if metrics.ENABLED:
+                metrics.PARSE_BUDGET_EXCEEDED.inc(e.reason)
+            raise UploadError(str(e), 422) from e
+    if metrics.ENABLED:
+        metrics.DOCUMENT_ISSUES.observe(data.issue_count)
+    image_variants = images.variants() if images is not None else None
+    if image_variants:
+        data.car_image_variants = image_variants
+    return data
+
+def render_guide(docx_bytes, car_images, images, cache_key):
+    """Parse and render a guide, sharing the work through result_cache."""
+    def render():
+        # Parse document
+        data = parse_guide(docx_bytes, car_images, images)
+        # Generate HTML straight into the response
+        with metrics.stage('render'):
+            html = render_to_string(data)
+        if app.config['MINIFY_HTML']:
+            with metrics.stage('minify'):
+                html = minify_html(html)
+        return html
+    
+    # Identical concurrent uploads share a single parse + render
+    return result_cache.get_or_compute(cache_key, render)
+
+def encoded_guide(docx_bytes, car_images, images, cache_key, encoding):
+    """
+    The rendered page as bytes, compressed with encoding (None for no
+    compression). Compressed pages are cached, so each rendered page is
+    compressed once per encoding.
+    """
+    if encoding is None:
+        return render_guide(docx_bytes, car_images, images, cache_key).encode('utf-8')
+    def encode():
+        html = render_guide(docx_bytes, car_images, images, cache_key)
+        with metrics.stage('compress'):
+            return compress(html.encode('utf-8'), encoding)
+    return encoded_cache.get_or_compute(f'{cache_key}-{encoding}', encode)
+
+def cached_guide(cache_key, encoding):
+    """The page as bytes in encoding (None for none) if it is cached that way, else None."""
+    if encoding is None:
+        html = result_cache.get(cache_key)
+        return html.encode('utf-8') if html is not None else None
+    return encoded_cache.get(f'{cache_key}-{encoding}')
+
+def stream_guide(docx_bytes, car_images, images, cache_key, encoding=None):
+    """
+    Like render_guide() but yields the page in chunks as the template
+    renders, compressed with encoding into bytes if one is given. The first
+    chunk is produced before returning, so parse errors are raised here
+    rather than in the middle of the response.
+    """
+    def render():
+        data = parse_guide(docx_bytes, car_images, images)
+        yield from metrics.timed(render_stream(data), 'render')
+    
+    def encode():
+        # One pass renders, compresses and fills both caches; every rendered
+        # chunk is flushed so the client gets it without waiting for the rest
+        compressor = StreamCompressor(encoding)
+        compress_stage = metrics.stage('compress')
+        for html in result_cache.get_or_stream(cache_key, render):
+            with compress_stage:
+                data = compressor.compress(html.encode('utf-8')) + compressor.flush()
+            yield data
+        with compress_stage:
+            data = compressor.finish()
+        yield data
+    
+    if encoding is None:
+        chunks = result_cache.get_or_stream(cache_key, render)
+    else:
+        chunks = encoded_cache.get_or_stream(f'{cache_key}-{encoding}', encode)
+    first = next(chunks, '' if encoding is None else b'')
+    
+    def stream():
+        yield first
+        yield from chunks
+    return stream()
+
+class _NoSlot:
+    def release(self):
+        pass
+
+def upload_slot():
+    """
+    Wait for a parse/render slot of upload_limiter (see UPLOAD_CONCURRENCY).
+    Raises Overloaded when the wait queue is full or the wait times out.
+    """
+    if upload_limiter is None:
+        return _NoSlot()
+    slot = upload_limiter.acquire()
+    if metrics.ENABLED:
+        metrics.UPLOAD_WAIT_SECONDS.observe(slot.waited)
+    return slot
+
+def finish_stream(chunks, timer, endpoint, slot=None):
+    """Pass chunks through, then record the request metrics (and free the slot) once the body is sent."""
+    try:
+        yield from chunks
+    except Exception:
+        metrics.ERRORS.inc(endpoint, 'stream')
+        raise
+    finally:
+        if slot is not None:
+            slot.release()
+        timer.observe(endpoint)
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    # Stage timings go to the Server-Timing header and /metrics. Rendering is
+    # streamed after the headers are sent, so it only shows up in /metrics.
+    timer = metrics.start_timer()
     try:
-        # Check if files are present
-        if 'docx_file' not in request.files:
-            return jsonify({'error': 'No document file provided'}), 400
-        
-        docx_file = request.files['docx_file']
-        
-        if docx_file.filename == '':
-            return jsonify({'error': 'No document file selected'}), 400
-        
-        if not allowed_file(docx_file.filename, ALLOWED_EXTENSIONS):
-            return jsonify({'error': 'Invalid document file. Only .docx files are allowed'}), 400
-        
-        # Get car images (multiple files from single input)
-        car_images_files = request.files.getlist('car_images')
+        with metrics.stage('upload'):
+            docx_bytes, image_files = read_upload()
+            car_images, images = upload_images(image_files)
+        if metrics.ENABLED:
+            metrics.DOCUMENT_BYTES.observe(len(docx_bytes))
         
-        # Validate at least some images are provided
-        if not car_images_files or len(car_images_files) == 0:
-            return jsonify({'error': 'Please provide at least one car image'}), 400
+        cache_key = upload_cache_key(docx_bytes, car_images, images)
+        # Each encoding of the page is its own representation with its own ETag
+        encoding = negotiate(request.accept_encodings) if app.config['COMPRESS_HTML'] else None
+        etag = cache_key if encoding is None else f'{cache_key}-{encoding}'
+        headers = {'Vary': 'Accept-Encoding'} if app.config['COMPRESS_HTML'] else {}
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304, headers)
+            response.set_etag(etag)
+            timer.observe('upload')
+            return response
         
-        # Validate image file types
-        for img_file in car_images_files:
-            if img_file and img_file.filename != '':
-                if not allowed_file(img_file.filename, ALLOWED_IMAGE_EXTENSIONS):
-                    return jsonify({'error': f'Invalid image file: {img_file.filename}. Only .jpg, .jpeg, .png files are allowed'}), 400
-        
-        # Create temporary directory for processing
-        temp_dir = tempfile.mkdtemp()
-        car_images_dir = os.path.join(temp_dir, 'Car images')
-        os.makedirs(car_images_dir, exist_ok=True)
-        
-        try:
-            # Save docx file
-            docx_filename = secure_filename(docx_file.filename)
-            docx_path = os.path.join(temp_dir, docx_filename)
-            docx_file.save(docx_path)
-            
-            # Validate file integrity
-
-            
-            # Save car images with proper naming
-            # Try to detect view type from filename
-            view_keywords = {
-                'front': ['front', 'fron', 'fro'],
-                'side': ['side', 'sid'],
-                'rear': ['rear', 'rea'],
-                'quarter': ['quarter', 'quattr', 'quater', 'quar', 'qua']
-            }
-            
-            image_paths = {}
-            for img_file in car_images_files:
-                if img_file and img_file.filename != '':
-                    # Detect view type from filename
-                    filename_lower = img_file.filename.lower()
-                    detected_view = None
-                    
-                    for view, keywords in view_keywords.items():
-                        if any(keyword in filename_lower for keyword in keywords):
-                            detected_view = view
-                            break
-                    
-                    # If no view detected, assign to first available slot
-                    if not detected_view:
-                        for view in ['front', 'side', 'rear', 'quarter']:
-                            if view not in image_paths:
-                                detected_view = view
-                                break
-                    
-                    if detected_view and detected_view not in image_paths:
-                        # Keep the original filename
-                        original_filename = secure_filename(img_file.filename)
-                        img_path = os.path.join(car_images_dir, original_filename)
-                        img_file.save(img_path)
-                        image_paths[detected_view] = original_filename
-            
-            # Change to temp directory for processing
-            original_dir = os.getcwd()
-            os.chdir(temp_dir)
-            
-            try:
-                # Parse document
-                data = parse_word_document(docx_path)
-                
-                # Override car_images with uploaded images using the same URL pattern as generate_html.py
-                for view, filename in image_paths.items():
-                    if filename:
-                        # Use the same URL structure as in generate_html.py
-                        data['car_images'][view] = f'https://admin.Newparts.com/var/theme/images/{filename}'
-                
-                # Generate HTML
-                template_path = os.path.join(original_dir, 'template.html')
-                output_path = os.path.join(temp_dir, 'output.html')
-                generate_html_content(data, template_path, output_path)
-                
-                # Read the generated HTML
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                
-                # Return HTML content directly instead of downloading
-                return html_content, 200, {'Content-Type': 'text/html; charset=utf-8'}
-                
-            finally:
-                os.chdir(original_dir)
-                # Cleanup temp directory
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
-                
-        except Exception as inner_e:
-            # Cleanup on inner exception
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        # A page already in the cache needs no parse, so it doesn't wait for a slot
+        body = cached_guide(cache_key, encoding)
+        if body is not None:
+            response = Response(body, 200, {'Content-Type': 'text/html; charset=utf-8', **headers})
+            timer.observe('upload')
+        else:
+            # Parsing and rendering hold a slot; a streamed page keeps it until it is sent
+            with metrics.stage('queue'):
+                slot = upload_slot()
             try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
-            raise inner_e
+                if not app.config['MINIFY_HTML']:
+                    # Send the page as it renders instead of building it in memory first
+                    html_chunks = stream_guide(docx_bytes, car_images, images, cache_key, encoding)
+                    response = Response(stream_with_context(finish_stream(html_chunks, timer, 'upload', slot)),
+                                        200, {'Content-Type': 'text/html; charset=utf-8', **headers})
+                    # In case the server closes the response without reading it
+                    response.call_on_close(slot.release)
+                else:
+                    # Minifying needs the whole page
+                    body = encoded_guide(docx_bytes, car_images, images, cache_key, encoding)
+                    slot.release()
+                    response = Response(body, 200, {'Content-Type': 'text/html; charset=utf-8', **headers})
+                    timer.observe('upload')
+            except BaseException:
+                slot.release()
+                raise
+        response.set_etag(etag)
+        if metrics.ENABLED:
+            response.headers['Server-Timing'] = timer.server_timing()
+        return response
+    except UploadError as e:
+        metrics.ERRORS.inc('upload', str(e.status))
+        timer.observe('upload')
+        return jsonify({'error': str(e)}), e.status
+    except Overloaded as e:
+        metrics.ERRORS.inc('upload', '503')
+        timer.observe('upload')
+        return (jsonify({'error': 'Too many conversions in progress, please retry shortly'}), 503,
+                {'Retry-After': str(e.retry_after)})
 # /* ========================= GALLERY (BASE) ========================= */
     except Exception as e:
+        metrics.ERRORS.inc('upload', '500')
+        timer.observe('upload')
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+    finally:
+        metrics.stop_timer()
+
+@app.route('/images/<path:filename>', methods=['GET'])
+def optimized_image(filename):
+    """Serve the optimized image variants referenced by generated pages."""
+    if image_optimizer is None:
+        return jsonify({'error': 'Image optimization is disabled'}), 404
+    return send_from_directory(app.config['IMAGE_DIR'], filename, max_age=31536000)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process."""
+    if not metrics.ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return metrics.expose(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+_bulk_executor = None
+
+def get_bulk_executor():
+    """Process pool for bulk conversions, started on first use."""
+    global _bulk_executor
+    if _bulk_executor is None:
+        # spawn: forking a threaded server process is not safe
+        _bulk_executor = ProcessPoolExecutor(max_workers=app.config['BULK_WORKERS'],
+                                             mp_context=multiprocessing.get_context('spawn'))
+    return _bulk_executor
+
+@app.route('/bulk', methods=['POST'])
+def bulk_upload():
+    """
+    Convert a ZIP of guides (each .docx with its car images in the same
+    folder or a subfolder) and stream back a ZIP of HTML plus manifest.json.
+    """
+    zip_file = request.files.get('zip_file')
+    if zip_file is None or zip_file.filename == '':
+        return jsonify({'error': 'No ZIP file provided'}), 400
+    if not allowed_file(zip_file.filename, ALLOWED_ARCHIVE_EXTENSIONS):
+        return jsonify({'error': 'Invalid archive. Only .zip files are allowed'}), 400
+    try:
+        zf = zipfile.ZipFile(zip_file.stream)
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'The uploaded file is not a valid ZIP archive'}), 400
+    try:
+        validate_archive(zf, app.config['MAX_BULK_ENTRIES'], app.config['MAX_BULK_UNCOMPRESSED_BYTES'])
+    except UploadError as e:
+        zf.close()
+        return jsonify({'error': str(e)}), e.status
+    
+    plan = plan_bulk_zip(zf)
+    if not plan:
+        return jsonify({'error': 'No .docx files found in the ZIP archive'}), 400
+    
+    executor = get_bulk_executor()
+    version = render_version()
+    minify = app.config['MINIFY_HTML']
+    
+    def submit(docx_bytes, car_images):
+        # Guides rendered before come straight from the result cache
+        cache_key = make_cache_key(docx_bytes, car_images, version)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            future = Future()
+            future.set_result((cached, {}))
+            return future
+        def store(done):
+            if done.exception() is None:
+                result_cache.put(cache_key, done.result()[0])
+        future = executor.submit(convert_guide, docx_bytes, car_images, None, minify)
+        future.add_done_callback(store)
+        return future
+    
+    def read_docx(zf, name):
+        # The same limits as a .docx sent to /upload
+        return read_docx_entry(zf, name, app.config['MAX_DOCX_BYTES'], app.config['MAX_DOCX_UNCOMPRESSED_BYTES'])
+    
+    conversions = iter_conversions(zf, plan, car_images_for, submit,
+                                   window=2 * app.config['BULK_WORKERS'], read_docx=read_docx)
+    
+    def generate():
+        try:
+            yield from stream_zip(conversions)
+        finally:
+            zf.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=vehicle_guides.zip'})
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a conversion of the /upload form and return its job id right away.
+    The request only reads and checks the form; matching and optimizing the
+    images is part of the job.
+    """
+    try:
+        docx_bytes, image_files = read_upload()
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    def convert():
+        car_images, images = upload_images(image_files)
+        return render_guide(docx_bytes, car_images, images, upload_cache_key(docx_bytes, car_images, images))
+    
+    try:
+        job_id = job_manager.submit(convert)
+    except JobQueueFull:
+        return jsonify({'error': 'Too many conversions in progress, please retry shortly'}), 503, {'Retry-After': '5'}
+    
+    status = job_manager.status(job_id)
+    status['status_url'] = url_for('job_status', job_id=job_id)
+    return jsonify(status), 202, {'Location': status['status_url']}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    status['result_url'] = url_for('job_result', job_id=job_id) if status['status'] == DONE else None
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job['status'] == FAILED:
+        return jsonify({'error': f"An error occurred: {job['error']}"}), 500
+    if job['status'] != DONE:
+        return jsonify({'error': 'Job has not finished yet', 'status': job['status']}), 409
+    return job['result'], 200, {'Content-Type': 'text/html; charset=utf-8'}
+
+def warm_up_app():
+    """Warm up the converter and Flask's own lazily built state (URL map, upload page)."""
+    seconds = warm_up()
+    app.url_map.update()
+    app.jinja_env.get_template('upload.html')
+    return seconds
+
+def start_parse_workers(wait=False):
+    """
+    Start the budgeted parse workers of this process (gunicorn calls it after
+    forking a worker). Unless wait, they start in the background: the worker
+    takes requests meanwhile, and parses wait for the first one ready.
+    """
+    if budgeted_parser is None:
+        return
+    if wait:
+        budgeted_parser.start()
+        return
+    
+    def start():
+        try:
+            budgeted_parser.start()
+        except Exception as e:
+            # E.g. the worker is shutting down; parses start the workers they need
+            app.logger.warning('Parse workers not started ahead of time: %s', e)
+    threading.Thread(target=start, name='vpg-parse-start', daemon=True).start()
+
+if app.config['WARM_UP']:
+    warm_up_app()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,96 @@
+"""
+Shared, content-hashed CSS/JS files for batch output.
+
+Every page renders the same inline <style> and <script> blocks from
+template.html. AssetStore.extract() moves them into vpg.<hash>.css and
+vpg.<hash>.js files and leaves a <link>/<script src> in their place, so
+the whole catalog shares one cached copy. The file name is a hash of the
+content, so a changed template gives new names and published pages never
+pick up assets they weren't built with.
+"""
+import hashlib
+import os
+import re
+
+from minify import minify_css, minify_js
+from atomic_write import write_atomic
+from precompress import write_siblings
+
+ASSET_PREFIX = 'vpg'
+
+_BLOCK_RE = re.compile(
+    r'<(?P<tag>style|script)\b(?P<attrs>(?:[^>"\']|"[^"]*"|\'[^\']*\')*)>(?P<body>.*?)</(?P=tag)\s*>',
+    re.IGNORECASE | re.DOTALL)
+_ATTR_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+_JS_TYPES = {'', 'text/javascript', 'application/javascript', 'module'}
+
+
+def _attributes(attrs):
+    """[(name, raw value or None)] of a tag's attribute string."""
+    return [(name, value) for name, value in _ATTR_RE.findall(attrs)]
+
+
+def _format_attributes(attributes):
+    return ''.join(f' {name}={value}' if value else f' {name}' for name, value in attributes)
+
+
+def _unquote(value):
+    return value.strip('"\'') if value else ''
+
+
+class AssetStore:
+    """
+    Writes asset files to directory and hands out their URLs (base_url +
+    file name; by default the directory relative to the current folder).
+    Existing files are never rewritten: same name, same content.
+    """
+
+    def __init__(self, directory, base_url=None, precompress=False):
+        self.directory = directory
+        if base_url is None:
+            base_url = os.path.relpath(directory).replace(os.sep, '/') + '/'
+        self.base_url = base_url
+        self.precompress = precompress
+        self._written = set()
+
+    def version(self):
+        """What goes into the build manifest: pages change when the asset URLs do."""
+        return f'assets:{self.base_url}'
+
+    def store(self, content, extension):
+        """Write content as vpg.<hash>.<extension> (once) and return its URL."""
+        body = content.encode('utf-8')
+        name = f'{ASSET_PREFIX}.{hashlib.sha256(body).hexdigest()[:16]}.{extension}'
+        if name not in self._written:
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                os.makedirs(self.directory, exist_ok=True)
+                # Parallel workers may write the same asset; the content is identical
+                write_atomic(path, body)
+            if self.precompress:
+                write_siblings(path, body)
+            self._written.add(name)
+        return self.base_url + name
+
+    def _replace(self, match, minify):
+        tag = match.group('tag').lower()
+        attributes = _attributes(match.group('attrs'))
+        names = {name.lower(): value for name, value in attributes}
+        body = match.group('body')
+        if not body.strip():
+            return match.group()
+        if tag == 'style':
+            css = minify_css(body) if minify else body
+            # <link> takes the style's media/nonce/etc.; 'type' only ever said text/css
+            kept = [(name, value) for name, value in attributes if name.lower() != 'type']
+            return f'<link rel="stylesheet" href="{self.store(css, "css")}"{_format_attributes(kept)}>'
+        if 'src' in names or _unquote(names.get('type')).lower() not in _JS_TYPES:
+            # External scripts and data blocks such as the JSON-LD stay as they are
+            return match.group()
+        js = minify_js(body) if minify else body
+        # No defer/async: the external script runs at the same point the inline one did
+        return f'<script src="{self.store(js, "js")}"{_format_attributes(attributes)}></script>'
+
+    def extract(self, html, minify=False):
+        """Move the inline CSS and JavaScript of a page into asset files; returns the new page."""
+        return _BLOCK_RE.sub(lambda match: self._replace(match, minify), html)
@@ -0,0 +1,53 @@
+"""
+Atomic file writes: the data goes to a temporary file next to the target,
+which is moved into place only once it is complete, so readers never see a
+partial file and a failed write leaves the old one alone.
+
+The temporary file is created with mode 0666, so it ends up with the usual
+permissions of a new file (the umask applies, as for open()), not the
+owner-only 0600 of tempfile.mkstemp(): a separate web server can serve what
+is written. The umask itself is never read or changed, since that is
+process-wide state other threads could observe.
+"""
+import os
+import secrets
+from contextlib import contextmanager
+
+
+def _create_temp(path):
+    """Create and open a new, uniquely named temp file next to path; returns (fd, tmp_path)."""
+    directory, name = os.path.split(os.path.abspath(path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmp_path = os.path.join(directory, f'.{name}.{secrets.token_hex(4)}.tmp')
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def atomic_open(path, mode='wb', encoding=None):
+    """
+    Open a temp file for writing (mode 'wb' or 'w') that replaces path when
+    the block exits cleanly and is removed if it raises.
+    """
+    fd, tmp_path = _create_temp(path)
+    try:
+        with open(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_atomic(path, data):
+    """Write bytes (or str, as UTF-8) to path atomically."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    with atomic_open(path, 'wb') as f:
+        f.write(data)
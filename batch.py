@@ -0,0 +1,293 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from generate_html import parse_word_document, find_car_images, DEFAULT_READER
+from categories import RULES
+from template_service import get_template, render_to_file, render_to_string, template_version
+from minify import minify_html
+from precompress import ENCODINGS, write_siblings, remove_siblings
+from atomic_write import write_atomic
+
+STAGES = ('parse', 'render')
+
+
+def _init_worker(template_path):
+    """Compile the template once when a pool worker starts."""
+    get_template(template_path)
+
+
+def output_version(template_path=None, minify=False, precompress=False, assets=None):
+    """
+    The template and category rules versions plus the output options, as
+    recorded in the build manifest.
+    """
+    version = f'{template_version(template_path)}+rules:{RULES.version}'
+    if minify:
+        version += '+minify'
+    if precompress:
+        version += '+' + '+'.join(ENCODINGS)
+    if assets is not None:
+        version += '+' + assets.version()
+    return version
+
+
+def write_output(data, output_path, template_path=None, minify=False, precompress=False, assets=None):
+    """
+    Write the page for data to output_path. Plain pages are streamed to
+    disk as they render; minified, precompressed or asset-sharing ones are
+    rendered in memory first. With precompress, .gz (and .br) copies are
+    written next to the page; without it, copies left by an earlier build
+    are removed. With an AssetStore, the page's inline CSS and JavaScript
+    go to the shared asset files.
+    """
+    if not minify and not precompress and assets is None:
+        render_to_file(data, output_path, template_path)
+        remove_siblings(output_path)
+        return
+    html = render_to_string(data, template_path)
+    if assets is not None:
+        html = assets.extract(html, minify)
+    if minify:
+        html = minify_html(html)
+    body = html.encode('utf-8')
+    write_atomic(output_path, body)
+    if precompress:
+        write_siblings(output_path, body)
+    else:
+        remove_siblings(output_path)
+
+
+def _new_result(docx_path, output_path):
+    return {
+        'docx_path': docx_path,
+        'output_path': output_path,
+        'error': None,
+        'timings': {},
+        'vehicle_heading': '',
+        'description_text': '',
+        'spec_categories': 0,
+        'issue_count': 0,
+    }
+
+
+def _summarize(result, data):
+    result['vehicle_heading'] = data.vehicle_heading
+    result['description_text'] = data.description_text
+    result['spec_categories'] = len(data.specs)
+    result['issue_count'] = data.issue_count
+
+
+def process_guide(docx_path, output_path, template_path=None, reader=DEFAULT_READER, car_images=None,
+                  keep_data=False, minify=False, precompress=False, assets=None):
+    """
+    Parse one .docx and write its HTML. Never raises: errors are returned
+    in the result dict so one bad document can't stop the batch.
+    car_images is passed to parse_word_document(); None scans the car images folder.
+    With keep_data the parsed data is returned too, as result['data'].
+    minify, precompress and assets are passed to write_output().
+    """
+    result = _new_result(docx_path, output_path)
+    timings = result['timings']
+    try:
+        start = time.perf_counter()
+        data = parse_word_document(docx_path, car_images=car_images, reader=reader)
+        timings['parse'] = time.perf_counter() - start
+
+        # 'render' includes writing the page (and minifying and compressing it)
+        start = time.perf_counter()
+        write_output(data, output_path, template_path, minify, precompress, assets)
+        timings['render'] = time.perf_counter() - start
+
+        _summarize(result, data)
+        if keep_data:
+            result['data'] = data
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def render_record(record, template_path=None, minify=False, precompress=False, assets=None):
+    """
+    Write the HTML of one parsed-data record (see parsed_store) without
+    touching its .docx. Never raises, like process_guide().
+    """
+    result = _new_result(record['docx_path'], record['output_path'])
+    try:
+        start = time.perf_counter()
+        write_output(record['data'], record['output_path'], template_path, minify, precompress, assets)
+        result['timings']['render'] = time.perf_counter() - start
+        _summarize(result, record['data'])
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def convert_guide(docx_bytes, car_images, template_path=None, minify=False):
+    """
+    Parse .docx bytes with an explicit image map and render them in memory.
+    Returns (html, timings). Used by the bulk ZIP endpoint's worker processes.
+    """
+    timings = {}
+    start = time.perf_counter()
+    data = parse_word_document(docx_bytes, car_images=car_images)
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    html = render_to_string(data, template_path)
+    if minify:
+        html = minify_html(html)
+    timings['render'] = time.perf_counter() - start
+    return html, timings
+
+
+def print_result(result):
+    """Print the per-file report the CLI has always printed."""
+    docx_path = result['docx_path']
+    if result.get('skipped'):
+        print(f"Up to date: {result['output_path']}")
+        return
+    print(f"Processing {docx_path}...")
+    if result['error'] is not None:
+        print(f"Error processing {docx_path}: {result['error']}")
+        return
+    print(f"HTML generated successfully: {result['output_path']}")
+    print(f"Vehicle: {result['vehicle_heading']}")
+    if result['description_text']:
+        print(f"Description: {result['description_text'][:100]}...")
+    else:
+        print('Description: Not found')
+    print(f"Specs: {result['spec_categories']} categories")
+    print(f"Issues: {result['issue_count']} total")
+    print('-' * 40)
+
+
+def output_path_for(docx_path):
+    return os.path.splitext(docx_path)[0] + '.html'
+
+
+def skipped_result(docx_path):
+    """Result dict for a guide whose output is already up to date."""
+    return {'docx_path': docx_path, 'output_path': output_path_for(docx_path),
+            'error': None, 'skipped': True, 'timings': {}}
+
+
+def run_batch(docx_files, template_path=None, jobs=1, reader=DEFAULT_READER, catalog=None, manifest=None,
+              keep_data=False, minify=False, precompress=False, assets=None):
+    """
+    Process docx_files and yield result dicts as they finish.
+    With jobs > 1 the files are spread over a process pool; each worker
+    compiles the template once and keeps it for every file it handles.
+    Car images come from catalog (an ImageCatalog) by document name; guides
+    it doesn't know get the car images folder, which is scanned only once.
+    With a BuildManifest, guides whose output is up to date are skipped
+    (yielded with 'skipped': True) and every guide built is recorded in it;
+    saving the manifest is up to the caller. keep_data, minify, precompress
+    and assets are passed on to process_guide().
+    """
+    default_images = find_car_images()
+    images = {docx_path: catalog.lookup_document(docx_path, default_images) if catalog else default_images
+              for docx_path in docx_files}
+
+    if manifest is not None:
+        template_hash = output_version(template_path, minify, precompress, assets)
+        stale = []
+        for docx_path in docx_files:
+            if manifest.is_fresh(docx_path, output_path_for(docx_path), template_hash, images[docx_path]):
+                yield skipped_result(docx_path)
+            else:
+                stale.append(docx_path)
+        for result in run_batch(stale, template_path, jobs, reader, catalog, keep_data=keep_data,
+                                minify=minify, precompress=precompress, assets=assets):
+            if result['error'] is None:
+                manifest.record(result['docx_path'], result['output_path'], template_hash,
+                                images[result['docx_path']])
+            else:
+                manifest.forget(result['docx_path'])
+            yield result
+        return
+
+    if jobs <= 1:
+        for docx_path in docx_files:
+            yield process_guide(docx_path, output_path_for(docx_path), template_path, reader, images[docx_path],
+                                keep_data, minify, precompress, assets)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(template_path,)) as pool:
+        futures = {pool.submit(process_guide, docx_path, output_path_for(docx_path), template_path, reader,
+                               images[docx_path], keep_data, minify, precompress, assets): docx_path
+                   for docx_path in docx_files}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed by the OS)
+                docx_path = futures[future]
+                yield {'docx_path': docx_path, 'output_path': output_path_for(docx_path),
+                       'error': f'worker failed: {e}', 'timings': {}}
+
+
+def render_parsed(records, template_path=None, jobs=1, manifest=None, minify=False, precompress=False,
+                  assets=None):
+    """
+    Render parsed-data records (see parsed_store) and yield result dicts as
+    they finish: a pure render pass, no .docx is read. With a BuildManifest,
+    a guide is recorded as built only if its .docx still has the hash the
+    record was parsed from, so a later normal run doesn't redo it.
+    """
+    if manifest is not None:
+        template_hash = output_version(template_path, minify, precompress, assets)
+        by_path = {}
+        for record in records:
+            by_path[record['docx_path']] = record
+        for result in render_parsed(list(by_path.values()), template_path, jobs,
+                                    minify=minify, precompress=precompress, assets=assets):
+            record = by_path[result['docx_path']]
+            if result['error'] is None:
+                manifest.record(record['docx_path'], record['output_path'], template_hash,
+                                record['data'].car_images, docx_hash=record.get('docx_hash'))
+            else:
+                manifest.forget(record['docx_path'])
+            yield result
+        return
+
+    if jobs <= 1:
+        for record in records:
+            yield render_record(record, template_path, minify, precompress, assets)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(template_path,)) as pool:
+        futures = {pool.submit(render_record, record, template_path, minify, precompress, assets): record
+                   for record in records}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                record = futures[future]
+                yield {'docx_path': record['docx_path'], 'output_path': record['output_path'],
+                       'error': f'worker failed: {e}', 'timings': {}}
+
+
+def print_summary(results, elapsed, slowest=5):
+    """Print throughput, per-stage totals, failures and the slowest documents."""
+    failures = [r for r in results if r['error'] is not None]
+    skipped = sum(1 for r in results if r.get('skipped'))
+    print('=' * 40)
+    print(f'Processed {len(results)} files in {elapsed:.2f}s '
+          f'({len(results) / elapsed if elapsed else 0:.1f} files/sec)')
+    if skipped:
+        print(f'Up to date (skipped): {skipped}, rebuilt: {len(results) - skipped}')
+    stage_totals = ', '.join(f"{stage} {sum(r['timings'].get(stage, 0) for r in results):.2f}s"
+                             for stage in STAGES)
+    print(f'Stage totals: {stage_totals}')
+    print(f'Failures: {len(failures)}')
+    for r in failures:
+        print(f"  {r['docx_path']}: {r['error']}")
+    ranked = sorted((r for r in results if not r.get('skipped')),
+                    key=lambda r: sum(r['timings'].values()), reverse=True)[:slowest]
+    if ranked:
+        print('Slowest documents:')
+        for r in ranked:
+            print(f"  {sum(r['timings'].values()) * 1000:8.1f} ms  {r['docx_path']}")
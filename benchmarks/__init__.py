@@ -0,0 +1 @@
+"""Performance benchmarks for the VPG generator. Run from the repo root, e.g. python -m benchmarks.bench_template"""
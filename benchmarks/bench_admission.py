@@ -0,0 +1,97 @@
+"""
+A burst of concurrent POST /upload requests with and without admission
+control (VPG_UPLOAD_CONCURRENCY): latency of the uploads that got a page,
+how many were turned away with 503, and the peak memory of the process.
+Each mode runs in a fresh interpreter, with the result cache off so every
+upload is parsed and rendered.
+
+Usage: python -m benchmarks.bench_admission [--burst 24] [--issues 300]
+                                            [--concurrency 2] [--queue 8]
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def child(burst, issues):
+    """Runs in the fresh interpreter: print the burst results as JSON."""
+    from benchmarks.synthetic import build_guide
+    import app
+    documents = [build_guide(issues, seed=seed) for seed in range(burst)]
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def upload(docx_bytes):
+        client = app.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/upload', data={
+            'docx_file': (io.BytesIO(docx_bytes), 'guide.docx'),
+            'car_images': (io.BytesIO(b''), 'car_front.jpg'),
+        }, content_type='multipart/form-data')
+        response.get_data()
+        with lock:
+            statuses.append(response.status_code)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=upload, args=(docx_bytes,)) for docx_bytes in documents]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps({
+        'elapsed': time.perf_counter() - start,
+        'ok': statuses.count(200),
+        'rejected': statuses.count(503),
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_child(args, concurrency):
+    env = dict(os.environ, VPG_UPLOAD_CONCURRENCY=str(concurrency), VPG_UPLOAD_QUEUE=str(args.queue),
+               VPG_RESULT_CACHE_ENTRIES='0', VPG_RESULT_CACHE_DIR='', VPG_WARM_UP='1')
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_admission', '--child',
+                             '--burst', str(args.burst), '--issues', str(args.issues)],
+                            cwd=REPO_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--burst', type=int, default=24, help='concurrent uploads')
+    parser.add_argument('--issues', type=int, default=300, help='issues per synthetic guide')
+    parser.add_argument('--concurrency', type=int, default=2, help='VPG_UPLOAD_CONCURRENCY with the limit on')
+    parser.add_argument('--queue', type=int, default=8, help='VPG_UPLOAD_QUEUE with the limit on')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.burst, args.issues)
+        return
+
+    print(f'{args.burst} concurrent uploads of {args.issues}-issue synthetic guides')
+    print(f'{"":<28}{"ok":>5}{"503":>6}{"p50":>11}{"p99":>11}{"peak RSS":>12}')
+    for label, concurrency in (('no limit', 0), (f'limit {args.concurrency}, queue {args.queue}', args.concurrency)):
+        r = run_child(args, concurrency)
+        print(f"{label:<28}{r['ok']:>5}{r['rejected']:>6}{r['p50'] * 1000:>8.0f} ms{r['p99'] * 1000:>8.0f} ms"
+              f"{r['peak_rss_mb']:>9.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
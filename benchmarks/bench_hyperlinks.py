@@ -0,0 +1,48 @@
+"""
+Hyperlink extraction cost: per-line extract_hyperlinks_from_paragraph() calls
+(the old part extraction) against the one-pass build_hyperlink_index().
+
+Usage: python -m benchmarks.bench_hyperlinks [--issues 500] [-n ROUNDS]
+"""
+import argparse
+import io
+import statistics
+import time
+
+import docx
+
+from generate_html import build_hyperlink_index, extract_hyperlinks_from_paragraph
+from benchmarks.synthetic import build_guide
+
+
+def median_ms(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=500)
+    parser.add_argument('-n', '--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    doc = docx.Document(io.BytesIO(build_guide(args.issues)))
+    paragraphs = doc.paragraphs
+    index = build_hyperlink_index(doc)
+    assert index == [extract_hyperlinks_from_paragraph(p, doc) for p in paragraphs]
+
+    # The old parser scanned the paragraph of every line following "Parts to Replace"
+    part_lines = [p for p, links in zip(paragraphs, index) if links]
+    per_line = median_ms(lambda: [extract_hyperlinks_from_paragraph(p, doc) for p in part_lines], args.rounds)
+    indexed = median_ms(lambda: build_hyperlink_index(doc), args.rounds)
+    print(f'{len(paragraphs)} paragraphs, {sum(len(links) for links in index)} hyperlinks')
+    print(f'per-line scans of linked paragraphs  {per_line:8.2f} ms')
+    print(f'one-pass index of whole document     {indexed:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Memory held by a catalog parsed into memory: parse a synthetic corpus
+with the reference (pre-rewrite) parser, which builds nested dicts, and
+with parse_word_document(), which builds the slotted guide model, and
+report the memory still allocated while every parsed guide is kept.
+
+The corpus cycles through --distinct synthetic documents (building 5,000
+.docx files would dominate the run); each one is parsed afresh, so no
+parse result is shared between guides unless the parser shares it.
+
+Usage: python -m benchmarks.bench_memory [--guides 5000] [--distinct 50] [--issues 30]
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from generate_html import parse_word_document, READERS
+from benchmarks import reference_parser
+from benchmarks.synthetic import build_guide
+
+
+def retained(parse, corpus, reader):
+    """Parse every document of corpus and keep the results; returns (bytes allocated, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    guides = [parse(docx_bytes, car_images={}, reader=reader) for docx_bytes in corpus]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del guides
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--guides', type=int, default=5000)
+    parser.add_argument('--distinct', type=int, default=50, help='distinct synthetic documents in the corpus')
+    parser.add_argument('--issues', type=int, default=30, help='issues per guide')
+    parser.add_argument('--reader', choices=READERS, default='stream')
+    args = parser.parse_args()
+
+    documents = [build_guide(args.issues, seed=seed) for seed in range(args.distinct)]
+    corpus = [documents[i % len(documents)] for i in range(args.guides)]
+
+    # Both parsers must produce the same guides for the comparison to mean anything
+    for docx_bytes in documents:
+        expected = reference_parser.parse_word_document(docx_bytes, car_images={}, reader=args.reader)
+        actual = parse_word_document(docx_bytes, car_images={}, reader=args.reader)
+        if json.dumps(expected) != json.dumps(actual.to_dict()):
+            print('Parsers disagree on a synthetic guide; not comparing memory')
+            sys.exit(1)
+
+    before, before_time = retained(reference_parser.parse_word_document, corpus, args.reader)
+    after, after_time = retained(parse_word_document, corpus, args.reader)
+    print(f'{args.guides} guides ({args.distinct} distinct, {args.issues} issues each), {args.reader} reader')
+    print(f'reference parser (dicts)   {before / 2**20:8.1f} MiB  {before / args.guides / 1024:6.1f} KiB/guide  '
+          f'parsed in {before_time:.1f}s')
+    print(f'current parser (slotted)   {after / 2**20:8.1f} MiB  {after / args.guides / 1024:6.1f} KiB/guide  '
+          f'parsed in {after_time:.1f}s')
+    print(f'{before / max(after, 1):.2f}x less memory')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Time parse_word_document() against the reference (pre-rewrite) parser on a
+synthetic guide and check that both produce identical output.
+
+Usage: python -m benchmarks.bench_parser [--issues 500] [-n ROUNDS] [--reader stream]
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+
+import docx
+
+from generate_html import parse_word_document, READERS
+from benchmarks import reference_parser
+from benchmarks.synthetic import build_guide
+
+
+def time_parse(parse, docx_bytes, reader, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parse(docx_bytes, car_images={}, reader=reader)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def time_read(docx_bytes, reader, rounds):
+    """Time just loading the document and reading paragraph text."""
+    def read():
+        if reader == 'stream':
+            from docx_stream import iter_paragraph_records
+            return [p.text for p in iter_paragraph_records(io.BytesIO(docx_bytes))]
+        return [p.text for p in docx.Document(io.BytesIO(docx_bytes)).paragraphs]
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        read()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=500)
+    parser.add_argument('-n', '--rounds', type=int, default=5)
+    parser.add_argument('--symptoms', type=int, default=5, help='maximum symptom lines per issue')
+    parser.add_argument('--reader', choices=READERS, default='python-docx')
+    args = parser.parse_args()
+
+    docx_bytes = build_guide(args.issues, symptoms=(min(2, args.symptoms), args.symptoms))
+    expected = reference_parser.parse_word_document(docx_bytes, car_images={}, reader=args.reader)
+    actual = parse_word_document(docx_bytes, car_images={}, reader=args.reader)
+    identical = json.dumps(expected) == json.dumps(actual.to_dict())
+
+    read = time_read(docx_bytes, args.reader, args.rounds)
+    before = time_parse(reference_parser.parse_word_document, docx_bytes, args.reader, args.rounds)
+    after = time_parse(parse_word_document, docx_bytes, args.reader, args.rounds)
+    print(f'{args.issues}-issue synthetic guide (up to {args.symptoms} symptoms each), '
+          f'{args.reader} reader, median of {args.rounds}')
+    print(f'document read     {read:9.1f} ms')
+    print(f'reference parser  {before:9.1f} ms   (excluding read: {before - read:7.1f} ms)')
+    print(f'current parser    {after:9.1f} ms   (excluding read: {after - read:7.1f} ms, '
+          f'{(before - read) / max(after - read, 1e-3):.1f}x)')
+    print(f'output identical: {identical}')
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == '__main__':
+    main()
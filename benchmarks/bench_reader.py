@@ -0,0 +1,87 @@
+"""
+Compare the python-docx and streaming (docx_stream) readers on a corpus:
+checks that parse_word_document() output is identical, then reports parse
+time and peak RSS per reader.
+
+Usage: python -m benchmarks.bench_reader PATH [PATH ...] [-n ROUNDS]
+PATH can be a .docx file or a directory of them.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+from generate_html import parse_word_document, READERS
+
+
+def collect_docx(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.docx'))))
+        else:
+            files.append(path)
+    return files
+
+
+def _peak_rss_kb(reader, files, queue):
+    """Runs in a fresh process so each reader's peak RSS is measured alone."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for path in files:
+        parse_word_document(path, reader=reader)
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+
+
+def peak_rss_kb(reader, files):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_peak_rss_kb, args=(reader, files, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('-n', '--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    files = collect_docx(args.paths)
+    if not files:
+        sys.exit('No .docx files found.')
+
+    # Measured first: ru_maxrss survives fork+exec, so the parent must not
+    # have parsed anything yet when the measuring processes start
+    peak_rss = {reader: peak_rss_kb(reader, files) for reader in READERS}
+
+    mismatches = []
+    for path in files:
+        outputs = [json.dumps(parse_word_document(path, reader=reader).to_dict()) for reader in READERS]
+        if len(set(outputs)) != 1:
+            mismatches.append(path)
+    print(f'{len(files)} documents, {len(mismatches)} with differing output')
+    for path in mismatches:
+        print(f'  MISMATCH {path}')
+
+    for reader in READERS:
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            for path in files:
+                parse_word_document(path, reader=reader)
+            timings.append((time.perf_counter() - start) * 1000 / len(files))
+        print(f'{reader:<12} {statistics.median(timings):8.2f} ms/doc   '
+              f'peak RSS +{peak_rss[reader] / 1024:.1f} MB')
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
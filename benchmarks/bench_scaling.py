@@ -0,0 +1,129 @@
+"""
+Worst-case scaling of the parser: adversarial documents (huge paragraphs,
+a huge fault codes line, thousands of category headers, no keywords at
+all, paragraphs of thousands of hyperlinked part lines, ...) are parsed at
+sizes n, 2n and 4n, and every case must stay near-linear: the time may at
+most grow by --max-ratio when the size doubles (cases still under
+MIN_SECONDS at 4n are too fast to judge and pass). Spec classification is
+also timed against 10x and 100x more category rules, where the time must
+grow far slower than the rule count. Exits with status 1 if any case
+scales worse.
+
+Usage: python -m benchmarks.bench_scaling [--size 20000] [-n ROUNDS]
+                                          [--reader stream] [--max-ratio 2.6]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from xml.sax.saxutils import escape
+
+from categories import CategoryRules
+from generate_html import parse_word_document, READERS
+from warmup import minimal_docx
+
+# Below this the timings are mostly fixed costs and noise
+MIN_SECONDS = 0.005
+# Time allowed for classifying with 100x the spec rules, relative to 1x
+MAX_RULES_RATIO = 4
+
+HEAD = ('Vehicle Platform Guide: Scaling Test', 'Top Common Issues with Scaling Test', 'Brakes', '1. Pad Failure')
+
+
+def paragraphs(lines):
+    return ''.join(f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in lines)
+
+
+def text_document(lines):
+    return minimal_docx(paragraphs(HEAD + tuple(lines)))
+
+
+def linked_parts_document(n):
+    """One paragraph of n hyperlinked part lines separated by line breaks."""
+    body = ''.join(f'<w:hyperlink r:id="rId{i}"><w:r><w:t>Part {i}</w:t></w:r></w:hyperlink>'
+                   f'<w:r><w:t xml:space="preserve"> is a part</w:t><w:br/></w:r>' for i in range(1, n + 1))
+    return minimal_docx(paragraphs(HEAD + ('Parts to Replace:',)) + f'<w:p>{body}</w:p>',
+                        [f'https://newparts.com/part-{i}' for i in range(1, n + 1)])
+
+
+# Case name -> function building the document for size n (about n words or n // 10 lines)
+CASES = {
+    'huge paragraph': lambda n: text_document(['word ' * n]),
+    'huge fault codes line': lambda n: text_document(['Fault Codes: ' + 'P0300, ' * n]),
+    'repeated field keywords': lambda n: text_document(['Fault Codes: P0300 '
+                                                        + 'Why it happens Symptoms Parts to Replace Brands ' * (n // 8)]),
+    'thousands of category headers': lambda n: text_document(['Brakes', 'Engine'] * (n // 10)),
+    'no keywords at all': lambda n: text_document(['plain text line with no keywords'] * (n // 10)),
+    'colons without keywords': lambda n: text_document(['a: ' * n]),
+    'many symptom lines': lambda n: text_document(['Symptoms:'] + [f'{i}. symptom {i}' for i in range(n // 10)]),
+    'many spec lines': lambda n: minimal_docx(paragraphs(['Vehicle Platform Guide: Scaling Test']
+                                                         + [f'Engine {i}: 2.0L' for i in range(n // 10)])),
+    'long part line': lambda n: text_document(['Parts to Replace:', 'Part ' + 'The ' * n]),
+    'hyperlinked part lines': lambda n: linked_parts_document(n // 20),
+}
+
+
+def best_seconds(fn, rounds):
+    """Fastest of rounds runs: the least disturbed by GC pauses and other noise."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def random_rules(n_categories, rng):
+    categories = [{'name': f'Category {i}', 'priority': i,
+                   'keywords': [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+                                for _ in range(6)]}
+                  for i in range(n_categories)]
+    return CategoryRules({'spec_categories': categories, 'issue_categories': []})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000, help='smallest size n')
+    parser.add_argument('-n', '--rounds', type=int, default=5)
+    parser.add_argument('--reader', choices=READERS, default='stream')
+    parser.add_argument('--max-ratio', type=float, default=2.6, help='largest allowed time ratio per doubling')
+    args = parser.parse_args()
+
+    sizes = (args.size, 2 * args.size, 4 * args.size)
+    failed = []
+    print(f'{args.reader} reader, best of {args.rounds}')
+    print(f'{"":<32}' + ''.join(f'{"n=" + str(size):>12}' for size in sizes) + f'{"ratio":>8}')
+    for name, build in CASES.items():
+        timings = []
+        for size in sizes:
+            document = build(size)
+            timings.append(best_seconds(
+                lambda: parse_word_document(document, car_images={}, reader=args.reader), args.rounds))
+        # The last doubling is the least affected by fixed costs
+        ratio = timings[2] / max(timings[1], 1e-9)
+        print(f'{name:<32}' + ''.join(f'{t * 1000:>9.1f} ms' for t in timings) + f'{ratio:>8.2f}')
+        if ratio > args.max_ratio and timings[2] >= MIN_SECONDS:
+            failed.append(name)
+
+    rng = random.Random(0)
+    keys = ('Engine', 'Horsepower', 'Curb Weight', 'City MPG', 'Ground Clearance (inches)', 'Towing Capacity')
+    counts = (40, 400, 4000)
+    timings = []
+    for n_categories in counts:
+        rules = random_rules(n_categories, rng)
+        timings.append(best_seconds(lambda: [rules.spec_category(key) for key in keys * 1000], args.rounds))
+    ratio = timings[2] / max(timings[0], 1e-9)
+    print(f'{"spec rules (40/400/4000 cats)":<32}' + ''.join(f'{t * 1000:>9.1f} ms' for t in timings)
+          + f'{ratio:>8.2f}')
+    # More rules mean more keywords that happen to match, not a scan of every rule
+    if ratio > MAX_RULES_RATIO:
+        failed.append('spec rules')
+
+    if failed:
+        print(f'Worse than near-linear: {", ".join(failed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Worker start-up cost with and without the import-time warm-up: time to
+import the app (and start its parse workers, as gunicorn's post_worker_init
+does in the background), and latency of the first and second POST /upload, each measured in
+a fresh interpreter. With gunicorn's preload_app the import (and the
+warm-up) happens once in the master, so the first-request latency is what
+every new worker pays.
+
+Usage: python -m benchmarks.bench_startup [guide.docx] [-n ROUNDS] [--issues N]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURES = ('import', 'first_request', 'second_request')
+
+
+def upload(client, docx_bytes):
+    response = client.post('/upload', data={
+        'docx_file': (io.BytesIO(docx_bytes), 'guide.docx'),
+        'car_images': (io.BytesIO(b''), 'car_front.jpg'),
+    }, content_type='multipart/form-data')
+    body = response.get_data()
+    if response.status_code != 200:
+        raise RuntimeError(f'/upload returned {response.status_code}: {body[:200]!r}')
+
+
+def child(docx_path):
+    """Runs in the fresh interpreter: print the timings in milliseconds as JSON."""
+    with open(docx_path, 'rb') as f:
+        docx_bytes = f.read()
+    timings = {}
+    start = time.perf_counter()
+    import app
+    app.start_parse_workers(wait=True)
+    timings['import'] = (time.perf_counter() - start) * 1000
+    client = app.app.test_client()
+    for measure in ('first_request', 'second_request'):
+        start = time.perf_counter()
+        upload(client, docx_bytes)
+        timings[measure] = (time.perf_counter() - start) * 1000
+    print(json.dumps(timings))
+
+
+def run_child(docx_path, warm_up):
+    env = dict(os.environ,
+               VPG_WARM_UP='1' if warm_up else '0',
+               # Every request must parse and render
+               VPG_RESULT_CACHE_ENTRIES='0', VPG_RESULT_CACHE_DIR='',
+               VPG_BYTECODE_CACHE_DIR='')
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', docx_path],
+                            cwd=REPO_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('docx_path', nargs='?', help='guide to upload (default: a synthetic guide)')
+    parser.add_argument('-n', '--rounds', type=int, default=5, help='fresh interpreters per mode')
+    parser.add_argument('--issues', type=int, default=100, help='issues in the synthetic guide')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.docx_path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = args.docx_path
+        if not docx_path:
+            from benchmarks.synthetic import build_guide
+            docx_path = os.path.join(tmp, 'guide.docx')
+            with open(docx_path, 'wb') as f:
+                f.write(build_guide(args.issues))
+        docx_path = os.path.abspath(docx_path)
+
+        results = {}
+        for label, warm_up in (('before (no warm-up)', False), ('after (warm-up)', True)):
+            runs = [run_child(docx_path, warm_up) for _ in range(args.rounds)]
+            results[label] = {measure: statistics.median(run[measure] for run in runs) for measure in MEASURES}
+
+    print(f'Median of {args.rounds} fresh interpreters, {args.docx_path or f"synthetic guide ({args.issues} issues)"}')
+    print(f'{"":<22}' + ''.join(f'{m.replace("_", " "):>17}' for m in MEASURES))
+    for label, medians in results.items():
+        print(f'{label:<22}' + ''.join(f'{medians[m]:>14.1f} ms' for m in MEASURES))
+    before, after = results.values()
+    print(f"first request: {before['first_request'] / after['first_request']:.1f}x faster with warm-up "
+          f"(import {after['import'] - before['import']:+.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Per-render latency of the old generate_html path (read template.html, build a
+new jinja2.Template, render) against the cached template service.
+
+Usage: python -m benchmarks.bench_template [guide.docx] [-n ROUNDS]
+"""
+import argparse
+import statistics
+import time
+
+from jinja2 import Template
+
+import template_service
+from benchmarks.sample_data import sample_data
+
+
+def render_uncached(data, template_path):
+    """The pre-template-service render: re-read and re-compile every call."""
+    with open(template_path, 'r', encoding='utf-8') as f:
+        template_str = f.read()
+    return Template(template_str).render(**data)
+
+
+def time_calls(fn, rounds):
+    """Return per-call latencies in milliseconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f'{label:<22} mean {statistics.mean(timings):8.3f} ms   '
+          f'median {statistics.median(timings):8.3f} ms   min {min(timings):8.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('docx_path', nargs='?', help='guide to parse (default: built-in sample guide)')
+    parser.add_argument('-n', '--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.docx_path:
+        from generate_html import parse_word_document
+        data = parse_word_document(args.docx_path)
+    else:
+        data = sample_data()
+
+    template_path = template_service.DEFAULT_TEMPLATE_PATH
+    assert render_uncached(data, template_path) == template_service.render_to_string(data, template_path)
+
+    template_service.clear_cache()
+    start = time.perf_counter()
+    template_service.render_to_string(data, template_path)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    before = time_calls(lambda: render_uncached(data, template_path), args.rounds)
+    after = time_calls(lambda: template_service.render_to_string(data, template_path), args.rounds)
+
+    print(f'{args.rounds} renders of {args.docx_path or "sample guide"}')
+    report('before (Template())', before)
+    report('after (cached)', after)
+    print(f'{"first cached render":<22} {cold_ms:8.3f} ms (includes compile)')
+    print(f'speedup: {statistics.mean(before) / statistics.mean(after):.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,555 @@
+"""
+parse_word_document() as it was before the single-pass issue parser
+rewrite, kept verbatim as the reference implementation. The parser
+benchmarks time the current parser against it and check that both
+produce identical output.
+"""
+import io
+import re
+
+import docx
+
+from generate_html import (DEFAULT_READER, READERS, categorize_spec,
+                           extract_hyperlinks_from_paragraph, find_car_images)
+
+
+def parse_word_document(docx_source, car_images=None, reader=DEFAULT_READER):
+    """
+    Parse Word document and extract vehicle platform guide data.
+    docx_source can be a path, a file-like object or the raw .docx bytes.
+    If car_images is given it is used as the view -> URL map and the
+    car images folder is not scanned, so nothing touches the filesystem.
+    reader selects how the .docx is read: 'python-docx' builds the full
+    object model, 'stream' uses the zipfile/iterparse reader in docx_stream.
+    """
+    if isinstance(docx_source, (bytes, bytearray)):
+        docx_source = io.BytesIO(docx_source)
+    if reader == 'stream':
+        from docx_stream import iter_paragraph_records
+        paragraph_source = iter_paragraph_records(docx_source)
+        get_hyperlinks = lambda para: para.hyperlinks
+    elif reader == 'python-docx':
+        doc = docx.Document(docx_source)
+        paragraph_source = doc.paragraphs
+        get_hyperlinks = lambda para: extract_hyperlinks_from_paragraph(para, doc)
+    else:
+        raise ValueError(f"Unknown docx reader: {reader!r} (expected one of {', '.join(READERS)})")
+    
+    # Replace en-dashes and em-dashes with normal hyphens
+    # Split by \n to handle multi-field paragraphs
+    # Store paragraph objects for hyperlink extraction
+    paragraphs = []
+    paragraph_objects = []
+    for p in paragraph_source:
+        text = p.text.strip().replace('–', '-').replace('—', '-')
+        if text:
+            # Split by \n to handle cases where multiple fields are in one paragraph
+            for line in text.split('\n'):
+                line = line.strip()
+                if line:
+                    paragraphs.append(line)
+                    paragraph_objects.append(p)
+
+    data = {
+        'vehicle_heading': '',
+        'description_text': '',
+        'common_issues_heading': '',
+        'car_images': {},
+        'specs': {},
+        'issues': {
+            'Brakes': [],
+            'Suspension': [],
+            'Ignition': [],
+            'Steering': [],
+            'Engine': [],
+            'Fuel Delivery': [],
+            'Electrical System': [],
+            'Driveline/Transmission': [],
+            'Others': []
+        }
+    }
+
+    # Find car images
+    if car_images is not None:
+        data['car_images'] = dict(car_images)
+    else:
+        data['car_images'] = find_car_images()
+
+    # 1. Extract FULL Heading (no trimming, SEO-safe)
+    vpg_index = -1
+    for i, p in enumerate(paragraphs):
+        if p.lower().startswith('vehicle platform guide'):
+            data['vehicle_heading'] = p.strip()
+            vpg_index = i
+            break
+
+    # Fallback if heading not found
+    if vpg_index == -1 and paragraphs:
+        data['vehicle_heading'] = paragraphs[0].strip()
+        vpg_index = 0
+
+    # 2. Extract FULL Description (multiple paragraphs)
+    description_paragraphs = []
+    if vpg_index != -1:
+        for i in range(vpg_index + 1, len(paragraphs)):
+            p = paragraphs[i].strip()
+
+            # Stop when structured sections start
+            if any(x in p for x in ('Specifications', 'Common Issues', 'Fault Codes', 'Top 20')):
+                break
+
+            if len(p) > 40:
+                description_paragraphs.append(p)
+
+    data['description_text'] = '\n\n'.join(description_paragraphs)
+
+    # 3. Extract Specifications
+    data['specs'] = {
+        'Engine and Powertrain': {},
+        'Fuel Economy (EPA Estimates)': {},
+        'Vehicle Weight': {},
+        'Configurations and Submodels': {}
+        #'Other Specifications':{}# Removed as per user Request
+    }
+
+    # Extract Heading before Category Issue
+    common_issues_index = -1
+    for i, p in enumerate(paragraphs):
+        if 'Top Common Issues' in p or 'Common Issues' in p:
+            data['common_issues_heading'] = p
+            common_issues_index = i
+            break
+    
+    if common_issues_index == -1:
+        common_issues_index = vpg_index + 5  # Fallback
+
+    # Scan for specs - Limit scan to before common issues
+    scan_limit = common_issues_index if common_issues_index != -1 else min(50, len(paragraphs))
+    
+    for j in range(0, scan_limit):
+        p = paragraphs[j].strip()
+        if ':' in p and len(p) < 200:
+            if not any(x in p for x in ['Vehicle Platform Guide', 'In this', 'Common Issues', 
+                                        'Fault Codes:', 'Why it happens:', 'Symptoms:', 
+                                        'Parts to Replace:', 'Brands:']):
+                parts = p.split(':', 1)
+                if len(parts) == 2:
+                    key = parts[0].strip()
+                    val = parts[1].strip()
+                    if key and val and len(key) < 50 and not key.startswith('Note'):
+                        category = categorize_spec(key, val)
+                        if category:  # Only add if category is valid (not None)
+                            data['specs'][category][key] = val
+
+    # 4. Categories and Issues
+    category_map = {
+        'Brake System': 'Brakes',
+        'Brakes System': 'Brakes',
+        'Brakes': 'Brakes',
+        'Suspension System': 'Suspension',
+        'Suspension': 'Suspension',
+        'Ignition System': 'Ignition',
+        'Ignition': 'Ignition',
+        'Steering System': 'Steering',
+        'Steering': 'Steering',
+        'Engine Management System': 'Engine',
+        'Engine System': 'Engine',
+        'Engine': 'Engine',
+        'Fuel Delivery System': 'Fuel Delivery',
+        'Fuel System': 'Fuel Delivery',
+        'Fuel Delivery': 'Fuel Delivery',
+        'Electrical Management System': 'Electrical System',
+        'Electrical Systems': 'Electrical System',
+        'Electrical System': 'Electrical System',
+        'Electrical': 'Electrical System',
+        'Driveline': 'Driveline/Transmission',
+        'Driveline System': 'Driveline/Transmission',
+        'Transmission System': 'Driveline/Transmission',
+        'Driveline/Transmission System': 'Driveline/Transmission',
+        'Transmission': 'Driveline/Transmission',
+        'Driveline / Transmission': 'Driveline/Transmission',
+        'Driveline / Transmission System': 'Driveline/Transmission',
+        'Other System': 'Others',
+        'Others': 'Others'
+    }
+    
+    category_keys_lower = set(k.lower() for k in category_map.keys())
+
+    def extract_fault_codes(text):
+        """Extract fault codes from text."""
+        return text
+
+    def extract_part_from_text(text, para_obj=None):
+        """
+        Extract part name, link, and description from text.
+        Uses hyperlinks from the paragraph object if available.
+        """
+        part_name = text
+        link = ''
+        description = ''
+        
+        # First, try to extract hyperlinks from the paragraph object
+        if para_obj:
+            hyperlinks = get_hyperlinks(para_obj)
+            
+            # Filter hyperlinks to exclude those that are full URLs (the ones in parentheses)
+            valid_hyperlinks = [(hl_text, url) for hl_text, url in hyperlinks 
+                               if not hl_text.startswith('http://') and not hl_text.startswith('https://')]
+            
+            if valid_hyperlinks:
+                # Use the first valid hyperlink (the underlined part name)
+                hyperlink_text, hyperlink_url = valid_hyperlinks[0]
+                
+                # The hyperlink text is our part name
+                part_name = hyperlink_text
+                link = hyperlink_url
+                
+                # Everything after the hyperlink text (and removing URL in parentheses) is description
+                text_clean = text
+                url_in_parens = re.search(r'\s*\(\s*https?://[^\)]+\s*\)', text_clean)
+                if url_in_parens:
+                    text_clean = text_clean[:url_in_parens.start()] + text_clean[url_in_parens.end():]
+                
+                # Find where the part name appears in the text and get everything after it
+                if hyperlink_text in text_clean:
+                    idx = text_clean.index(hyperlink_text)
+                    description = text_clean[idx + len(hyperlink_text):].strip()
+                
+                return {
+                    'name': part_name,
+                    'description': ' ' + description if description else '',
+                    'link': link
+                }
+        
+        # Fallback: Old format handling if no hyperlinks found
+        url_match = re.search(r'\s*\(\s*(https?://[^\)]+)\s*\)', text)
+        if url_match:
+            link = url_match.group(1).strip()
+            part_name = text[:url_match.start()].strip()
+            description = text[url_match.end():].strip()
+            if description:
+                description = ' ' + description
+        else:
+            # Old format handling
+            if ' is a ' in text:
+                part_name = text.split(' is a ')[0].strip()
+                description = ' is a ' + text.split(' is a ', 1)[1].strip()
+            elif ' is an ' in text:
+                part_name = text.split(' is an ')[0].strip()
+                description = ' is an ' + text.split(' is an ', 1)[1].strip()
+            
+            # Fix for description starting with "The" inside part_name
+            if ' The ' in part_name:
+                parts_split = part_name.split(' The ', 1)
+                part_name = parts_split[0].strip()
+                description = ' The ' + parts_split[1].strip() + description
+
+            # User rule: if last character is number or capital letter
+            cut_idx = -1
+            for i in range(len(part_name) - 1, -1, -1):
+                if part_name[i].isdigit() or part_name[i].isupper():
+                    cut_idx = i
+                    break
+            
+            if cut_idx != -1:
+                suffix = part_name[cut_idx+1:]
+                part_name = part_name[:cut_idx+1]
+                description = suffix + description
+
+            # Simple search query generation for fallback link
+            search_query = re.sub(r'[^a-zA-Z0-9\s]', '', part_name).strip()
+            link = f'https://newparts.com/parts/search?q={search_query}'
+        
+        return {
+            'name': part_name,
+            'description': description,
+            'link': link
+        }
+
+    current_category = None
+    i = common_issues_index + 1
+    
+    while i < len(paragraphs):
+        p = paragraphs[i].strip()
+        
+        # Check for Category Header
+        is_category = False
+        p_clean = p.strip().lower().rstrip(':')
+        if p_clean in category_keys_lower:
+            current_category = category_map.get(p.strip().rstrip(':'), None)
+            if not current_category:
+                for k, v in category_map.items():
+                    if k.lower() == p_clean:
+                        current_category = v
+                        break
+            is_category = True
+        
+        if is_category:
+            i += 1
+            continue
+            
+        if current_category:
+            # Parse Issue
+            title_text = p
+            fault_codes_inline = ''
+            why_inline = ''
+            
+            # Check if multiple fields are on the title line
+            remaining_text = title_text
+            
+            # Extract Fault Codes if present
+            fc_match = re.search(r'(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))', 
+                                remaining_text, re.IGNORECASE)
+            if fc_match:
+                title_text = remaining_text[:fc_match.start()].strip()
+                fault_codes_inline = fc_match.group(2).strip()
+                remaining_text = remaining_text[fc_match.end():]
+            
+            # Extract Why it happens if present
+            why_match = re.search(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
+                                 remaining_text, re.IGNORECASE)
+            if why_match:
+                if not fc_match:
+                    title_text = remaining_text[:why_match.start()].strip()
+                why_inline = why_match.group(2).strip()
+                remaining_text = remaining_text[why_match.end():]
+            
+            # Extract Symptoms if present on same line
+            sym_match = re.search(r'(Symptoms?)[\s:\-]+(.+?)(?=(Parts to Replace|Brands|$))', 
+                                 remaining_text, re.IGNORECASE)
+            if sym_match:
+                if not fc_match and not why_match:
+                    title_text = remaining_text[:sym_match.start()].strip()
+                remaining_text = remaining_text[sym_match.end():]
+
+            issue = {
+                'title': title_text,
+                'fault_codes': fault_codes_inline,
+                'why': why_inline,
+                'symptoms': [],
+                'parts': [],
+                'brands': []
+            }
+            
+            # Track which fields have been parsed
+            fields_parsed = {
+                'fault_codes': False,
+                'why': False,
+                'symptoms': False,
+                'parts': False,
+                'brands': False
+            }
+            
+            j = i + 1
+            while j < len(paragraphs):
+                sub_p = paragraphs[j].strip()
+                
+                # Check if we hit a new category
+                is_next_cat = False
+                sub_p_clean = sub_p.strip().lower().rstrip(':')
+                if sub_p_clean in category_keys_lower:
+                    is_next_cat = True
+                
+                if is_next_cat:
+                    break
+                
+                is_keyword = False
+                
+                # Fault Codes
+                if not fields_parsed['fault_codes']:
+                    fc_match = re.match(r'^(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))', 
+                                       sub_p, re.IGNORECASE | re.DOTALL)
+                    if fc_match:
+                        is_keyword = True
+                        fields_parsed['fault_codes'] = True
+                        val = fc_match.group(2).strip()
+                            
+                        if val.lower() not in ['n/a', 'none', 'null', '']:
+                            issue['fault_codes'] = extract_fault_codes(val)
+                        
+                        # Check if Why it happens is on the same line
+                        remaining = sub_p[fc_match.end():]
+                        why_match = re.search(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
+                                            remaining, re.IGNORECASE | re.DOTALL)
+                        if why_match:
+                            fields_parsed['why'] = True
+                            issue['why'] = why_match.group(2).strip()
+                
+                # Why it happens
+                if not is_keyword and not fields_parsed['why']:
+                    why_match = re.match(r'^(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
+                                        sub_p, re.IGNORECASE | re.DOTALL)
+                    if why_match:
+                        is_keyword = True
+                        fields_parsed['why'] = True
+                        fields_parsed['fault_codes'] = True
+                        val = why_match.group(2).strip()
+                        issue['why'] = val
+
+                # Symptoms
+                if not is_keyword and not fields_parsed['symptoms']:
+                    sym_match = re.match(r'^(Symptoms?)[\s:\-]*', sub_p, re.IGNORECASE)
+                    if sym_match:
+                        is_keyword = True
+                        fields_parsed['symptoms'] = True
+                        fields_parsed['fault_codes'] = True
+                        fields_parsed['why'] = True
+                        
+                        sym_content_match = re.match(r'^(Symptoms?)[\s:\-]+(.+?)$', sub_p, re.IGNORECASE | re.DOTALL)
+                        
+                        if sym_content_match:
+                            sym_text = sym_content_match.group(2).strip()
+                            if sym_text and not re.match(r'^(Parts to Replace|Brands)', sym_text, re.IGNORECASE):
+                                clean_sym = re.sub(r'^\d+[\.\)]\s*', '', sym_text).strip()
+                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_sym.lower() 
+                                           for s in issue['symptoms'])
+                                if not exists:
+                                    issue['symptoms'].append(sym_text)
+                        
+                        # Capture subsequent lines as symptoms
+                        k = j + 1
+                        while k < len(paragraphs):
+                            next_sub = paragraphs[k].strip()
+                            next_sub_clean = next_sub.strip().lower().rstrip(':')
+                            is_cat_header = next_sub_clean in category_keys_lower
+
+                            if (re.match(r'^(Parts to Replace|Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
+                                is_cat_header):
+                                break
+                            if next_sub:
+                                clean_next = re.sub(r'^\d+[\.\)]\s*', '', next_sub).strip()
+                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_next.lower() 
+                                           for s in issue['symptoms'])
+                                if not exists:
+                                    issue['symptoms'].append(next_sub)
+                            k += 1
+                        j = k - 1
+
+                # Parts to Replace
+                if not is_keyword and not fields_parsed['parts']:
+                    parts_match = re.match(r'^(Parts to Replace)[\s:\-]*', sub_p, re.IGNORECASE)
+                    if parts_match:
+                        is_keyword = True
+                        fields_parsed['parts'] = True
+                        fields_parsed['fault_codes'] = True
+                        fields_parsed['why'] = True
+                        fields_parsed['symptoms'] = True
+                        
+                        parts_content_match = re.match(r'^(Parts to Replace)[\s:\-]+(.+?)(?=(Brands|$))', 
+                                                       sub_p, re.IGNORECASE | re.DOTALL)
+                        
+                        if parts_content_match:
+                            part_text = parts_content_match.group(2).strip()
+                            if part_text and not re.match(r'^(Brands)', part_text, re.IGNORECASE):
+                                issue['parts'].append(extract_part_from_text(part_text, 
+                                                     paragraph_objects[j] if j < len(paragraph_objects) else None))
+                        
+                            # Check if Brands is on the same line
+                            remaining = sub_p[parts_content_match.end():]
+                            brands_match = re.search(r'(Brands)[\s:\-]+(.+?)$', remaining, re.IGNORECASE | re.DOTALL)
+                            if brands_match:
+                                fields_parsed['brands'] = True
+                                brands_text = brands_match.group(2).strip()
+                                if 'newparts Advantage:' in brands_text:
+                                    brands_text = brands_text.split('newparts Advantage:')[0].strip()
+                                if brands_text:
+                                    brand_list = [b.strip() for b in brands_text.replace(' and ', ',').split(',') if b.strip()]
+                                    issue['brands'] = [{'name': b, 'link': f"https://newparts.com/{b.replace(' ', '-')}"} 
+                                                      for b in brand_list]
+                        
+                        # Capture subsequent part lines
+                        k = j + 1
+                        while k < len(paragraphs):
+                            next_sub = paragraphs[k].strip()
+                            next_sub_clean = next_sub.strip().lower().rstrip(':')
+                            is_cat_header = next_sub_clean in category_keys_lower
+
+                            if (re.match(r'^(Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
+                                is_cat_header):
+                                break
+                            if next_sub:
+                                issue['parts'].append(extract_part_from_text(next_sub, 
+                                                     paragraph_objects[k] if k < len(paragraph_objects) else None))
+                            k += 1
+                        j = k - 1
+
+                # Brands
+                if not is_keyword and not fields_parsed['brands']:
+                    brands_match = re.match(r'^(Brands)[\s:\-]*\s*(.*)', sub_p, re.IGNORECASE)
+                    if brands_match:
+                        is_keyword = True
+                        fields_parsed['brands'] = True
+                        fields_parsed['fault_codes'] = True
+                        fields_parsed['why'] = True
+                        fields_parsed['symptoms'] = True
+                        fields_parsed['parts'] = True
+                        
+                        brands_text = brands_match.group(2).strip()
+                        if 'newparts Advantage:' in brands_text:
+                            brands_text = brands_text.split('newparts Advantage:')[0].strip()
+                        if brands_text:
+                            brand_list = [b.strip() for b in brands_text.replace(' and ', ',').split(',') if b.strip()]
+                            issue['brands'] = [{'name': b, 'link': f"https://newparts.com/{b.replace(' ', '-')}"} 
+                                              for b in brand_list]
+
+                # Implicit Symptoms
+                if not is_keyword and ':' in sub_p and issue['title'] and not fields_parsed['parts']:
+                    parts_split = sub_p.split(':', 1)
+                    key_candidate = parts_split[0].strip()
+                    if (len(key_candidate) < 50 and 
+                        not any(x in key_candidate.lower() for x in ['note', 'important']) and
+                        not re.match(r'^\d+[\.\)]', sub_p)):
+                        
+                        is_keyword = True
+                        fields_parsed['symptoms'] = True
+                        fields_parsed['fault_codes'] = True
+                        fields_parsed['why'] = True
+                        
+                        clean_sub = re.sub(r'^\d+[\.\)]\s*', '', sub_p).strip()
+                        exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_sub.lower() 
+                                   for s in issue['symptoms'])
+                        if not exists:
+                            issue['symptoms'].append(sub_p)
+                        
+                        # Capture subsequent lines
+                        k = j + 1
+                        while k < len(paragraphs):
+                            next_sub = paragraphs[k].strip()
+                            next_sub_clean = next_sub.strip().lower().rstrip(':')
+                            is_cat_header = next_sub_clean in category_keys_lower
+
+                            if (re.match(r'^(Parts to Replace|Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
+                                is_cat_header or
+                                re.match(r'^\d+[\.\)]', next_sub)):
+                                break
+                            if next_sub:
+                                clean_next = re.sub(r'^\d+[\.\)]\s*', '', next_sub).strip()
+                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_next.lower() 
+                                           for s in issue['symptoms'])
+                                if not exists:
+                                    issue['symptoms'].append(next_sub)
+                            k += 1
+                        j = k - 1
+                
+                if not is_keyword:
+                    if fields_parsed['brands']:
+                        break
+                    elif issue['why'] or issue['symptoms'] or issue['parts']:
+                        break
+                    else:
+                        if len(issue['title']) < 200:
+                            issue['title'] += " " + sub_p
+                
+                j += 1
+            
+            # Add issue to category
+            issue['title'] = re.sub(r'^\d+[\.\)]\s*', '', issue['title']).strip()
+            if issue['title']:
+                data['issues'][current_category].append(issue)
+            
+            i = j
+            continue
+
+        i += 1
+    
+    return data
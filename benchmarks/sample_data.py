@@ -0,0 +1,66 @@
+"""
+Parsed data for the sample Chevrolet Equinox 2.4L Ecotec guide, in the shape
+returned by parse_word_document(). Used by benchmarks that only need to render.
+"""
+from guide_model import Guide
+
+
+SAMPLE_ISSUES = {
+    'Brakes': ['Brake Pad Wear', 'Warped Brake Rotors', 'Brake Master Cylinder Failure', 'Brake Booster Failure'],
+    'Suspension': ['Suspension Shock Absorber Failure'],
+    'Ignition': ['Engine Misfire'],
+    'Steering': ['Power Steering Pump Failure'],
+    'Engine': ['Oil Consumption Issues', 'Oxygen Sensor Failure', 'Mass Air Flow (MAF) Sensor Failure',
+               'Excessive Carbon Buildup on Intake Valves', 'High Oil Pressure',
+               'Coolant Temperature Sensor Failure', 'EVAP System Leaks'],
+    'Fuel Delivery': ['Throttle Body Issues', 'Fuel Injector Failure', 'Crankshaft Position Sensor Failure',
+                      'Fuel Pump Failure'],
+    'Electrical System': ['Alternator Failure', 'Starter Motor Failure'],
+    'Driveline/Transmission': ['Slipping Clutch'],
+    'Others': ['Water Pump Failure'],
+}
+
+
+def _issue(title):
+    part = title.replace(' Failure', '')
+    return {
+        'title': title,
+        'fault_codes': 'P0300, P0301, P0171',
+        'why': f'The {part.lower()} wears over time due to heat cycles, mileage and contamination.',
+        'symptoms': [
+            'Warning light on the dashboard',
+            'Rough running or unusual noise under load',
+            'Reduced performance and fuel economy',
+        ],
+        'parts': [
+            {'name': part, 'description': f' is the component most often replaced for {title.lower()}.',
+             'link': f"https://newparts.com/{part.replace(' ', '-')}"},
+            {'name': f'{part} Kit', 'description': ' includes gaskets and hardware.',
+             'link': f"https://newparts.com/{part.replace(' ', '-')}-Kit"},
+        ],
+        'brands': [{'name': b, 'link': f'https://newparts.com/{b}'} for b in ('ACDelco', 'Bosch', 'Denso')],
+    }
+
+
+def sample_data():
+    """Return a fresh copy of the sample guide data."""
+    return Guide.from_dict({
+        'vehicle_heading': 'Chevrolet Equinox 2.4L Ecotec Platform Guide (2010-2017)',
+        'description_text': 'The 2.4L Ecotec LAF/LEA engine powered the second generation Equinox. '
+                            'This guide covers specifications and the most common repairs.',
+        'common_issues_heading': 'Top Common Issues with Chevrolet Equinox 2.4L',
+        'car_images': {
+            'front': 'https://admin.newparts.com/var/theme/images/EquinoxFront.jpeg',
+            'side': 'https://admin.newparts.com/var/theme/images/EquinoxSide.jpeg',
+            'rear': 'https://admin.newparts.com/var/theme/images/EquinoxRear.jpeg',
+            'quarter': 'https://admin.newparts.com/var/theme/images/EquinoxQuarter.jpeg',
+        },
+        'specs': {
+            'Engine and Powertrain': {'Engine': '2.4L Ecotec I4', 'Horsepower': '182 hp',
+                                      'Torque': '172 lb-ft', 'Transmission': '6-speed automatic'},
+            'Fuel Economy (EPA Estimates)': {'City MPG': '22', 'Highway MPG': '32', 'Combined MPG': '26'},
+            'Vehicle Weight': {'Curb Weight': '3,777 lbs', 'Towing Capacity': '1,500 lbs'},
+            'Configurations and Submodels': {'Drive Type': 'FWD / AWD', 'Trim Levels': 'LS, LT, LTZ'},
+        },
+        'issues': {category: [_issue(t) for t in titles] for category, titles in SAMPLE_ISSUES.items()},
+    })
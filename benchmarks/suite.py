@@ -0,0 +1,161 @@
+"""
+Benchmark suite: time each stage of a conversion on synthetic guides of
+several sizes and write the results as JSON. With --baseline the run is
+compared against an earlier results file and exits 1 on a regression.
+
+Stages: load (open the .docx and read paragraph records), flatten,
+spec_scan, issues, render and upload (POST /upload via the Flask test client).
+
+Usage: python -m benchmarks.suite [--issues 100 1000] [-n ROUNDS]
+                                  [--output results.json]
+                                  [--baseline old.json [--tolerance 0.25]]
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from generate_html import (read_paragraph_records, flatten_paragraphs, scan_specs,
+                           parse_issues, parse_word_document, READERS)
+from template_service import render_to_string
+from guide_model import Guide
+from benchmarks.synthetic import build_guide
+
+STAGES = ('load', 'flatten', 'spec_scan', 'issues', 'render', 'upload')
+
+
+def time_stage(fn, rounds):
+    """Run fn() `rounds` times; return timing stats in milliseconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def empty_front_matter():
+    return Guide()
+
+
+def upload(client, docx_bytes):
+    """POST one guide to /upload and read the whole (streamed) response."""
+    import app
+    # Every round must parse and render, not hit the result cache
+    app.result_cache.clear()
+    response = client.post('/upload', data={
+        'docx_file': (io.BytesIO(docx_bytes), 'guide.docx'),
+        'car_images': (io.BytesIO(b''), 'car_front.jpg'),
+    }, content_type='multipart/form-data')
+    body = response.get_data()
+    if response.status_code != 200:
+        raise RuntimeError(f'/upload returned {response.status_code}: {body[:200]!r}')
+    return body
+
+
+def bench_size(n_issues, args, client):
+    docx_bytes = build_guide(n_issues, seed=args.seed, specs=args.specs,
+                             symptoms=(min(2, args.symptoms), args.symptoms),
+                             parts=(1, args.parts))
+    records = list(read_paragraph_records(docx_bytes, args.reader))
+    paragraphs, line_hyperlinks = flatten_paragraphs(records)
+    common_issues_index = scan_specs(paragraphs, empty_front_matter())
+    data = parse_word_document(docx_bytes, car_images={}, reader=args.reader)
+
+    stages = {
+        'load': lambda: list(read_paragraph_records(docx_bytes, args.reader)),
+        'flatten': lambda: flatten_paragraphs(records),
+        'spec_scan': lambda: scan_specs(paragraphs, empty_front_matter()),
+        'issues': lambda: parse_issues(paragraphs, line_hyperlinks, common_issues_index, defaultdict(list)),
+        'render': lambda: render_to_string(data),
+        'upload': lambda: upload(client, docx_bytes),
+    }
+    # Warm up once so template compilation and imports are not timed
+    for fn in stages.values():
+        fn()
+    return {
+        'docx_bytes': len(docx_bytes),
+        'lines': len(paragraphs),
+        'issues': data.issue_count,
+        'stages': {name: time_stage(stages[name], args.rounds) for name in STAGES},
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return a list of regression messages (median slower than baseline by more than tolerance)."""
+    regressions = []
+    for size, result in results['sizes'].items():
+        old = baseline.get('sizes', {}).get(size)
+        if old is None:
+            continue
+        for stage, stats in result['stages'].items():
+            if stage not in old['stages']:
+                continue
+            before = old['stages'][stage]['median_ms']
+            after = stats['median_ms']
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                regressions.append(f'{size} issues / {stage}: {before:.2f} ms -> {after:.2f} ms '
+                                   f'(+{(after / before - 1) * 100 if before else float("inf"):.0f}%)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, nargs='+', default=[100, 1000], help='guide sizes (issues per guide)')
+    parser.add_argument('-n', '--rounds', type=int, default=5)
+    parser.add_argument('--specs', type=int, default=8, help='spec lines per guide')
+    parser.add_argument('--symptoms', type=int, default=5, help='maximum symptom lines per issue')
+    parser.add_argument('--parts', type=int, default=3, help='maximum part lines per issue')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reader', choices=READERS, default='python-docx')
+    parser.add_argument('-o', '--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown of a stage median before it counts as a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this many milliseconds')
+    args = parser.parse_args()
+
+    import app
+    client = app.app.test_client()
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {k: getattr(args, k) for k in ('rounds', 'specs', 'symptoms', 'parts', 'seed', 'reader')},
+        'sizes': {},
+    }
+    for n_issues in args.issues:
+        result = bench_size(n_issues, args, client)
+        results['sizes'][str(n_issues)] = result
+        print(f"{n_issues} issues ({result['lines']} lines, {result['docx_bytes'] / 1024:.0f} KB), "
+              f"median of {args.rounds}:")
+        for stage, stats in result['stages'].items():
+            print(f"  {stage:10s} {stats['median_ms']:10.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for message in regressions:
+            print(f'REGRESSION {message}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
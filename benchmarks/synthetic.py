@@ -0,0 +1,79 @@
+"""
+Synthetic Vehicle Platform Guide .docx generator for benchmarks.
+"""
+import io
+import random
+
+import docx
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml.ns import qn
+from docx.oxml.shared import OxmlElement
+
+from generate_html import CATEGORY_MAP
+
+WORDS = ('pump sensor valve leak noise rough idle stall hesitation coil plug pad rotor bearing '
+         'strut wear vibration overheating coolant gasket seal actuator module relay harness').split()
+BRANDS = ('ACDelco', 'Bosch', 'Denso', 'NGK', 'Febi Bilstein', 'Lemforder', 'Mahle', 'Gates')
+
+
+def add_hyperlink(paragraph, text, url):
+    """Append a real w:hyperlink (with an external relationship) to a paragraph."""
+    r_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    run = OxmlElement('w:r')
+    t = OxmlElement('w:t')
+    t.text = text
+    t.set(qn('xml:space'), 'preserve')
+    run.append(t)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def _words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+SPEC_KEYS = ('Engine', 'Horsepower', 'Torque', 'Transmission', 'City MPG', 'Highway MPG', 'Curb Weight', 'Drive Type')
+
+
+def build_guide(n_issues=500, seed=0, symptoms=(2, 5), specs=8, issues_per_header=10, parts=(1, 3)):
+    """
+    Build a synthetic guide and return the .docx bytes: `specs` spec lines,
+    n_issues issues with a category header (from CATEGORY_MAP) every
+    issues_per_header issues, and a (min, max) number of symptom lines and
+    hyperlinked part lines per issue.
+    """
+    rng = random.Random(seed)
+    headers = list(CATEGORY_MAP)
+    d = docx.Document()
+    d.add_paragraph(f'Vehicle Platform Guide: Synthetic Vehicle {seed} 2.0L (2010–2020)')
+    d.add_paragraph('This synthetic guide exercises the parser with a realistic mix of specifications and issues.')
+    d.add_paragraph('Specifications')
+    for i in range(specs):
+        key = SPEC_KEYS[i % len(SPEC_KEYS)]
+        if i >= len(SPEC_KEYS):
+            key = f'{key} {i // len(SPEC_KEYS) + 1}'
+        d.add_paragraph(f'{key}: {_words(rng, 2)}')
+    d.add_paragraph('Top Common Issues with Synthetic Vehicle')
+
+    for n in range(n_issues):
+        if n % issues_per_header == 0:
+            d.add_paragraph(rng.choice(headers))
+        d.add_paragraph(f'{n % issues_per_header + 1}. {_words(rng, 3).title()} Failure')
+        d.add_paragraph(f'Fault Codes: P0{rng.randint(100, 999)}, P0{rng.randint(100, 999)}')
+        d.add_paragraph(f'Why it happens: {_words(rng, 12)}')
+        d.add_paragraph('Symptoms:')
+        for k in range(rng.randint(*symptoms)):
+            d.add_paragraph(f'{k + 1}. {_words(rng, 5)}')
+        d.add_paragraph('Parts to Replace:')
+        for _ in range(rng.randint(*parts)):
+            name = _words(rng, 2).title()
+            p = d.add_paragraph()
+            add_hyperlink(p, name, f"https://newparts.com/{name.replace(' ', '-')}?utm_source=guide")
+            p.add_run(f' is the {_words(rng, 4)}')
+        d.add_paragraph('Brands: ' + ', '.join(rng.sample(BRANDS, 3)))
+
+    buf = io.BytesIO()
+    d.save(buf)
+    return buf.getvalue()
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+from atomic_write import atomic_open
+from precompress import remove_siblings
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_PATH = '.vpg-build.json'
+
+
+def file_digest(path):
+    """sha256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def images_digest(car_images):
+    """Hash of the view -> URL map a guide was rendered with."""
+    return hashlib.sha256(json.dumps(car_images, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """
+    Record of what each batch output was built from: the content hash of
+    the .docx, the template hash, the image-set hash and the hash of the
+    HTML written. A guide is up to date when all four still match. File
+    hashes are reused while a file's size and mtime are unchanged, so an
+    unchanged tree costs one stat per file.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('version') == MANIFEST_VERSION:
+            self.entries = saved['guides']
+
+    def _fingerprint(self, path, recorded=None):
+        """{'hash', 'size', 'mtime_ns'} for path, reusing recorded['hash'] if size and mtime match."""
+        st = os.stat(path)
+        if recorded and recorded['size'] == st.st_size and recorded['mtime_ns'] == st.st_mtime_ns:
+            return recorded
+        return {'hash': file_digest(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def is_fresh(self, docx_path, output_path, template_hash, car_images):
+        """True if output_path was built from the current docx, template and images and is untouched."""
+        entry = self.entries.get(docx_path)
+        if (entry is None or entry['output_path'] != output_path or entry['template'] != template_hash
+                or entry['images'] != images_digest(car_images)):
+            return False
+        try:
+            docx = self._fingerprint(docx_path, entry['docx'])
+            output = self._fingerprint(output_path, entry['output'])
+        except OSError:
+            return False
+        if docx['hash'] != entry['docx']['hash'] or output['hash'] != entry['output']['hash']:
+            return False
+        # Same content with a new mtime (e.g. a fresh checkout): remember the new stat
+        entry['docx'], entry['output'] = docx, output
+        return True
+
+    def record(self, docx_path, output_path, template_hash, car_images, docx_hash=None):
+        """
+        Remember a successful build of docx_path. When the build came from
+        data parsed earlier, docx_hash is the hash of the .docx it was parsed
+        from; if the .docx has changed (or is gone) since, the guide is
+        forgotten instead so the next run rebuilds it.
+        """
+        recorded = self.entries.get(docx_path, {}).get('docx') if docx_hash is not None else None
+        try:
+            docx = self._fingerprint(docx_path, recorded)
+        except OSError:
+            if docx_hash is None:
+                raise
+            docx = None
+        if docx_hash is not None and (docx is None or docx['hash'] != docx_hash):
+            self.forget(docx_path)
+            return
+        self.entries[docx_path] = {
+            'output_path': output_path,
+            'docx': docx,
+            'template': template_hash,
+            'images': images_digest(car_images),
+            'output': self._fingerprint(output_path),
+        }
+
+    def forget(self, docx_path):
+        self.entries.pop(docx_path, None)
+
+    def orphans(self, docx_paths):
+        """Entries whose .docx is no longer among docx_paths: {docx_path: entry}."""
+        current = set(docx_paths)
+        return {docx_path: entry for docx_path, entry in self.entries.items() if docx_path not in current}
+
+    def prune(self, docx_paths):
+        """
+        Delete the outputs of guides whose .docx is gone and drop their
+        entries. Outputs edited since they were built are left in place.
+        Returns (deleted, kept) lists of output paths.
+        """
+        deleted, kept = [], []
+        for docx_path, entry in self.orphans(docx_paths).items():
+            output_path = entry['output_path']
+            try:
+                if self._fingerprint(output_path, entry['output'])['hash'] == entry['output']['hash']:
+                    os.remove(output_path)
+                    remove_siblings(output_path)
+                    deleted.append(output_path)
+                else:
+                    kept.append(output_path)
+            except OSError:
+                pass  # already gone
+            self.forget(docx_path)
+        return deleted, kept
+
+    def save(self):
+        # Written atomically so an interrupted run never leaves a partial manifest
+        with atomic_open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'guides': self.entries}, f, indent=1, sort_keys=True)
@@ -0,0 +1,129 @@
+import json
+import posixpath
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def plan_bulk_zip(zf):
+    """
+    Group the entries of an uploaded ZIP into guides. Every .docx is one guide;
+    its images are the image files in the same folder, or in a subfolder
+    (such as 'Car images/') of a folder that holds the .docx.
+    Returns a list of {'docx': entry, 'output': html name, 'images': [names]}.
+    """
+    names = [info.filename for info in zf.infolist()
+             if not info.is_dir() and not posixpath.basename(info.filename).startswith('.')
+             and not info.filename.startswith('__MACOSX/')]
+    docx_names = [n for n in names if n.lower().endswith('.docx')]
+    docx_dirs = {posixpath.dirname(n) for n in docx_names}
+
+    images_by_dir = {}
+    for name in names:
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        folder = posixpath.dirname(name)
+        if folder not in docx_dirs:
+            folder = posixpath.dirname(folder)
+        images_by_dir.setdefault(folder, []).append(posixpath.basename(name))
+
+    return [{'docx': name,
+             'output': posixpath.splitext(name)[0] + '.html',
+             'images': images_by_dir.get(posixpath.dirname(name), [])}
+            for name in docx_names]
+
+
+def iter_conversions(zf, plan, car_images_for, submit, window=8, read_docx=None):
+    """
+    Convert the planned guides and yield (entry, html, manifest_record) as each
+    finishes. submit(docx_bytes, car_images) must return a Future of
+    (html, timings). At most `window` documents are read and in flight at once.
+    read_docx(zf, name) returns the bytes of a .docx entry (zf.read() by
+    default); if it raises, that guide fails on its own.
+    """
+    pending = {}
+    queue = iter(plan)
+
+    def start_next():
+        for entry in queue:
+            started = time.perf_counter()
+            try:
+                docx_bytes = read_docx(zf, entry['docx']) if read_docx else zf.read(entry['docx'])
+                car_images = car_images_for(entry['images'])
+                pending[submit(docx_bytes, car_images)] = (entry, started)
+            except Exception as e:
+                yield entry, None, _record(entry, started, error=str(e))
+                continue
+            if len(pending) >= window:
+                return
+
+    yield from start_next()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            entry, started = pending.pop(future)
+            try:
+                html, timings = future.result()
+            except Exception as e:
+                yield entry, None, _record(entry, started, error=str(e))
+            else:
+                yield entry, html, _record(entry, started, timings=timings)
+        yield from start_next()
+
+
+def _record(entry, started, timings=None, error=None):
+    return {
+        'docx': entry['docx'],
+        'output': entry['output'] if error is None else None,
+        'images': entry['images'],
+        'error': error,
+        'seconds': round(time.perf_counter() - started, 4),
+        'timings': {stage: round(t, 4) for stage, t in (timings or {}).items()},
+    }
+
+
+class _ChunkBuffer:
+    """Write-only file object that hands its contents out in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(conversions):
+    """
+    Yield the bytes of a ZIP archive holding the HTML of each conversion as
+    it arrives, followed by manifest.json. Only one entry is buffered at a time.
+    """
+    buffer = _ChunkBuffer()
+    manifest = []
+    started = time.perf_counter()
+    # The buffer is not seekable, so zipfile writes streaming data descriptors
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as out:
+        for entry, html, record in conversions:
+            manifest.append(record)
+            if html is not None:
+                out.writestr(entry['output'], html)
+            chunk = buffer.take()
+            if chunk:
+                yield chunk
+        out.writestr('manifest.json', json.dumps({
+            'files': manifest,
+            'converted': sum(1 for r in manifest if r['error'] is None),
+            'failed': sum(1 for r in manifest if r['error'] is not None),
+            'seconds': round(time.perf_counter() - started, 4),
+        }, indent=2))
+    yield buffer.take()
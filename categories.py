@@ -0,0 +1,119 @@
+"""
+Spec categories and issue category headers, loaded from categories.json
+(or the file named by VPG_CATEGORIES) and compiled once at import.
+
+A spec line belongs to the category with the lowest priority number among
+those with a keyword in its lowercased key. All keywords are matched by
+one regex in a single pass over the key, and the regex is a trie of the
+keywords, so the work at each position depends on the key's characters
+rather than the number of rules: adding categories for new vehicle lines
+doesn't slow classification down. Issue category headers are looked up
+in a dict by their lowercased text, without a trailing colon.
+"""
+import hashlib
+import json
+import os
+import re
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'categories.json')
+
+
+def _trie_pattern(words):
+    """
+    Regex matching any of words, factored into a trie so the branches at
+    each step start with different characters; it matches the longest word.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # At the end of a word, try to go on to a longer one first
+        return f'(?:{body})?' if '' in node else body
+
+    return pattern(trie)
+
+
+class CategoryRules:
+    """Compiled form of a categories config (see categories.json for the layout)."""
+
+    def __init__(self, config, version=''):
+        self.version = version
+        spec_categories = config['spec_categories']
+        issue_categories = config['issue_categories']
+
+        # Display order, as the template shows them
+        self.spec_names = tuple(category['name'] for category in spec_categories)
+        self.issue_names = tuple(category['name'] for category in issue_categories)
+        for kind, names in (('spec', self.spec_names), ('issue', self.issue_names)):
+            if len(set(names)) != len(names):
+                raise ValueError(f'Duplicate {kind} category name in the categories config')
+
+        # Keyword -> rank of its category, the lowest rank if several share it
+        ranked = sorted(spec_categories, key=lambda category: category['priority'])
+        self._ranked_names = tuple(category['name'] for category in ranked)
+        ranks = {}
+        for rank, category in enumerate(ranked):
+            if not category['keywords']:
+                raise ValueError(f"Spec category {category['name']!r} has no keywords")
+            for keyword in category['keywords']:
+                if not keyword:
+                    raise ValueError(f"Spec category {category['name']!r} has an empty keyword")
+                ranks.setdefault(keyword.lower(), rank)
+        # Every keyword matching at one position of a key is a prefix of the
+        # longest one, so the best rank there is known from the longest match
+        self._best_rank = {keyword: min(ranks[keyword[:end]] for end in range(1, len(keyword) + 1)
+                                        if keyword[:end] in ranks)
+                           for keyword in ranks}
+        # The lookahead makes every position of the key a candidate
+        self._spec_re = re.compile(f'(?=({_trie_pattern(ranks)}))')
+
+        # Header as written -> category, and the lowercased form used for lookups
+        self.header_map = {}
+        for category in issue_categories:
+            for header in category['headers']:
+                self.header_map[header] = category['name']
+        self.header_lookup = {}
+        for header, name in self.header_map.items():
+            key = header.lower()
+            if self.header_lookup.setdefault(key, name) != name:
+                raise ValueError(f'Issue category header {header!r} maps to more than one category')
+
+    def spec_category(self, key):
+        """The spec category of a spec key, or None if no keyword matches."""
+        best = None
+        for match in self._spec_re.finditer(key.lower()):
+            rank = self._best_rank[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return None if best is None else self._ranked_names[best]
+
+    def issue_category(self, line):
+        """The issue category a header line stands for, or None."""
+        return self.header_lookup.get(line.lower().rstrip(':'))
+
+
+def load_rules(path=None):
+    """Read and compile a categories config; the version is a hash of the file."""
+    path = path or os.environ.get('VPG_CATEGORIES') or DEFAULT_RULES_PATH
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        config = json.loads(raw)
+        return CategoryRules(config, version=hashlib.sha256(raw).hexdigest()[:16])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f'Invalid categories config {path}: missing or malformed {e}') from e
+    except ValueError as e:
+        raise ValueError(f'Invalid categories config {path}: {e}') from e
+
+
+RULES = load_rules()
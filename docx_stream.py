@@ -0,0 +1,131 @@
+"""
+Streaming .docx reader built on zipfile + lxml.etree.iterparse.
+
+Yields one lightweight ParagraphRecord per body paragraph instead of building
+the python-docx object model, and frees each paragraph's XML as soon as it
+has been read. The records have the same text and hyperlinks python-docx
+reports for doc.paragraphs, so parse_word_document() can run on either.
+"""
+import posixpath
+import zipfile
+from typing import NamedTuple
+
+from lxml import etree
+
+from generate_html import clean_url
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_DOCUMENT_REL = R_NS + '/officeDocument'
+
+W_BODY = f'{{{W_NS}}}body'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_T = f'{{{W_NS}}}t'
+W_HYPERLINK = f'{{{W_NS}}}hyperlink'
+W_TYPE = f'{{{W_NS}}}type'
+R_ID = f'{{{R_NS}}}id'
+
+# Run children with a text equivalent, matching python-docx's Run.text
+_RUN_TEXT = {
+    f'{{{W_NS}}}tab': '\t',
+    f'{{{W_NS}}}ptab': '\t',
+    f'{{{W_NS}}}cr': '\n',
+    f'{{{W_NS}}}noBreakHyphen': '-',
+}
+W_BR = f'{{{W_NS}}}br'
+
+
+class ParagraphRecord(NamedTuple):
+    """Text of one body paragraph and its [(hyperlink_text, url), ...]."""
+    text: str
+    hyperlinks: list
+
+
+def _run_text(r):
+    chunks = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            chunks.append(child.text or '')
+        elif tag == W_BR:
+            # Only line breaks count; page and column breaks are empty
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                chunks.append('\n')
+        else:
+            chunks.append(_RUN_TEXT.get(tag, ''))
+    return ''.join(chunks)
+
+
+def paragraph_text(p):
+    """Text of a w:p element, computed the way python-docx's Paragraph.text is."""
+    chunks = []
+    for child in p:
+        if child.tag == W_R:
+            chunks.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            chunks.extend(_run_text(r) for r in child if r.tag == W_R)
+    return ''.join(chunks)
+
+
+def paragraph_hyperlinks(p, rels):
+    """
+    Hyperlinks of a w:p element as [(hyperlink_text, url), ...], resolved
+    through rels (r:id -> target) and cleaned like
+    extract_hyperlinks_from_paragraph() does.
+    """
+    hyperlinks = []
+    for hl_elem in p.iter(W_HYPERLINK):
+        hyperlink_text = ''.join(t.text for t in hl_elem.iter(W_T) if t.text)
+        r_id = hl_elem.get(R_ID)
+        if r_id and hyperlink_text and r_id in rels:
+            hyperlinks.append((hyperlink_text.strip(), clean_url(rels[r_id])))
+    return hyperlinks
+
+
+def _read_rels(zf, rels_path):
+    """Return {Id: Target} for a .rels part, or {} if the part is missing."""
+    try:
+        data = zf.read(rels_path)
+    except KeyError:
+        return {}
+    root = etree.fromstring(data)
+    return {rel.get('Id'): rel.get('Target') for rel in root.iter(f'{{{PKG_REL_NS}}}Relationship')}
+
+
+def main_document_path(zf):
+    """Locate the main document part through the package relationships."""
+    try:
+        root = etree.fromstring(zf.read('_rels/.rels'))
+    except KeyError:
+        return 'word/document.xml'
+    for rel in root.iter(f'{{{PKG_REL_NS}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT_REL:
+            return rel.get('Target').lstrip('/')
+    return 'word/document.xml'
+
+
+def iter_paragraph_records(docx_source):
+    """
+    Yield a ParagraphRecord for every body-level paragraph of a .docx, in
+    document order. docx_source is a path or a binary file-like object.
+    Elements are cleared behind the parser so memory stays flat.
+    """
+    with zipfile.ZipFile(docx_source) as zf:
+        document_path = main_document_path(zf)
+        part_dir, part_name = posixpath.split(document_path)
+        rels = _read_rels(zf, posixpath.join(part_dir, '_rels', part_name + '.rels'))
+
+        with zf.open(document_path) as xml_file:
+            for _, p in etree.iterparse(xml_file, events=('end',), tag=W_P,
+                                        resolve_entities=False, huge_tree=True):
+                parent = p.getparent()
+                # Paragraphs inside tables, text boxes etc. are not part of
+                # doc.paragraphs; they are freed with their body-level ancestor
+                if parent is None or parent.tag != W_BODY:
+                    continue
+                yield ParagraphRecord(paragraph_text(p), paragraph_hyperlinks(p, rels))
+                p.clear()
+                while p.getprevious() is not None:
+                    del parent[0]
@@ -1,9 +1,14 @@
 import docx
-from jinja2 import Template
 import re
 import os
+import io
+import sys
 from docx.oxml.ns import qn
 from datetime import datetime
+from template_service import render_to_file
+from metrics import stage
+from categories import RULES
+from guide_model import Guide, Issue, Part, brand
 
 def find_car_images(images_folder=None):
     """
@@ -13,13 +18,20 @@ def find_car_images(images_folder=None):
     Image filename pattern: Car images contain view keywords.
     Examples: MBAMGGLA352.0LFron.jpeg, xyzfront.jpg, xyz-front.png
     """
-    car_images = {
-        'front': '',
-        'side': '',
-        'rear': '',
-        'quarter': ''
-    }
+    folder_to_use = find_car_images_folder(images_folder)
     
+    if not folder_to_use:
+        return {
+            'front': '',
+            'side': '',
+            'rear': '',
+            'quarter': ''
+        }
+    
+    return match_car_images(os.listdir(folder_to_use))
+
+def find_car_images_folder(images_folder=None):
+    """Return the car images folder find_car_images() reads, or None if there is none."""
     # Try to find the car images folder with various naming conventions
     possible_folder_names = [
         'Car images',
@@ -46,24 +58,34 @@ def find_car_images(images_folder=None):
                 folder_to_use = folder_name
                 break
     
-    if not folder_to_use:
-        return car_images
-    
-    # Get all image files
-    image_files = [f for f in os.listdir(folder_to_use) 
+    return folder_to_use
+
+# View patterns with variations for fuzzy matching of car image filenames
+VIEW_PATTERNS = {
+    'front': ['front', 'fron', 'fro', 'frnt'],
+    'side': ['side', 'sid'],
+    'rear': ['rear', 'rea'],
+    'quarter': ['quarter', 'quattr', 'quater', 'quatr', 'quar', 'qua', 'quat']
+}
+
+def match_car_images(filenames):
+    """
+    Match image filenames to car views without touching the filesystem.
+    Returns the same dict as find_car_images() for the given filenames.
+    """
+    car_images = {
+        'front': '',
+        'side': '',
+        'rear': '',
+        'quarter': ''
+    }
+
+    image_files = [f for f in filenames
                    if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
     
     if not image_files:
         return car_images
     
-    # Define view patterns with variations for fuzzy matching
-    view_patterns = {
-        'front': ['front', 'fron', 'fro', 'frnt'],
-        'side': ['side', 'sid'],
-        'rear': ['rear', 'rea'],
-        'quarter': ['quarter', 'quattr', 'quater', 'quatr', 'quar', 'qua', 'quat']
-    }
-    
     # Search for car view images
     for img_file in image_files:
         filename_lower = img_file.lower()
@@ -72,7 +94,7 @@ def find_car_images(images_folder=None):
         filename_normalized = filename_without_ext.replace('-', '').replace('_', '').replace(' ', '')
         
         # Check each view type
-        for view_type, patterns in view_patterns.items():
+        for view_type, patterns in VIEW_PATTERNS.items():
             # Skip if we already found this view
             if car_images[view_type]:
                 continue
@@ -133,72 +155,240 @@ def extract_hyperlinks_from_paragraph(paragraph, doc):
     
     return hyperlinks
 
-def categorize_spec(key, value):
-    """Categorize specification based on key content."""
-    key_lower = key.lower()
+# Category headers in the issues section and the issue category they map to
+# (from the categories config, see categories.py)
+CATEGORY_MAP = RULES.header_map
+
+# Lowercased header -> category, for case-insensitive O(1) lookups
+CATEGORY_LOOKUP = RULES.header_lookup
+
+# Precompiled patterns for the issues section
+TITLE_FAULT_CODES_RE = re.compile(r'(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))',
+                                  re.IGNORECASE)
+TITLE_WHY_RE = re.compile(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', re.IGNORECASE)
+TITLE_SYMPTOMS_RE = re.compile(r'(Symptoms?)[\s:\-]+(.+?)(?=(Parts to Replace|Brands|$))', re.IGNORECASE)
+FAULT_CODES_RE = re.compile(r'(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))',
+                            re.IGNORECASE | re.DOTALL)
+WHY_RE = re.compile(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', re.IGNORECASE | re.DOTALL)
+SYMPTOMS_PREFIX_RE = re.compile(r'(Symptoms?)[\s:\-]*', re.IGNORECASE)
+SYM_CONTENT_RE = re.compile(r'(Symptoms?)[\s:\-]+(.+?)$', re.IGNORECASE | re.DOTALL)
+PARTS_PREFIX_RE = re.compile(r'(Parts to Replace)[\s:\-]*', re.IGNORECASE)
+PARTS_CONTENT_RE = re.compile(r'(Parts to Replace)[\s:\-]+(.+?)(?=(Brands|$))', re.IGNORECASE | re.DOTALL)
+PARTS_OR_BRANDS_RE = re.compile(r'(Parts to Replace|Brands)', re.IGNORECASE)
+BRANDS_WORD_RE = re.compile(r'(Brands)', re.IGNORECASE)
+BRANDS_RE = re.compile(r'(Brands)[\s:\-]*\s*(.*)', re.IGNORECASE)
+INLINE_BRANDS_RE = re.compile(r'(Brands)[\s:\-]+(.+?)$', re.IGNORECASE | re.DOTALL)
+NUMBERED_RE = re.compile(r'\d+[\.\)]')
+NUMBER_PREFIX_RE = re.compile(r'^\d+[\.\)]\s*')
+URL_IN_PARENS_RE = re.compile(r'\s*\(\s*https?://[^\)]+\s*\)')
+URL_GROUP_RE = re.compile(r'\s*\(\s*(https?://[^\)]+)\s*\)')
+NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+# Line kinds returned by classify_line()
+LINE_CATEGORY = 'category'
+LINE_FAULT_CODES = 'fault_codes'
+LINE_WHY = 'why'
+LINE_SYMPTOMS = 'symptoms'
+LINE_PARTS = 'parts'
+LINE_BRANDS = 'brands'
+LINE_NUMBERED = 'numbered'
+LINE_TEXT = 'text'
+
+def classify_line(line):
+    """
+    Classify one line of the issues section.
+    Returns (kind, detail): the category name for category headers, the regex
+    match for Fault Codes / Why it happens / Brands lines, otherwise None.
+    The keyword prefixes are mutually exclusive, so the first match wins.
+    """
+    category = RULES.issue_category(line)
+    if category:
+        return LINE_CATEGORY, category
+    # Only lines starting with a keyword's first letter can be keyword lines
+    # ('ſ' case-folds to 's' under re.IGNORECASE)
+    first = line[:1].lower()
+    if first == 'f':
+        m = FAULT_CODES_RE.match(line)
+        if m:
+            return LINE_FAULT_CODES, m
+    elif first == 'w':
+        m = WHY_RE.match(line)
+        if m:
+            return LINE_WHY, m
+    elif first == 's' or first == '\u017f':
+        if SYMPTOMS_PREFIX_RE.match(line):
+            return LINE_SYMPTOMS, None
+    elif first == 'p':
+        if PARTS_PREFIX_RE.match(line):
+            return LINE_PARTS, None
+    elif first == 'b':
+        m = BRANDS_RE.match(line)
+        if m:
+            return LINE_BRANDS, m
+    elif NUMBERED_RE.match(line):
+        return LINE_NUMBERED, None
+    return LINE_TEXT, None
+
+def split_issue_title(text):
+    """
+    Split an issue title line that may also carry Fault Codes, Why it happens
+    and Symptoms inline. Returns (title, fault_codes, why).
+    """
+    title_text = text
+    fault_codes_inline = ''
+    why_inline = ''
+    
+    # Check if multiple fields are on the title line
+    remaining_text = title_text
+    
+    # Extract Fault Codes if present
+    fc_match = TITLE_FAULT_CODES_RE.search(remaining_text)
+    if fc_match:
+        title_text = remaining_text[:fc_match.start()].strip()
+        fault_codes_inline = fc_match.group(2).strip()
+        remaining_text = remaining_text[fc_match.end():]
     
-    if any(x in key_lower for x in ['engine', 'horse', 'torque', 'transmission', 'fuel type', 'displacement', 'cylinders']):
-        return 'Engine and Powertrain'
-    elif any(x in key_lower for x in ['drive', 'configuration', 'submodel', 'trim', 'body', 'door', 'seat', 'capacity']):
-        return 'Configurations and Submodels'
-    elif any(x in key_lower for x in ['mpg', 'fuel economy', 'city', 'highway', 'combined']):
-        return 'Fuel Economy (EPA Estimates)'
-    elif any(x in key_lower for x in ['weight', 'payload', 'towing', 'gvwr']):
-        return 'Vehicle Weight'
-    return None  # Return None for 'Other Specifications' to skip them
-
-def parse_word_document(docx_path):
-    """Parse Word document and extract vehicle platform guide data."""
-    doc = docx.Document(docx_path)
+    # Extract Why it happens if present
+    why_match = TITLE_WHY_RE.search(remaining_text)
+    if why_match:
+        if not fc_match:
+            title_text = remaining_text[:why_match.start()].strip()
+        why_inline = why_match.group(2).strip()
+        remaining_text = remaining_text[why_match.end():]
     
+    # Extract Symptoms if present on same line
+    sym_match = TITLE_SYMPTOMS_RE.search(remaining_text)
+    if sym_match:
+        if not fc_match and not why_match:
+            title_text = remaining_text[:sym_match.start()].strip()
+    
+    return title_text, fault_codes_inline, why_inline
+
+def is_symptom_label(line):
+    """True if the text before the first ':' looks like an implicit symptom label."""
+    key_candidate = line.split(':', 1)[0].strip()
+    key_lower = key_candidate.lower()
+    return len(key_candidate) < 50 and 'note' not in key_lower and 'important' not in key_lower
+
+def parse_brands(brands_text):
+    """Turn 'A, B and C' into Brands, dropping any 'newparts Advantage:' tail."""
+    brands_text = brands_text.strip()
+    if 'newparts Advantage:' in brands_text:
+        brands_text = brands_text.split('newparts Advantage:')[0].strip()
+    if not brands_text:
+        return []
+    brand_list = [b.strip() for b in brands_text.replace(' and ', ',').split(',') if b.strip()]
+    return [brand(b) for b in brand_list]
+
+W_BODY = qn('w:body')
+W_HYPERLINK = qn('w:hyperlink')
+W_T = qn('w:t')
+R_ID = qn('r:id')
+
+# Available .docx readers for parse_word_document(); VPG_DOCX_READER picks the default
+READERS = ('python-docx', 'stream')
+DEFAULT_READER = os.environ.get('VPG_DOCX_READER', 'python-docx')
+
+def build_hyperlink_index(doc):
+    """
+    Collect the hyperlinks of every body paragraph in one pass over the document.
+    Returns a list aligned with doc.paragraphs; each entry is the
+    [(hyperlink_text, url), ...] list extract_hyperlinks_from_paragraph()
+    would return for that paragraph. Each r:id is resolved and cleaned once.
+    """
+    body = doc.element.body
+    body_paragraphs = body.p_lst
+    position = {p: i for i, p in enumerate(body_paragraphs)}
+    index = [[] for _ in body_paragraphs]
+    rels = doc.part.rels
+    urls = {}
+    
+    for hl_elem in body.iter(W_HYPERLINK):
+        # Get the text from the hyperlink
+        hyperlink_text = ''.join(t.text for t in hl_elem.iter(W_T) if t.text)
+        r_id = hl_elem.get(R_ID)
+        if not r_id or not hyperlink_text:
+            continue
+        
+        # Walk up to the body-level paragraph; links in tables are not in doc.paragraphs
+        node = hl_elem
+        while node is not None and node.getparent() is not None and node.getparent().tag != W_BODY:
+            node = node.getparent()
+        i = position.get(node)
+        if i is None:
+            continue
+        
+        if r_id not in urls:
+            rel = rels.get(r_id)
+            # Clean the URL to remove any query parameters or fragments
+            urls[r_id] = clean_url(rel.target_ref) if rel is not None else None
+        if urls[r_id] is not None:
+            index[i].append((hyperlink_text.strip(), urls[r_id]))
+    
+    return index
+
+def categorize_spec(key, value):
+    """Categorize specification based on key content (keywords from the categories config)."""
+    return RULES.spec_category(key)  # None for 'Other Specifications', which are skipped
+
+def read_paragraph_records(docx_source, reader=DEFAULT_READER):
+    """
+    Open a .docx and return an iterable of (paragraph_text, hyperlinks) for
+    its body paragraphs. docx_source can be a path, a file-like object or
+    the raw .docx bytes. reader selects how the .docx is read: 'python-docx'
+    builds the full object model, 'stream' uses the zipfile/iterparse reader
+    in docx_stream (which reads lazily as the records are consumed).
+    """
+    if isinstance(docx_source, (bytes, bytearray)):
+        docx_source = io.BytesIO(docx_source)
+    if reader == 'stream':
+        from docx_stream import iter_paragraph_records
+        return iter_paragraph_records(docx_source)
+    if reader == 'python-docx':
+        doc = docx.Document(docx_source)
+        # Hyperlinks are indexed once for the whole document
+        return zip((p.text for p in doc.element.body.p_lst), build_hyperlink_index(doc))
+    raise ValueError(f"Unknown docx reader: {reader!r} (expected one of {', '.join(READERS)})")
+
+def flatten_paragraphs(paragraph_records):
+    """
+    Turn paragraph records into the cleaned, non-empty lines the parser
+    works on. Returns (lines, line_hyperlinks) where line_hyperlinks[i] is
+    the hyperlink list of the paragraph line i came from.
+    """
     # Replace en-dashes and em-dashes with normal hyphens
     # Split by \n to handle multi-field paragraphs
-    # Store paragraph objects for hyperlink extraction
+    # Keep each line's paragraph hyperlinks for part extraction
     paragraphs = []
-    paragraph_objects = []
-    for p in doc.paragraphs:
-        text = p.text.strip().replace('–', '-').replace('—', '-')
+    line_hyperlinks = []
+    for text, hyperlinks in paragraph_records:
+        text = text.strip().replace('–', '-').replace('—', '-')
         if text:
             # Split by \n to handle cases where multiple fields are in one paragraph
             for line in text.split('\n'):
                 line = line.strip()
                 if line:
                     paragraphs.append(line)
-                    paragraph_objects.append(p)
-
-    data = {
-        'vehicle_heading': '',
-        'description_text': '',
-        'common_issues_heading': '',
-        'car_images': {},
-        'specs': {},
-        'issues': {
-            'Brakes': [],
-            'Suspension': [],
-            'Ignition': [],
-            'Steering': [],
-            'Engine': [],
-            'Fuel Delivery': [],
-            'Electrical System': [],
-            'Driveline/Transmission': [],
-            'Others': []
-        }
-    }
-
-    # Find car images
-    data['car_images'] = find_car_images()
+                    line_hyperlinks.append(hyperlinks)
+    return paragraphs, line_hyperlinks
 
+def scan_specs(paragraphs, data):
+    """
+    Fill the heading, description, common issues heading and specs of data
+    from the lines before the issues list. Returns the index of the common
+    issues heading, where the issues list starts.
+    """
     # 1. Extract FULL Heading (no trimming, SEO-safe)
     vpg_index = -1
     for i, p in enumerate(paragraphs):
         if p.lower().startswith('vehicle platform guide'):
-            data['vehicle_heading'] = p.strip()
+            data.vehicle_heading = p.strip()
             vpg_index = i
             break
 
     # Fallback if heading not found
     if vpg_index == -1 and paragraphs:
-        data['vehicle_heading'] = paragraphs[0].strip()
+        data.vehicle_heading = paragraphs[0].strip()
         vpg_index = 0
 
     # 2. Extract FULL Description (multiple paragraphs)
@@ -214,22 +404,17 @@ def parse_word_document(docx_path):
             if len(p) > 40:
                 description_paragraphs.append(p)
 
-    data['description_text'] = '\n\n'.join(description_paragraphs)
+    data.description_text = '\n\n'.join(description_paragraphs)
 
     # 3. Extract Specifications
-    data['specs'] = {
-        'Engine and Powertrain': {},
-        'Fuel Economy (EPA Estimates)': {},
-        'Vehicle Weight': {},
-        'Configurations and Submodels': {}
-        #'Other Specifications':{}# Removed as per user Request
-    }
+    # 'Other Specifications' removed as per user request
+    data.specs = {name: {} for name in RULES.spec_names}
 
     # Extract Heading before Category Issue
     common_issues_index = -1
     for i, p in enumerate(paragraphs):
         if 'Top Common Issues' in p or 'Common Issues' in p:
-            data['common_issues_heading'] = p
+            data.common_issues_heading = p
             common_issues_index = i
             break
     
@@ -252,439 +437,402 @@ def parse_word_document(docx_path):
                     if key and val and len(key) < 50 and not key.startswith('Note'):
                         category = categorize_spec(key, val)
                         if category:  # Only add if category is valid (not None)
-                            data['specs'][category][key] = val
+                            data.specs[category][sys.intern(key)] = val
 
-    # 4. Categories and Issues
-    category_map = {
-        'Brake System': 'Brakes',
-        'Brakes System': 'Brakes',
-        'Brakes': 'Brakes',
-        'Suspension System': 'Suspension',
-        'Suspension': 'Suspension',
-        'Ignition System': 'Ignition',
-        'Ignition': 'Ignition',
-        'Steering System': 'Steering',
-        'Steering': 'Steering',
-        'Engine Management System': 'Engine',
-        'Engine System': 'Engine',
-        'Engine': 'Engine',
-        'Fuel Delivery System': 'Fuel Delivery',
-        'Fuel System': 'Fuel Delivery',
-        'Fuel Delivery': 'Fuel Delivery',
-        'Electrical Management System': 'Electrical System',
-        'Electrical Systems': 'Electrical System',
-        'Electrical System': 'Electrical System',
-        'Electrical': 'Electrical System',
-        'Driveline': 'Driveline/Transmission',
-        'Driveline System': 'Driveline/Transmission',
-        'Transmission System': 'Driveline/Transmission',
-        'Driveline/Transmission System': 'Driveline/Transmission',
-        'Transmission': 'Driveline/Transmission',
-        'Driveline / Transmission': 'Driveline/Transmission',
-        'Driveline / Transmission System': 'Driveline/Transmission',
-        'Other System': 'Others',
-        'Others': 'Others'
-    }
-    
-    category_keys_lower = set(k.lower() for k in category_map.keys())
-
-    def extract_fault_codes(text):
-        """Extract fault codes from text."""
-        return text
-
-    def extract_part_from_text(text, para_obj=None):
-        """
-        Extract part name, link, and description from text.
-        Uses hyperlinks from the paragraph object if available.
-        """
-        part_name = text
-        link = ''
-        description = ''
-        
-        # First, try to extract hyperlinks from the paragraph object
-        if para_obj:
-            hyperlinks = extract_hyperlinks_from_paragraph(para_obj, doc)
-            
-            # Filter hyperlinks to exclude those that are full URLs (the ones in parentheses)
-            valid_hyperlinks = [(hl_text, url) for hl_text, url in hyperlinks 
-                               if not hl_text.startswith('http://') and not hl_text.startswith('https://')]
-            
-            if valid_hyperlinks:
-                # Use the first valid hyperlink (the underlined part name)
-                hyperlink_text, hyperlink_url = valid_hyperlinks[0]
-                
-                # The hyperlink text is our part name
-                part_name = hyperlink_text
-                link = hyperlink_url
-                
-                # Everything after the hyperlink text (and removing URL in parentheses) is description
-                text_clean = text
-                url_in_parens = re.search(r'\s*\(\s*https?://[^\)]+\s*\)', text_clean)
-                if url_in_parens:
-                    text_clean = text_clean[:url_in_parens.start()] + text_clean[url_in_parens.end():]
-                
-                # Find where the part name appears in the text and get everything after it
-                if hyperlink_text in text_clean:
-                    idx = text_clean.index(hyperlink_text)
-                    description = text_clean[idx + len(hyperlink_text):].strip()
-                
-                return {
-                    'name': part_name,
-                    'description': ' ' + description if description else '',
-                    'link': link
-                }
-        
-        # Fallback: Old format handling if no hyperlinks found
-        url_match = re.search(r'\s*\(\s*(https?://[^\)]+)\s*\)', text)
-        if url_match:
-            link = url_match.group(1).strip()
-            part_name = text[:url_match.start()].strip()
-            description = text[url_match.end():].strip()
-            if description:
-                description = ' ' + description
-        else:
-            # Old format handling
-            if ' is a ' in text:
-                part_name = text.split(' is a ')[0].strip()
-                description = ' is a ' + text.split(' is a ', 1)[1].strip()
-            elif ' is an ' in text:
-                part_name = text.split(' is an ')[0].strip()
-                description = ' is an ' + text.split(' is an ', 1)[1].strip()
-            
-            # Fix for description starting with "The" inside part_name
-            if ' The ' in part_name:
-                parts_split = part_name.split(' The ', 1)
-                part_name = parts_split[0].strip()
-                description = ' The ' + parts_split[1].strip() + description
-
-            # User rule: if last character is number or capital letter
-            cut_idx = -1
-            for i in range(len(part_name) - 1, -1, -1):
-                if part_name[i].isdigit() or part_name[i].isupper():
-                    cut_idx = i
-                    break
-            
-            if cut_idx != -1:
-                suffix = part_name[cut_idx+1:]
-                part_name = part_name[:cut_idx+1]
-                description = suffix + description
-
-            # Simple search query generation for fallback link
-            search_query = re.sub(r'[^a-zA-Z0-9\s]', '', part_name).strip()
-            link = f'https://newparts.com/parts/search?q={search_query}'
-        
-        return {
-            'name': part_name,
-            'description': description,
-            'link': link
-        }
+    return common_issues_index
+
+def extract_fault_codes(text):
+    """Extract fault codes from text."""
+    return text
+
+def part_hyperlinks(hyperlinks):
+    """
+    The hyperlinks a part line can use: those whose text isn't a full URL
+    (the ones in parentheses). Only the first is ever used, so at most one
+    is returned.
+    """
+    for hyperlink in hyperlinks:
+        if not hyperlink[0].startswith(('http://', 'https://')):
+            return [hyperlink]
+    return []
+
+def extract_part_from_text(text, hyperlinks=None):
+    """
+    Extract part name, link, and description from text.
+    Uses the hyperlinks of the line's paragraph if available.
+    """
+    part_name = text
+    link = ''
+    description = ''
+
+    # First, try the hyperlinks of the paragraph
+    if hyperlinks:
+        valid_hyperlinks = part_hyperlinks(hyperlinks)
+
+        if valid_hyperlinks:
+            # Use the first valid hyperlink (the underlined part name)
+            hyperlink_text, hyperlink_url = valid_hyperlinks[0]
+
+            # The hyperlink text is our part name
+            part_name = hyperlink_text
+            link = hyperlink_url
+
+            # Everything after the hyperlink text (and removing URL in parentheses) is description
+            text_clean = text
+            url_in_parens = URL_IN_PARENS_RE.search(text_clean)
+            if url_in_parens:
+                text_clean = text_clean[:url_in_parens.start()] + text_clean[url_in_parens.end():]
+
+            # Find where the part name appears in the text and get everything after it
+            if hyperlink_text in text_clean:
+                idx = text_clean.index(hyperlink_text)
+                description = text_clean[idx + len(hyperlink_text):].strip()
+
+            return Part.make(part_name, ' ' + description if description else '', link)
+
+    # Fallback: Old format handling if no hyperlinks found
+    url_match = URL_GROUP_RE.search(text)
+    if url_match:
+        link = url_match.group(1).strip()
+        part_name = text[:url_match.start()].strip()
+        description = text[url_match.end():].strip()
+        if description:
+            description = ' ' + description
+    else:
+        # Old format handling
+        if ' is a ' in text:
+            part_name = text.split(' is a ')[0].strip()
+            description = ' is a ' + text.split(' is a ', 1)[1].strip()
+        elif ' is an ' in text:
+            part_name = text.split(' is an ')[0].strip()
+            description = ' is an ' + text.split(' is an ', 1)[1].strip()
+
+        # Fix for description starting with "The" inside part_name
+        if ' The ' in part_name:
+            parts_split = part_name.split(' The ', 1)
+            part_name = parts_split[0].strip()
+            description = ' The ' + parts_split[1].strip() + description
+
+        # User rule: if last character is number or capital letter
+        cut_idx = -1
+        for i in range(len(part_name) - 1, -1, -1):
+            if part_name[i].isdigit() or part_name[i].isupper():
+                cut_idx = i
+                break
+
+        if cut_idx != -1:
+            suffix = part_name[cut_idx+1:]
+            part_name = part_name[:cut_idx+1]
+            description = suffix + description
+
+        # Simple search query generation for fallback link
+        search_query = NON_ALNUM_RE.sub('', part_name).strip()
+        link = f'https://newparts.com/parts/search?q={search_query}'
+
+    return Part.make(part_name, description, link)
+
+def add_symptom(issue, symptom_keys, text):
+    """Append a symptom unless one with the same normalized text exists."""
+    key = NUMBER_PREFIX_RE.sub('', text).strip().lower()
+    if key not in symptom_keys:
+        symptom_keys.add(key)
+        issue.symptoms.append(text)
+
+def parse_issues(paragraphs, line_hyperlinks, common_issues_index, issues):
+    """
+    Parse the issues list that follows paragraphs[common_issues_index] and
+    append each issue to issues[category].
+    """
+    def finish_issue(issue, category):
+        # Add issue to category
+        issue.title = NUMBER_PREFIX_RE.sub('', issue.title).strip()
+        if issue.title:
+            issues[category].append(issue)
+
+    # Classify every line of the issues section exactly once, then build the
+    # issues in a single pass. A line that ends an issue (a category header or
+    # a new title) is looked at again with no open issue, so each line is
+    # handled at most twice.
+    first_issue_line = common_issues_index + 1
+
+    # The lines of a paragraph share its hyperlink list; filter it once per
+    # paragraph rather than once per line (a paragraph of n links broken
+    # into n lines would otherwise cost n^2)
+    filtered_hyperlinks = {}
+    def line_part_hyperlinks(j):
+        hyperlinks = line_hyperlinks[j]
+        filtered = filtered_hyperlinks.get(id(hyperlinks))
+        if filtered is None:
+            filtered = filtered_hyperlinks[id(hyperlinks)] = part_hyperlinks(hyperlinks)
+        return filtered
+
+    line_kinds = [classify_line(p) for p in paragraphs[first_issue_line:]]
 
     current_category = None
-    i = common_issues_index + 1
-    
-    while i < len(paragraphs):
-        p = paragraphs[i].strip()
-        
-        # Check for Category Header
-        is_category = False
-        p_clean = p.strip().lower().rstrip(':')
-        if p_clean in category_keys_lower:
-            current_category = category_map.get(p.strip().rstrip(':'), None)
-            if not current_category:
-                for k, v in category_map.items():
-                    if k.lower() == p_clean:
-                        current_category = v
-                        break
-            is_category = True
-        
-        if is_category:
-            i += 1
-            continue
-            
-        if current_category:
-            # Parse Issue
-            title_text = p
-            fault_codes_inline = ''
-            why_inline = ''
-            
-            # Check if multiple fields are on the title line
-            remaining_text = title_text
-            
-            # Extract Fault Codes if present
-            fc_match = re.search(r'(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))', 
-                                remaining_text, re.IGNORECASE)
-            if fc_match:
-                title_text = remaining_text[:fc_match.start()].strip()
-                fault_codes_inline = fc_match.group(2).strip()
-                remaining_text = remaining_text[fc_match.end():]
-            
-            # Extract Why it happens if present
-            why_match = re.search(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
-                                 remaining_text, re.IGNORECASE)
-            if why_match:
-                if not fc_match:
-                    title_text = remaining_text[:why_match.start()].strip()
-                why_inline = why_match.group(2).strip()
-                remaining_text = remaining_text[why_match.end():]
-            
-            # Extract Symptoms if present on same line
-            sym_match = re.search(r'(Symptoms?)[\s:\-]+(.+?)(?=(Parts to Replace|Brands|$))', 
-                                 remaining_text, re.IGNORECASE)
-            if sym_match:
-                if not fc_match and not why_match:
-                    title_text = remaining_text[:sym_match.start()].strip()
-                remaining_text = remaining_text[sym_match.end():]
-
-            issue = {
-                'title': title_text,
-                'fault_codes': fault_codes_inline,
-                'why': why_inline,
-                'symptoms': [],
-                'parts': [],
-                'brands': []
-            }
-            
-            # Track which fields have been parsed
-            fields_parsed = {
-                'fault_codes': False,
-                'why': False,
-                'symptoms': False,
-                'parts': False,
-                'brands': False
-            }
-            
-            j = i + 1
-            while j < len(paragraphs):
-                sub_p = paragraphs[j].strip()
-                
-                # Check if we hit a new category
-                is_next_cat = False
-                sub_p_clean = sub_p.strip().lower().rstrip(':')
-                if sub_p_clean in category_keys_lower:
-                    is_next_cat = True
-                
-                if is_next_cat:
+    issue = None
+    fields_parsed = None
+    symptom_keys = None
+    capture = None  # section whose following lines are being collected
+
+    for j in range(first_issue_line, len(paragraphs)):
+        p = paragraphs[j]
+        kind, match = line_kinds[j - first_issue_line]
+        while True:
+            if issue is None:
+                # Check for Category Header
+                if kind == LINE_CATEGORY:
+                    current_category = match
+                elif current_category:
+                    # Parse Issue
+                    title_text, fault_codes_inline, why_inline = split_issue_title(p)
+                    issue = Issue(title_text, fault_codes_inline, why_inline)
+                    # Track which fields have been parsed
+                    fields_parsed = {
+                        'fault_codes': False,
+                        'why': False,
+                        'symptoms': False,
+                        'parts': False,
+                        'brands': False
+                    }
+                    symptom_keys = set()
+                    capture = None
+                break
+
+            # Lines following Symptoms / Parts to Replace / an implicit symptom
+            if capture == 'symptoms':
+                if kind not in (LINE_PARTS, LINE_BRANDS, LINE_CATEGORY):
+                    add_symptom(issue, symptom_keys, p)
+                    break
+                capture = None
+            elif capture == 'implicit':
+                if kind not in (LINE_PARTS, LINE_BRANDS, LINE_CATEGORY, LINE_NUMBERED):
+                    add_symptom(issue, symptom_keys, p)
+                    break
+                capture = None
+            elif capture == 'parts':
+                if kind not in (LINE_BRANDS, LINE_CATEGORY):
+                    issue.parts.append(extract_part_from_text(p, line_part_hyperlinks(j)))
                     break
-                
-                is_keyword = False
-                
-                # Fault Codes
-                if not fields_parsed['fault_codes']:
-                    fc_match = re.match(r'^(Fault Codes?|Fault Code)[\s:\-]+(.+?)(?=(Why it happens|Symptoms|Parts to Replace|Brands|$))', 
-                                       sub_p, re.IGNORECASE | re.DOTALL)
-                    if fc_match:
-                        is_keyword = True
-                        fields_parsed['fault_codes'] = True
-                        val = fc_match.group(2).strip()
-                            
-                        if val.lower() not in ['n/a', 'none', 'null', '']:
-                            issue['fault_codes'] = extract_fault_codes(val)
-                        
-                        # Check if Why it happens is on the same line
-                        remaining = sub_p[fc_match.end():]
-                        why_match = re.search(r'(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
-                                            remaining, re.IGNORECASE | re.DOTALL)
-                        if why_match:
-                            fields_parsed['why'] = True
-                            issue['why'] = why_match.group(2).strip()
-                
-                # Why it happens
-                if not is_keyword and not fields_parsed['why']:
-                    why_match = re.match(r'^(Why it happens)[\s:\-]+(.+?)(?=(Symptoms|Parts to Replace|Brands|$))', 
-                                        sub_p, re.IGNORECASE | re.DOTALL)
-                    if why_match:
-                        is_keyword = True
-                        fields_parsed['why'] = True
-                        fields_parsed['fault_codes'] = True
-                        val = why_match.group(2).strip()
-                        issue['why'] = val
-
-                # Symptoms
-                if not is_keyword and not fields_parsed['symptoms']:
-                    sym_match = re.match(r'^(Symptoms?)[\s:\-]*', sub_p, re.IGNORECASE)
-                    if sym_match:
-                        is_keyword = True
-                        fields_parsed['symptoms'] = True
-                        fields_parsed['fault_codes'] = True
-                        fields_parsed['why'] = True
-                        
-                        sym_content_match = re.match(r'^(Symptoms?)[\s:\-]+(.+?)$', sub_p, re.IGNORECASE | re.DOTALL)
-                        
-                        if sym_content_match:
-                            sym_text = sym_content_match.group(2).strip()
-                            if sym_text and not re.match(r'^(Parts to Replace|Brands)', sym_text, re.IGNORECASE):
-                                clean_sym = re.sub(r'^\d+[\.\)]\s*', '', sym_text).strip()
-                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_sym.lower() 
-                                           for s in issue['symptoms'])
-                                if not exists:
-                                    issue['symptoms'].append(sym_text)
-                        
-                        # Capture subsequent lines as symptoms
-                        k = j + 1
-                        while k < len(paragraphs):
-                            next_sub = paragraphs[k].strip()
-                            next_sub_clean = next_sub.strip().lower().rstrip(':')
-                            is_cat_header = next_sub_clean in category_keys_lower
-
-                            if (re.match(r'^(Parts to Replace|Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
-                                is_cat_header):
-                                break
-                            if next_sub:
-                                clean_next = re.sub(r'^\d+[\.\)]\s*', '', next_sub).strip()
-                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_next.lower() 
-                                           for s in issue['symptoms'])
-                                if not exists:
-                                    issue['symptoms'].append(next_sub)
-                            k += 1
-                        j = k - 1
-
-                # Parts to Replace
-                if not is_keyword and not fields_parsed['parts']:
-                    parts_match = re.match(r'^(Parts to Replace)[\s:\-]*', sub_p, re.IGNORECASE)
-                    if parts_match:
-                        is_keyword = True
-                        fields_parsed['parts'] = True
-                        fields_parsed['fault_codes'] = True
-                        fields_parsed['why'] = True
-                        fields_parsed['symptoms'] = True
-                        
-                        parts_content_match = re.match(r'^(Parts to Replace)[\s:\-]+(.+?)(?=(Brands|$))', 
-                                                       sub_p, re.IGNORECASE | re.DOTALL)
-                        
-                        if parts_content_match:
-                            part_text = parts_content_match.group(2).strip()
-                            if part_text and not re.match(r'^(Brands)', part_text, re.IGNORECASE):
-                                issue['parts'].append(extract_part_from_text(part_text, 
-                                                     paragraph_objects[j] if j < len(paragraph_objects) else None))
-                        
-                            # Check if Brands is on the same line
-                            remaining = sub_p[parts_content_match.end():]
-                            brands_match = re.search(r'(Brands)[\s:\-]+(.+?)$', remaining, re.IGNORECASE | re.DOTALL)
-                            if brands_match:
-                                fields_parsed['brands'] = True
-                                brands_text = brands_match.group(2).strip()
-                                if 'newparts Advantage:' in brands_text:
-                                    brands_text = brands_text.split('newparts Advantage:')[0].strip()
-                                if brands_text:
-                                    brand_list = [b.strip() for b in brands_text.replace(' and ', ',').split(',') if b.strip()]
-                                    issue['brands'] = [{'name': b, 'link': f"https://newparts.com/{b.replace(' ', '-')}"} 
-                                                      for b in brand_list]
-                        
-                        # Capture subsequent part lines
-                        k = j + 1
-                        while k < len(paragraphs):
-                            next_sub = paragraphs[k].strip()
-                            next_sub_clean = next_sub.strip().lower().rstrip(':')
-                            is_cat_header = next_sub_clean in category_keys_lower
-
-                            if (re.match(r'^(Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
-                                is_cat_header):
-                                break
-                            if next_sub:
-                                issue['parts'].append(extract_part_from_text(next_sub, 
-                                                     paragraph_objects[k] if k < len(paragraph_objects) else None))
-                            k += 1
-                        j = k - 1
-
-                # Brands
-                if not is_keyword and not fields_parsed['brands']:
-                    brands_match = re.match(r'^(Brands)[\s:\-]*\s*(.*)', sub_p, re.IGNORECASE)
+                capture = None
+
+            # Check if we hit a new category
+            if kind == LINE_CATEGORY:
+                finish_issue(issue, current_category)
+                issue = None
+                continue
+
+            is_keyword = False
+
+            # Fault Codes
+            if kind == LINE_FAULT_CODES and not fields_parsed['fault_codes']:
+                is_keyword = True
+                fields_parsed['fault_codes'] = True
+                val = match.group(2).strip()
+                if val.lower() not in ['n/a', 'none', 'null', '']:
+                    issue.fault_codes = extract_fault_codes(val)
+
+                # Check if Why it happens is on the same line
+                why_match = WHY_RE.search(p, match.end())
+                if why_match:
+                    fields_parsed['why'] = True
+                    issue.why = why_match.group(2).strip()
+
+            # Why it happens
+            elif kind == LINE_WHY and not fields_parsed['why']:
+                is_keyword = True
+                fields_parsed['why'] = True
+                fields_parsed['fault_codes'] = True
+                issue.why = match.group(2).strip()
+
+            # Symptoms
+            elif kind == LINE_SYMPTOMS and not fields_parsed['symptoms']:
+                is_keyword = True
+                fields_parsed['symptoms'] = True
+                fields_parsed['fault_codes'] = True
+                fields_parsed['why'] = True
+
+                sym_content_match = SYM_CONTENT_RE.match(p)
+                if sym_content_match:
+                    sym_text = sym_content_match.group(2).strip()
+                    if sym_text and not PARTS_OR_BRANDS_RE.match(sym_text):
+                        add_symptom(issue, symptom_keys, sym_text)
+
+                # Capture subsequent lines as symptoms
+                capture = 'symptoms'
+
+            # Parts to Replace
+            elif kind == LINE_PARTS and not fields_parsed['parts']:
+                is_keyword = True
+                fields_parsed['parts'] = True
+                fields_parsed['fault_codes'] = True
+                fields_parsed['why'] = True
+                fields_parsed['symptoms'] = True
+
+                parts_content_match = PARTS_CONTENT_RE.match(p)
+                if parts_content_match:
+                    part_text = parts_content_match.group(2).strip()
+                    if part_text and not BRANDS_WORD_RE.match(part_text):
+                        issue.parts.append(extract_part_from_text(part_text, line_part_hyperlinks(j)))
+
+                    # Check if Brands is on the same line
+                    brands_match = INLINE_BRANDS_RE.search(p, parts_content_match.end())
                     if brands_match:
-                        is_keyword = True
                         fields_parsed['brands'] = True
-                        fields_parsed['fault_codes'] = True
-                        fields_parsed['why'] = True
-                        fields_parsed['symptoms'] = True
-                        fields_parsed['parts'] = True
-                        
-                        brands_text = brands_match.group(2).strip()
-                        if 'newparts Advantage:' in brands_text:
-                            brands_text = brands_text.split('newparts Advantage:')[0].strip()
-                        if brands_text:
-                            brand_list = [b.strip() for b in brands_text.replace(' and ', ',').split(',') if b.strip()]
-                            issue['brands'] = [{'name': b, 'link': f"https://newparts.com/{b.replace(' ', '-')}"} 
-                                              for b in brand_list]
-
-                # Implicit Symptoms
-                if not is_keyword and ':' in sub_p and issue['title'] and not fields_parsed['parts']:
-                    parts_split = sub_p.split(':', 1)
-                    key_candidate = parts_split[0].strip()
-                    if (len(key_candidate) < 50 and 
-                        not any(x in key_candidate.lower() for x in ['note', 'important']) and
-                        not re.match(r'^\d+[\.\)]', sub_p)):
-                        
-                        is_keyword = True
-                        fields_parsed['symptoms'] = True
-                        fields_parsed['fault_codes'] = True
-                        fields_parsed['why'] = True
-                        
-                        clean_sub = re.sub(r'^\d+[\.\)]\s*', '', sub_p).strip()
-                        exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_sub.lower() 
-                                   for s in issue['symptoms'])
-                        if not exists:
-                            issue['symptoms'].append(sub_p)
-                        
-                        # Capture subsequent lines
-                        k = j + 1
-                        while k < len(paragraphs):
-                            next_sub = paragraphs[k].strip()
-                            next_sub_clean = next_sub.strip().lower().rstrip(':')
-                            is_cat_header = next_sub_clean in category_keys_lower
-
-                            if (re.match(r'^(Parts to Replace|Brands)[\s:\-]*', next_sub, re.IGNORECASE) or 
-                                is_cat_header or
-                                re.match(r'^\d+[\.\)]', next_sub)):
-                                break
-                            if next_sub:
-                                clean_next = re.sub(r'^\d+[\.\)]\s*', '', next_sub).strip()
-                                exists = any(re.sub(r'^\d+[\.\)]\s*', '', s).strip().lower() == clean_next.lower() 
-                                           for s in issue['symptoms'])
-                                if not exists:
-                                    issue['symptoms'].append(next_sub)
-                            k += 1
-                        j = k - 1
-                
-                if not is_keyword:
-                    if fields_parsed['brands']:
-                        break
-                    elif issue['why'] or issue['symptoms'] or issue['parts']:
-                        break
-                    else:
-                        if len(issue['title']) < 200:
-                            issue['title'] += " " + sub_p
-                
-                j += 1
-            
-            # Add issue to category
-            issue['title'] = re.sub(r'^\d+[\.\)]\s*', '', issue['title']).strip()
-            if issue['title']:
-                data['issues'][current_category].append(issue)
-            
-            i = j
-            continue
+                        brands = parse_brands(brands_match.group(2))
+                        if brands:
+                            issue.brands = brands
+
+                # Capture subsequent part lines
+                capture = 'parts'
+
+            # Brands
+            elif kind == LINE_BRANDS and not fields_parsed['brands']:
+                is_keyword = True
+                fields_parsed['brands'] = True
+                fields_parsed['fault_codes'] = True
+                fields_parsed['why'] = True
+                fields_parsed['symptoms'] = True
+                fields_parsed['parts'] = True
+
+                brands = parse_brands(match.group(2))
+                if brands:
+                    issue.brands = brands
+
+            # Implicit Symptoms
+            if (not is_keyword and ':' in p and issue.title and not fields_parsed['parts']
+                    and kind != LINE_NUMBERED and is_symptom_label(p)):
+                is_keyword = True
+                fields_parsed['symptoms'] = True
+                fields_parsed['fault_codes'] = True
+                fields_parsed['why'] = True
+
+                add_symptom(issue, symptom_keys, p)
+
+                # Capture subsequent lines
+                capture = 'implicit'
+
+            if not is_keyword:
+                if fields_parsed['brands'] or issue.why or issue.symptoms or issue.parts:
+                    finish_issue(issue, current_category)
+                    issue = None
+                    continue
+                if len(issue.title) < 200:
+                    issue.title += " " + p
+            break
+
+    if issue is not None:
+        finish_issue(issue, current_category)
+
+def parse_word_document(docx_source, car_images=None, reader=DEFAULT_READER):
+    """
+    Parse Word document and extract vehicle platform guide data.
+    docx_source can be a path, a file-like object or the raw .docx bytes.
+    If car_images is given it is used as the view -> URL map and the
+    car images folder is not scanned, so nothing touches the filesystem.
+    reader selects how the .docx is read: 'python-docx' builds the full
+    object model, 'stream' uses the zipfile/iterparse reader in docx_stream.
+    """
+    # Stage timers only record while a request timer is running (see metrics.py).
+    # The stream reader parses lazily, so its reading shows up under 'flatten'.
+    with stage('load'):
+        paragraph_records = read_paragraph_records(docx_source, reader)
+    with stage('flatten'):
+        paragraphs, line_hyperlinks = flatten_paragraphs(paragraph_records)
+
+    data = Guide(issues={name: [] for name in RULES.issue_names})
+
+    # Find car images
+    if car_images is not None:
+        data.car_images = dict(car_images)
+    else:
+        with stage('images'):
+            data.car_images = find_car_images()
+
+    # 1-3. Heading, description and specifications
+    with stage('specs'):
+        common_issues_index = scan_specs(paragraphs, data)
+
+    # 4. Categories and Issues
+    with stage('issues'):
+        parse_issues(paragraphs, line_hyperlinks, common_issues_index, data.issues)
 
-        i += 1
-    
     return data
 
 def generate_html(data, template_path, output_path):
     """Generate HTML from template and data."""
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_str = f.read()
-    template = Template(template_str)
-    html = template.render(**data)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    with stage('render'):
+        render_to_file(data, output_path, template_path)
 
 if __name__ == '__main__':
-    import sys
     import glob
+    import time
+    import argparse
+    from batch import run_batch, print_result, print_summary
+    
+    parser = argparse.ArgumentParser(description='Generate Vehicle Platform Guide HTML from Word documents.')
+    parser.add_argument('docx_path', nargs='?',
+                        help='document to convert to output.html (default: every *.docx in the directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes for batch mode (default: 1)')
+    parser.add_argument('--reader', choices=READERS, default=DEFAULT_READER,
+                        help=f'.docx reader to use (default: {DEFAULT_READER})')
+    parser.add_argument('--images-root', default=os.environ.get('VPG_IMAGES_ROOT', ''),
+                        help='car image library to index; guides are matched by file name '
+                             '(default: the car images folder next to the documents)')
+    parser.add_argument('--force', action='store_true',
+                        help='batch mode: rebuild every guide, even if its HTML is up to date')
+    parser.add_argument('--prune', action='store_true',
+                        help='batch mode: delete outputs whose .docx no longer exists')
+    parser.add_argument('--manifest', default='.vpg-build.json',
+                        help='batch mode: build manifest used to skip up-to-date guides (default: .vpg-build.json)')
+    parser.add_argument('--watch', action='store_true',
+                        help='batch mode: keep running and rebuild guides when documents, '
+                             'the template or the car images change')
+    parser.add_argument('--poll', action='store_true',
+                        help='watch mode: poll for changes instead of using inotify')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='watch mode: seconds of quiet to wait for after a change (default: 0.3)')
+    parser.add_argument('--minify', action='store_true',
+                        help='minify the HTML (whitespace, comments, CSS; scripts and JSON-LD keep their meaning)')
+    parser.add_argument('--precompress', action='store_true',
+                        help='also write .html.gz (and .html.br with Brotli installed) next to every page')
+    parser.add_argument('--assets', metavar='DIR',
+                        help='move the inline CSS and JavaScript of the pages into shared, content-hashed '
+                             'vpg.<hash>.css/.js files in DIR')
+    parser.add_argument('--asset-url', metavar='URL',
+                        help='URL prefix the pages load the --assets files from (default: DIR/, relative to the pages)')
+    parser.add_argument('--save-parsed', metavar='PATH',
+                        help='also save the parsed data of the guides to PATH (versioned JSON lines)')
+    parser.add_argument('--from-parsed', metavar='PATH',
+                        help='render the guides saved with --save-parsed without reading any .docx '
+                             '(e.g. after a template change)')
+    args = parser.parse_args()
+    if args.watch and args.docx_path:
+        parser.error('--watch watches every .docx in the directory; leave out docx_path')
+    if args.from_parsed and (args.docx_path or args.watch or args.save_parsed):
+        parser.error('--from-parsed renders every guide in PATH; it takes no docx_path, --watch or --save-parsed')
+    if args.asset_url and not args.assets:
+        parser.error('--asset-url needs --assets')
+    if args.watch and args.jobs != 1:
+        parser.error('--watch rebuilds guides one at a time in this process; it takes no --jobs')
     
     template_path = 'template.html'
+    
+    assets = None
+    if args.assets:
+        from assets import AssetStore
+        assets = AssetStore(args.assets, args.asset_url, precompress=args.precompress)
+    
+    catalog = None
+    if args.images_root:
+        from image_catalog import ImageCatalog
+        catalog = ImageCatalog(args.images_root)
+        scanned = catalog.refresh()
+        print(f'Image catalog: {len(catalog)} vehicles ({scanned} folders rescanned)')
        
     # Check if a specific file is provided as an argument
-    if len(sys.argv) > 1:
-        docx_path = sys.argv[1]
+    if args.docx_path:
+        docx_path = args.docx_path
         if not os.path.exists(docx_path):
             print(f"Error: File '{docx_path}' not found.")
             sys.exit(1)
@@ -694,42 +842,114 @@ if __name__ == '__main__':
         
         print(f"Processing {docx_path}...")
         try:
-            data = parse_word_document(docx_path)
-            generate_html(data, template_path, output_path)
+            car_images = catalog.lookup_document(docx_path) if catalog else None
+            data = parse_word_document(docx_path, car_images=car_images, reader=args.reader)
+            if args.minify or args.precompress or assets is not None:
+                from batch import write_output
+                write_output(data, output_path, template_path, args.minify, args.precompress, assets)
+            else:
+                generate_html(data, template_path, output_path)
             print(f'HTML generated successfully: {output_path}')
-            print(f'Vehicle: {data["vehicle_heading"]}')
-            if data["description_text"]:
-                print(f'Description: {data["description_text"][:100]}...')
+            print(f'Vehicle: {data.vehicle_heading}')
+            if data.description_text:
+                print(f'Description: {data.description_text[:100]}...')
             else:
                 print('Description: Not found')
-            print(f'Specs: {len(data["specs"])} categories')
-            print(f'Issues: {sum(len(v) for v in data["issues"].values())} total')
+            print(f'Specs: {len(data.specs)} categories')
+            print(f'Issues: {data.issue_count} total')
+            if args.save_parsed:
+                from build_manifest import file_digest
+                from parsed_store import write_parsed
+                write_parsed(args.save_parsed, [{'docx_path': docx_path, 'output_path': output_path,
+                                                 'docx_hash': file_digest(docx_path), 'data': data}])
+                print(f'Parsed data saved: {args.save_parsed}')
         except Exception as e:
             print(f"Error processing {docx_path}: {e}")
             
+    elif args.from_parsed:
+        # Render pass only: the parsed data was saved by an earlier --save-parsed run
+        from build_manifest import BuildManifest
+        from parsed_store import read_parsed
+        from batch import render_parsed
+        manifest = BuildManifest(args.manifest)
+        try:
+            start = time.perf_counter()
+            results = []
+            for result in render_parsed(read_parsed(args.from_parsed), template_path, jobs=args.jobs,
+                                        manifest=manifest, minify=args.minify, precompress=args.precompress,
+                                        assets=assets):
+                print_result(result)
+                results.append(result)
+            print_summary(results, time.perf_counter() - start)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {args.from_parsed}: {e}")
+            sys.exit(1)
+        finally:
+            manifest.save()
+            
     else:
         # Batch mode - process all files in directory
         print("No input file provided. Scanning directory for .docx files...")
         docx_files = glob.glob('*.docx')
         
-        if not docx_files:
-            print("No .docx files found.")
-        
-        for docx_path in docx_files:
-            print(f"Processing {docx_path}...")
-            output_path = os.path.splitext(docx_path)[0] + '.html'
+        # Only guides whose docx, template, images or output changed are rebuilt
+        from build_manifest import BuildManifest
+        manifest = BuildManifest(args.manifest)
+        if args.watch:
+            from watch import run_watch
+            if args.force:
+                manifest.entries.clear()
+            run_watch(template_path, args.reader, catalog=catalog, manifest=manifest,
+                      debounce=args.debounce, poll=args.poll, minify=args.minify,
+                      precompress=args.precompress, assets=assets, prune=args.prune)
+            sys.exit(0)
+        try:
+            if args.prune:
+                deleted, kept = manifest.prune(docx_files)
+                for path in deleted:
+                    print(f"Deleted orphaned output: {path}")
+                for path in kept:
+                    print(f"Kept orphaned output (edited since it was built): {path}")
+            if args.force:
+                manifest.entries.clear()
             
-            try:
-                data = parse_word_document(docx_path)
-                generate_html(data, template_path, output_path)
-                print(f'HTML generated successfully: {output_path}')
-                print(f'Vehicle: {data["vehicle_heading"]}')
-                if data["description_text"]:
-                    print(f'Description: {data["description_text"][:100]}...')
-                else:
-                    print('Description: Not found')
-                print(f'Specs: {len(data["specs"])} categories')
-                print(f'Issues: {sum(len(v) for v in data["issues"].values())} total')
-                print('-' * 40)
-            except Exception as e:
-                print(f"Error processing {docx_path}: {e}")
+            saved = {}
+            if args.save_parsed:
+                from parsed_store import read_parsed, write_parsed
+                try:
+                    saved = {record['docx_path']: record for record in read_parsed(args.save_parsed)}
+                except (OSError, ValueError):
+                    saved = {}
+                # Up-to-date guides are skipped only if their saved parsed data is still current
+                for docx_path in docx_files:
+                    entry = manifest.entries.get(docx_path)
+                    if entry is None or saved.get(docx_path, {}).get('docx_hash') != entry['docx']['hash']:
+                        manifest.forget(docx_path)
+            
+            if not docx_files:
+                print("No .docx files found.")
+            else:
+                start = time.perf_counter()
+                results = []
+                parsed = {}
+                # Results stream back as each file finishes
+                for result in run_batch(docx_files, template_path, jobs=args.jobs, reader=args.reader,
+                                        catalog=catalog, manifest=manifest, keep_data=bool(args.save_parsed),
+                                        minify=args.minify, precompress=args.precompress, assets=assets):
+                    print_result(result)
+                    if args.save_parsed and result['error'] is None:
+                        docx_path = result['docx_path']
+                        if result.get('skipped'):
+                            parsed[docx_path] = saved[docx_path]
+                        else:
+                            parsed[docx_path] = {'docx_path': docx_path, 'output_path': result['output_path'],
+                                                 'docx_hash': manifest.entries[docx_path]['docx']['hash'],
+                                                 'data': result.pop('data')}
+                    results.append(result)
+                print_summary(results, time.perf_counter() - start)
+                if args.save_parsed:
+                    write_parsed(args.save_parsed, [parsed[path] for path in sorted(parsed)])
+                    print(f'Parsed data saved: {args.save_parsed} ({len(parsed)} guides)')
+        finally:
+            # Saved even if the run is interrupted, so finished guides stay recorded
+            manifest.save()
@@ -0,0 +1,116 @@
+"""
+Data model of a parsed guide. Parts and brands are NamedTuples, issues
+and guides slotted dataclasses, so a catalog parsed into memory carries no
+per-object dicts. Jinja renders them directly (attribute lookups), and a
+Guide also unpacks like a mapping, so Template.render(**guide) works.
+
+Strings that repeat across issues and guides (brand names and links,
+part names and links, spec keys) are interned: every copy shares one
+object. Category names come from the category rules and are shared too.
+"""
+import sys
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import NamedTuple
+
+BRAND_BASE_URL = 'https://newparts.com/'
+
+
+class Part(NamedTuple):
+    name: str
+    description: str
+    link: str
+
+    @classmethod
+    def make(cls, name, description, link):
+        return cls(sys.intern(name), description, sys.intern(link))
+
+
+class Brand(NamedTuple):
+    name: str
+    link: str
+
+
+@lru_cache(maxsize=4096)
+def brand(name):
+    """The Brand for a brand name; the same object for every issue that lists it."""
+    return Brand(sys.intern(name), sys.intern(BRAND_BASE_URL + name.replace(' ', '-')))
+
+
+@dataclass(slots=True)
+class Issue:
+    title: str
+    fault_codes: str = ''
+    why: str = ''
+    symptoms: list = field(default_factory=list)
+    parts: list = field(default_factory=list)
+    brands: list = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'fault_codes': self.fault_codes,
+            'why': self.why,
+            'symptoms': list(self.symptoms),
+            'parts': [part._asdict() for part in self.parts],
+            'brands': [brand._asdict() for brand in self.brands],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['title'], d['fault_codes'], d['why'], list(d['symptoms']),
+                   [Part.make(p['name'], p['description'], p['link']) for p in d['parts']],
+                   [Brand(sys.intern(b['name']), sys.intern(b['link'])) for b in d['brands']])
+
+
+@dataclass(slots=True)
+class Guide:
+    vehicle_heading: str = ''
+    description_text: str = ''
+    common_issues_heading: str = ''
+    car_images: dict = field(default_factory=dict)
+    # spec category -> {spec key: value}, in display order
+    specs: dict = field(default_factory=dict)
+    # issue category -> [Issue], in display order
+    issues: dict = field(default_factory=dict)
+    # Set by the web app when it has optimized the car images; None otherwise
+    car_image_variants: dict = None
+
+    def keys(self):
+        """Field names, for Template.render(**guide)."""
+        return [f.name for f in fields(self)]
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    @property
+    def issue_count(self):
+        return sum(len(issue_list) for issue_list in self.issues.values())
+
+    def to_dict(self):
+        """Plain JSON-ready form, with the keys in the order the parser has always produced them."""
+        d = {
+            'vehicle_heading': self.vehicle_heading,
+            'description_text': self.description_text,
+            'common_issues_heading': self.common_issues_heading,
+            'car_images': dict(self.car_images),
+            'specs': {category: dict(specs) for category, specs in self.specs.items()},
+            'issues': {category: [issue.to_dict() for issue in issue_list]
+                       for category, issue_list in self.issues.items()},
+        }
+        if self.car_image_variants is not None:
+            d['car_image_variants'] = self.car_image_variants
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['vehicle_heading'], d['description_text'], d['common_issues_heading'],
+                   dict(d['car_images']),
+                   {sys.intern(category): {sys.intern(key): value for key, value in specs.items()}
+                    for category, specs in d['specs'].items()},
+                   {sys.intern(category): [Issue.from_dict(issue) for issue in issue_list]
+                    for category, issue_list in d['issues'].items()},
+                   d.get('car_image_variants'))
@@ -0,0 +1,49 @@
+"""
+gunicorn settings for the guide generator:
+
+    gunicorn -c gunicorn_config.py app:app
+
+The app is imported once in the master (preload_app), which runs its
+warm-up there, so every worker, including the ones that replace recycled
+workers, starts with the parser imported and the template compiled.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# Conversions are CPU bound and hold the GIL; the threads overlap uploads,
+# streamed downloads and waiting on the job/bulk pools
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('VPG_THREADS', 8))
+
+preload_app = True
+
+# Recycle workers now and then to cap memory growth; cheap now that they start warm
+max_requests = int(os.environ.get('VPG_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# Bulk ZIP conversions stream for a while; keep-alive covers the page's image requests
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Worker heartbeats on tmpfs, so a slow disk can't get workers killed
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def when_ready(server):
+    # Runs in the master after the app (and its warm-up) loaded, before the
+    # workers fork. Freezing moves those objects out of the collector's
+    # generations, so collections in the workers don't write to (and copy)
+    # the shared pages.
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the fork: start its warmed-up parse processes
+    # (see parse_budget.py) now, in the background, rather than on the first
+    # upload. They can't be started in the master, which forks.
+    from app import start_parse_workers
+    start_parse_workers()
@@ -0,0 +1,167 @@
+import json
+import os
+import re
+
+from atomic_write import atomic_open
+from generate_html import match_car_images, VIEW_PATTERNS
+
+CATALOG_VERSION = 1
+# Relative to the image root, in a hidden folder: hidden folders are not
+# scanned, and writing there doesn't change the mtime of any folder that is
+DEFAULT_INDEX_PATH = os.path.join('.vpg', 'image-catalog.json')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_KEY_RE = re.compile(r'[^a-z0-9.]')
+# Longest patterns first so 'quarter' is stripped rather than 'qua'
+_VIEW_SUFFIXES = sorted({pattern for patterns in VIEW_PATTERNS.values() for pattern in patterns},
+                        key=len, reverse=True)
+
+
+def catalog_key(name):
+    """Normalize a vehicle/folder/document name for lookups: lowercase letters, digits and dots."""
+    return _KEY_RE.sub('', name.lower())
+
+
+def image_basename(filename):
+    """
+    The vehicle part of a car image filename: the normalized stem without
+    its view suffix, e.g. 'MBAMGGL-A352.0LFron.jpeg' -> 'mbamggla352.0l'.
+    """
+    stem = catalog_key(os.path.splitext(filename)[0])
+    for suffix in _VIEW_SUFFIXES:
+        if stem.endswith(suffix) and len(stem) > len(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+
+def _has_views(car_images):
+    return any(car_images.values())
+
+
+class ImageCatalog:
+    """
+    Persistent index of a car image tree: vehicle key -> the
+    {front, side, rear, quarter} dict match_car_images() returns.
+
+    Every folder with images is indexed under its own name (all of its
+    images matched together, like find_car_images() does for a single
+    folder) and under each image basename (images grouped by filename
+    without the view suffix), so both one-folder-per-vehicle trees and flat
+    shared libraries work. refresh() only lists folders whose mtime changed
+    since the last scan; lookups are a dict access. An index_path of your
+    own must not be in a scanned folder, or every save makes that folder
+    look changed.
+    """
+
+    def __init__(self, root, index_path=None):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, DEFAULT_INDEX_PATH)
+        self._dirs = {}
+        self._index = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('version') == CATALOG_VERSION and saved.get('root') == self.root:
+            self._dirs = saved['dirs']
+            self._rebuild_index()
+
+    def _save(self):
+        # Written atomically so readers never see a partial catalog
+        try:
+            with atomic_open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CATALOG_VERSION, 'root': self.root, 'dirs': self._dirs}, f)
+        except OSError:
+            pass
+
+    def _scan_dir(self, rel, mtime_ns):
+        subdirs = []
+        images = []
+        with os.scandir(os.path.join(self.root, rel)) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(entry.name)
+        subdirs.sort()
+        images.sort()
+
+        vehicles = {}
+        if images:
+            folder_images = match_car_images(images)
+            if rel and _has_views(folder_images):
+                vehicles[catalog_key(os.path.basename(rel))] = folder_images
+            groups = {}
+            for name in images:
+                groups.setdefault(image_basename(name), []).append(name)
+            for basename, names in groups.items():
+                car_images = match_car_images(names)
+                if basename and _has_views(car_images):
+                    vehicles.setdefault(basename, car_images)
+        return {'mtime_ns': mtime_ns, 'subdirs': subdirs, 'vehicles': vehicles}
+
+    def _rebuild_index(self):
+        index = {}
+        # Sorted so the first folder (by path) wins when two define the same vehicle
+        for rel in sorted(self._dirs):
+            for key, car_images in self._dirs[rel]['vehicles'].items():
+                index.setdefault(key, car_images)
+        self._index = index
+
+    def refresh(self):
+        """
+        Bring the catalog up to date with the image tree and save it.
+        Folders whose mtime is unchanged are not listed again. Returns the
+        number of folders that were (re)scanned.
+        """
+        # Created before the scan, so the folder holding it is scanned with it in place
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        except OSError:
+            pass
+        old_dirs = self._dirs
+        dirs = {}
+        scanned = 0
+        stack = ['']
+        while stack:
+            rel = stack.pop()
+            try:
+                mtime_ns = os.stat(os.path.join(self.root, rel)).st_mtime_ns
+            except OSError:
+                continue
+            entry = old_dirs.get(rel)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                try:
+                    entry = self._scan_dir(rel, mtime_ns)
+                except OSError:
+                    continue
+                scanned += 1
+            dirs[rel] = entry
+            stack.extend(os.path.join(rel, name) for name in entry['subdirs'])
+
+        if scanned or dirs.keys() != old_dirs.keys():
+            self._dirs = dirs
+            self._rebuild_index()
+            self._save()
+        return scanned
+
+    def directories(self):
+        """Folders of the image tree (relative to root, '' for the root itself) as of the last refresh."""
+        return list(self._dirs)
+
+    def lookup(self, name, default=None):
+        """Return the view -> URL dict for a vehicle, folder, image basename or document name."""
+        return self._index.get(catalog_key(name), default)
+
+    def lookup_document(self, docx_path, default=None):
+        """Look up the images for a guide by its .docx filename (without extension)."""
+        return self.lookup(os.path.splitext(os.path.basename(docx_path))[0], default)
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_write import write_atomic
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are used as uploaded
+    Image = None
+
+HAVE_PILLOW = Image is not None
+
+# Widths of the generated variants; sizes larger than the original are skipped
+MAIN_WIDTHS = (640, 1280)
+THUMB_WIDTHS = (160, 320)  # 1x and 2x thumbnails
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Bump when the variant settings change so cached results are rebuilt
+VARIANT_VERSION = '1'
+
+
+def _widths(widths, original):
+    """Target widths no larger than the original (at least the smallest one)."""
+    fitting = [w for w in widths if w <= original]
+    return fitting or [min(original, widths[0])]
+
+
+class ImageOptimizer:
+    """
+    Turns uploaded car view images into resized WebP and progressive JPEG
+    variants (metadata stripped) written to output_dir, and describes them
+    for the template. One thread pool task per view; results are cached by
+    image content hash, in memory (the max_cached most recently used) and as
+    a JSON sidecar in output_dir.
+    Variant URLs are base_url (given to optimize() or here) plus the file name.
+    """
+
+    def __init__(self, output_dir, base_url=None, workers=4, max_cached=256):
+        self.output_dir = output_dir
+        self.base_url = base_url
+        os.makedirs(output_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vpg-image')
+        # Evicted images are read back from their sidecar
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def optimize(self, images, base_url=None):
+        """
+        images is a dict of view -> (filename, image_bytes). Returns a dict of
+        view -> variant info (see _describe()); views whose image can't be
+        decoded are left out so the template falls back to the original.
+        """
+        base_url = base_url or self.base_url
+        if not base_url:
+            raise ValueError('No base URL for the image variants')
+        futures = {view: self._executor.submit(self._optimize_one, filename, image_bytes)
+                   for view, (filename, image_bytes) in images.items()}
+        variants = {}
+        for view, future in futures.items():
+            try:
+                variants[view] = self._describe(future.result(), base_url)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                continue
+        return variants
+
+    def _optimize_one(self, filename, image_bytes):
+        digest = hashlib.sha256(image_bytes).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(filename))[0] or 'image'
+        prefix = f'{stem}-{digest}'
+        with self._lock:
+            cached = self._cache.get(prefix)
+            if cached is not None:
+                self._cache.move_to_end(prefix)
+        if cached is not None:
+            return cached
+
+        sidecar = os.path.join(self.output_dir, prefix + '.json')
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            if info.get('version') != VARIANT_VERSION:
+                info = None
+        except (OSError, ValueError):
+            info = None
+
+        if info is None:
+            info = self._build_variants(prefix, image_bytes)
+            write_atomic(sidecar, json.dumps(info).encode('utf-8'))
+
+        with self._lock:
+            self._cache[prefix] = info
+            self._cache.move_to_end(prefix)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return info
+
+    def _build_variants(self, prefix, image_bytes):
+        # Decode once; every variant is resized from this copy
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGB')
+        width, height = image.size
+
+        info = {'version': VARIANT_VERSION, 'main': [], 'thumb': []}
+        for kind, widths in (('main', MAIN_WIDTHS), ('thumb', THUMB_WIDTHS)):
+            for target in _widths(widths, width):
+                target_height = max(1, round(height * target / width))
+                resized = image if target == width else image.resize((target, target_height), Image.LANCZOS)
+                name = f'{prefix}-{target}'
+                # No exif/icc arguments: the variants carry no metadata
+                webp = io.BytesIO()
+                resized.save(webp, 'WEBP', quality=WEBP_QUALITY, method=4)
+                jpeg = io.BytesIO()
+                resized.save(jpeg, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                write_atomic(os.path.join(self.output_dir, name + '.webp'), webp.getvalue())
+                write_atomic(os.path.join(self.output_dir, name + '.jpg'), jpeg.getvalue())
+                info[kind].append({'name': name, 'width': target, 'height': target_height})
+        return info
+
+    def _describe(self, info, base_url):
+        """Template values: largest JPEG as src, WebP srcsets by width and density."""
+        main, thumbs = info['main'], info['thumb']
+        largest, thumb = main[-1], thumbs[0]
+        return {
+            'src': f"{base_url}{largest['name']}.jpg",
+            'srcset': ', '.join(f"{base_url}{v['name']}.webp {v['width']}w" for v in main),
+            'width': largest['width'],
+            'height': largest['height'],
+            'thumb_src': f"{base_url}{thumb['name']}.jpg",
+            'thumb_srcset': ', '.join(f"{base_url}{v['name']}.webp {i}x"
+                                      for i, v in enumerate(thumbs, 1)),
+            'thumb_width': thumb['width'],
+            'thumb_height': thumb['height'],
+        }
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit() when max_pending jobs are already waiting or running."""
+
+
+class JobManager:
+    """
+    Runs conversions on a bounded local thread pool and keeps their results
+    in memory until result_ttl seconds after they finish, at most
+    max_results of them (the oldest go first). Jobs live in this process
+    only: a client must poll the same worker, and a job is lost if the
+    worker restarts.
+    """
+
+    def __init__(self, workers=2, max_pending=32, result_ttl=600, max_results=32):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vpg-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _purge(self):
+        # Drop expired jobs and the oldest finished ones past max_results; caller must hold self._lock
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and now - job['finished_at'] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        finished = sorted((job for job in self._jobs.values() if job['finished_at'] is not None),
+                          key=lambda job: job['finished_at'])
+        for job in finished[:max(0, len(finished) - self.max_results)]:
+            del self._jobs[job['id']]
+
+    def submit(self, fn):
+        """Queue fn() and return the new job id. fn must return the result HTML."""
+        with self._lock:
+            self._purge()
+            pending = sum(1 for job in self._jobs.values() if job['status'] in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f'{pending} jobs already pending')
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': QUEUED,
+                'error': None,
+                'result': None,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _run(self, job_id, fn):
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+        try:
+            result = fn()
+        except Exception as e:
+            with self._lock:
+                job['status'] = FAILED
+                job['error'] = str(e)
+                job['finished_at'] = time.time()
+        else:
+            with self._lock:
+                job['status'] = DONE
+                job['result'] = result
+                job['finished_at'] = time.time()
+                self._purge()
+
+    def get(self, job_id):
+        """Return the job dict (including 'result') or None if unknown or expired."""
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def status(self, job_id):
+        """Return the public status of a job (no result body) or None."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        now = time.time()
+        started, finished = job['started_at'], job['finished_at']
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'error': job['error'],
+            'submitted_at': job['submitted_at'],
+            'started_at': started,
+            'finished_at': finished,
+            'queue_seconds': round((started or now) - job['submitted_at'], 3),
+            'run_seconds': round((finished or now) - started, 3) if started else None,
+            'expires_at': finished + self.result_ttl if finished else None,
+        }
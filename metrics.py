@@ -0,0 +1,267 @@
+import bisect
+import os
+import threading
+import time
+
+# Set VPG_METRICS=0 to turn stage timers and /metrics off; stage() is then a
+# shared no-op context manager
+ENABLED = os.environ.get('VPG_METRICS', '1') != '0'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6)
+COUNT_BUCKETS = (0, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _format_labels(labelnames, labels, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Value that goes up and down, either set directly or read from a function at exposition."""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """Report function() instead of the set value, e.g. a queue's current length."""
+        self._function = function
+
+    def expose(self):
+        value = self._function() if self._function is not None else self._value
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge',
+                f'{self.name} {_format_value(value)}']
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels."""
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                    lines.append(f'{self.name}_bucket{le} {cumulative}')
+                le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f'{self.name}_bucket{le} {series[-1]}')
+                base = _format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{base} {_format_value(series[-2])}')
+                lines.append(f'{self.name}_count{base} {series[-1]}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('vpg_request_seconds', 'Time to handle a request, including streaming the response.',
+                            LATENCY_BUCKETS, ('endpoint',))
+STAGE_SECONDS = Histogram('vpg_stage_seconds', 'Time spent in each conversion stage.',
+                          LATENCY_BUCKETS, ('stage',))
+DOCUMENT_BYTES = Histogram('vpg_document_bytes', 'Size of uploaded .docx files.', SIZE_BUCKETS)
+DOCUMENT_ISSUES = Histogram('vpg_document_issues', 'Issues found per parsed document.', COUNT_BUCKETS)
+ERRORS = Counter('vpg_errors_total', 'Failed requests by endpoint and status.', ('endpoint', 'status'))
+# Admission control around parsing and rendering uploads (see admission.py)
+UPLOADS_ACTIVE = Gauge('vpg_uploads_active', 'Uploads being parsed or rendered.')
+UPLOAD_QUEUE_DEPTH = Gauge('vpg_upload_queue_depth', 'Uploads waiting for a parse/render slot.')
+UPLOAD_OLDEST_WAIT = Gauge('vpg_upload_queue_oldest_wait_seconds',
+                           'How long the upload at the head of the queue has been waiting.')
+UPLOAD_WAIT_SECONDS = Histogram('vpg_upload_wait_seconds', 'Time uploads waited for a parse/render slot.',
+                                LATENCY_BUCKETS)
+# Parses stopped for going over their time or memory budget (see parse_budget.py)
+PARSE_BUDGET_EXCEEDED = Counter('vpg_parse_budget_exceeded_total',
+                                'Parses stopped for exceeding their budget, by reason.', ('reason',))
+
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, DOCUMENT_BYTES, DOCUMENT_ISSUES, ERRORS,
+            UPLOADS_ACTIVE, UPLOAD_QUEUE_DEPTH, UPLOAD_OLDEST_WAIT, UPLOAD_WAIT_SECONDS,
+            PARSE_BUDGET_EXCEEDED]
+
+
+def expose():
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:
+    """Stage durations (in seconds, in the order first seen) for one request or document."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def server_timing(self):
+        """Server-Timing header value for the stages recorded so far, plus the elapsed total."""
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stages.items()]
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(entries)
+
+    def observe(self, endpoint):
+        """Record the request duration and every stage into the histograms."""
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, endpoint)
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, name)
+
+
+class _NullTimer(StageTimer):
+    def add(self, name, seconds):
+        pass
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def server_timing(self):
+        return ''
+
+    def observe(self, endpoint):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+_local = threading.local()
+
+
+def start_timer():
+    """Start collecting stage() timings on this thread and return the StageTimer."""
+    if not ENABLED:
+        return NULL_TIMER
+    timer = _local.timer = StageTimer()
+    return timer
+
+
+def stop_timer():
+    """Stop collecting stage() timings on this thread."""
+    _local.timer = None
+
+
+def stage(name):
+    """
+    Context manager that adds the time spent in its block to stage `name` of
+    the timer started on this thread. Without a timer it does nothing.
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        return _NULL_STAGE
+    return _Stage(timer, name)
+
+
+def add_stages(stages):
+    """Add stage durations measured elsewhere (e.g. in a worker process) to this thread's timer."""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        for name, seconds in stages.items():
+            timer.add(name, seconds)
+
+
+def timed(chunks, name):
+    """
+    Yield from chunks, adding the time spent producing them (not the time the
+    consumer holds each chunk) to stage `name` of this thread's timer once
+    the iteration ends. Used for streamed rendering.
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        yield from chunks
+        return
+    total = 0
+    iterator = iter(chunks)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                total += time.perf_counter() - start
+            yield chunk
+    finally:
+        timer.add(name, total)
@@ -0,0 +1,109 @@
+"""
+Conservative HTML minifier for rendered guides.
+
+Only changes that can't alter what the page shows or does are made:
+whitespace runs in text collapse to a single character (a newline if the
+run had one), comments go (conditional comments stay), CSS loses its
+comments and the spaces around punctuation, and JavaScript loses its
+indentation and blank lines. Tags and attribute values are never touched,
+nor is the content of <pre>, <textarea> and non-JavaScript <script>
+blocks such as the JSON-LD.
+"""
+import re
+
+_TOKEN_RE = re.compile(
+    r'(?P<raw><(?P<tag>pre|textarea|script|style)\b(?P<attrs>(?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'
+    r'(?P<body>.*?)(?P<close></(?P=tag)\s*>))'
+    r'|(?P<comment><!--.*?-->)'
+    r'|(?P<markup><[a-zA-Z/!?](?:[^>"\']|"[^"]*"|\'[^\']*\')*>)',
+    re.IGNORECASE | re.DOTALL)
+
+# HTML whitespace only: \s would also match non-breaking spaces
+_HTML_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+_SCRIPT_TYPE_RE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+_JS_TYPES = {'', 'text/javascript', 'application/javascript', 'module'}
+
+_CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.DOTALL)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,])\s*')
+_CSS_COLON_RE = re.compile(r':\s+')
+
+
+def _collapse_space(match):
+    return '\n' if '\n' in match.group() else ' '
+
+
+def _minify_text(text):
+    return _HTML_SPACE_RE.sub(_collapse_space, text)
+
+
+def _minify_css_code(code):
+    code = _CSS_SPACE_RE.sub(' ', code)
+    code = _CSS_PUNCT_RE.sub(r'\1', code)
+    # Only after a colon: a space before one is a descendant combinator (a :hover)
+    return _CSS_COLON_RE.sub(':', code).replace(';}', '}')
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace outside CSS strings."""
+    # Alternating code and string segments; comments become a space in the
+    # code around them so the tokens on either side stay apart
+    segments = ['']
+    last = 0
+    for match in _CSS_TOKEN_RE.finditer(css):
+        segments[-1] += css[last:match.start()]
+        token = match.group()
+        if token.startswith('/*'):
+            segments[-1] += ' '
+        else:
+            segments.extend((token, ''))
+        last = match.end()
+    segments[-1] += css[last:]
+    return ''.join(segment if i % 2 else _minify_css_code(segment)
+                   for i, segment in enumerate(segments)).strip()
+
+
+def minify_js(js):
+    """
+    Strip indentation, trailing whitespace and blank lines. Scripts with
+    template literals or line continuations, where that whitespace can be
+    part of a string, are returned unchanged.
+    """
+    if '`' in js or '\\\n' in js:
+        return js
+    lines = (line.strip() for line in js.splitlines())
+    stripped = '\n'.join(line for line in lines if line)
+    return f'\n{stripped}\n' if stripped else ''
+
+
+def _minify_raw(match):
+    tag = match.group('tag').lower()
+    attrs, body = match.group('attrs'), match.group('body')
+    if tag == 'style':
+        body = minify_css(body)
+    elif tag == 'script':
+        script_type = _SCRIPT_TYPE_RE.search(attrs)
+        if (script_type.group(1).lower() if script_type else '') in _JS_TYPES:
+            body = minify_js(body)
+    opening = match.group('raw')[:match.start('body') - match.start('raw')]
+    return opening + body + match.group('close')
+
+
+def minify_html(html):
+    """Return a minified copy of a rendered page (see the module docstring for what changes)."""
+    parts = []
+    # Text around a dropped comment is collapsed as one run
+    text = []
+    last = 0
+    for match in _TOKEN_RE.finditer(html):
+        text.append(html[last:match.start()])
+        last = match.end()
+        comment = match.group('comment')
+        if comment is not None and not comment.startswith(('<!--[if', '<!--<!')):
+            continue
+        parts.append(_minify_text(''.join(text)))
+        text = []
+        parts.append(_minify_raw(match) if match.group('raw') else match.group())
+    text.append(html[last:])
+    parts.append(_minify_text(''.join(text)))
+    return ''.join(parts).strip()
@@ -0,0 +1,200 @@
+"""
+Per-document parse budget: guides are parsed in separate worker processes,
+each parse gets a wall-clock timeout and the worker an address-space limit,
+and a parse that goes over either is stopped by killing its worker (which
+is replaced) and raises ParseBudgetExceeded. One pathological document then
+fails on its own instead of stalling a web worker or running it out of
+memory.
+
+Workers are started with spawn (forking a threaded server is not safe)
+and warmed up (see warmup.py) before they take a document. start() starts
+the whole pool; gunicorn calls it in each web worker after the fork (see
+gunicorn_config.py), so nothing is started in the master. Otherwise they
+start the first time they are needed. They are reused from one parse to
+the next.
+"""
+import multiprocessing
+import os
+import threading
+
+try:
+    import resource
+except ImportError:  # not on Windows; there the memory limit is not applied
+    resource = None
+
+import metrics
+
+HAVE_RESOURCE = resource is not None
+
+# Time a new worker gets to import and warm up the parser, not counted in the parse timeout
+STARTUP_TIMEOUT = 60
+
+
+class ParseBudgetExceeded(Exception):
+    """A parse went over its budget; reason is 'time', 'memory' or 'crash'."""
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _address_space():
+    """Current virtual memory size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _worker(conn, memory_bytes, warm):
+    """Worker process: parse the documents sent on conn until it is closed."""
+    from generate_html import parse_word_document
+    if warm:
+        from warmup import warm_up
+        warm_up()
+
+    if memory_bytes and HAVE_RESOURCE:
+        # The budget is on top of what the interpreter and the parser already map
+        baseline = _address_space()
+        if baseline is not None:
+            limit = baseline + memory_bytes
+            resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    conn.send('ready')
+
+    while True:
+        try:
+            docx_bytes, car_images, reader = conn.recv()
+        except EOFError:
+            return
+        timer = metrics.start_timer()
+        try:
+            data = parse_word_document(docx_bytes, car_images=car_images, reader=reader)
+            reply = ('ok', data, getattr(timer, 'stages', {}))
+        except MemoryError:
+            reply = ('memory', None, {})
+        except Exception as e:
+            reply = ('error', e, {})
+        finally:
+            metrics.stop_timer()
+        data = docx_bytes = None
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send(('memory', None, {}))
+        except Exception as e:
+            # The exception (or result) doesn't pickle; send what it says
+            conn.send(('error', RuntimeError(str(reply[1]) if reply[0] == 'error' else str(e)), {}))
+
+
+class _Process:
+    """One worker process and the parent's end of its pipe; wait_ready() before use."""
+
+    def __init__(self, memory_bytes, warm):
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child_conn, memory_bytes, warm),
+                                       name='vpg-parse', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self):
+        try:
+            ready = self.conn.poll(STARTUP_TIMEOUT) and self.conn.recv() == 'ready'
+        except EOFError:
+            ready = False
+        if not ready:
+            self.kill()
+            raise RuntimeError('The parse worker did not start')
+        return self
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class BudgetedParser:
+    """
+    Pool of up to `workers` parse processes. parse() takes an idle one
+    (waiting if all are busy), gives the parse `timeout` seconds and the
+    worker memory_mb MB of address space beyond what it maps after start-up
+    (0 for no memory limit). With warm_up, workers run warmup.warm_up()
+    before they take a document.
+    """
+
+    def __init__(self, workers, timeout, memory_mb=0, warm_up=True):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.warm_up = warm_up
+        self._idle = []
+        self._started = 0
+        self._cond = threading.Condition()
+
+    def _checkout(self):
+        with self._cond:
+            while not self._idle and self._started >= self.workers:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return _Process(self.memory_bytes, self.warm_up).wait_ready()
+        except BaseException:
+            self._checkin(None)
+            raise
+
+    def start(self):
+        """
+        Start (and warm up) every worker of the pool now rather than on first
+        use. They start one after another, so the first is ready as soon as it
+        can be instead of all of them sharing the CPU until the last is ready.
+        """
+        with self._cond:
+            missing = self.workers - self._started
+            self._started = self.workers
+        for remaining in range(missing, 0, -1):
+            try:
+                worker = _Process(self.memory_bytes, self.warm_up).wait_ready()
+            except BaseException:
+                # Give back the places of this worker and the ones not started yet
+                for _ in range(remaining):
+                    self._checkin(None)
+                raise
+            self._checkin(worker)
+
+    def _checkin(self, worker):
+        """Return worker to the pool, or None for one that was killed."""
+        with self._cond:
+            if worker is None:
+                self._started -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def parse(self, docx_bytes, car_images=None, reader=None):
+        """parse_word_document() in a worker process; raises ParseBudgetExceeded past the budget."""
+        from generate_html import DEFAULT_READER
+        worker = self._checkout()
+        try:
+            worker.conn.send((docx_bytes, car_images, reader or DEFAULT_READER))
+            if not worker.conn.poll(self.timeout):
+                raise ParseBudgetExceeded(f'The document took longer than {self.timeout:g}s to parse', 'time')
+            status, result, stages = worker.conn.recv()
+        except BaseException as e:
+            # Timed out, died, or the request was interrupted: the worker can't be reused
+            worker.kill()
+            self._checkin(None)
+            if isinstance(e, EOFError):
+                raise ParseBudgetExceeded('The parser stopped while reading the document', 'crash') from None
+            raise
+        if status == 'memory':
+            worker.kill()
+            self._checkin(None)
+            raise ParseBudgetExceeded('The document needed too much memory to parse', 'memory')
+        self._checkin(worker)
+        metrics.add_stages(stages)
+        if status == 'error':
+            raise result
+        return result
+
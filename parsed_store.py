@@ -0,0 +1,46 @@
+import json
+
+from atomic_write import atomic_open
+from guide_model import Guide
+
+# JSON lines: a header line, then one record per guide:
+# {"docx_path": ..., "output_path": ..., "docx_hash": ..., "data": <Guide.to_dict()>}
+# In memory, a record's 'data' is the Guide itself
+PARSED_FORMAT = 'vpg-parsed'
+PARSED_VERSION = 1
+
+
+class ParsedFormatError(ValueError):
+    """The file is not a parsed-data file this version can read."""
+
+
+def write_parsed(path, records):
+    """
+    Write records to path (atomically) as versioned JSON lines. Key order is
+    kept, so rendering a loaded record gives the same HTML as rendering the
+    original.
+    """
+    with atomic_open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'format': PARSED_FORMAT, 'version': PARSED_VERSION}) + '\n')
+        for record in records:
+            record = dict(record, data=record['data'].to_dict())
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+def read_parsed(path):
+    """Yield the records of a parsed-data file; raises ParsedFormatError for other formats or versions."""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != PARSED_FORMAT:
+            raise ParsedFormatError(f'{path} is not a parsed-data file')
+        if header.get('version') != PARSED_VERSION:
+            raise ParsedFormatError(f"{path} has format version {header.get('version')}, "
+                                    f'expected {PARSED_VERSION}')
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record['data'] = Guide.from_dict(record['data'])
+                yield record
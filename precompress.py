@@ -0,0 +1,109 @@
+import gzip
+import os
+import zlib
+
+from atomic_write import write_atomic
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only gzip is offered
+    brotli = None
+
+HAVE_BROTLI = brotli is not None
+
+# Content-Encoding -> file suffix, in order of preference
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+ENCODINGS = tuple(encoding for encoding in SUFFIXES if encoding != 'br' or HAVE_BROTLI)
+
+# Pages compressed once for batch output get the slowest, smallest settings;
+# pages compressed while a client waits (then cached) a cheaper level
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+
+
+def compress(body, encoding, levels=DYNAMIC_LEVELS):
+    """Compress bytes with a Content-Encoding from ENCODINGS."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'], mode=brotli.MODE_TEXT)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output reproducible for identical pages
+        return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+    raise ValueError(f'Unsupported encoding: {encoding!r}')
+
+
+class StreamCompressor:
+    """
+    Incremental compress() for pages sent as they render: feed it chunks with
+    compress(), flush() to get everything fed so far out to the client, and
+    finish() at the end. The joined output is a complete gzip/Brotli body.
+    """
+
+    def __init__(self, encoding, levels=DYNAMIC_LEVELS):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=levels['br'], mode=brotli.MODE_TEXT)
+        elif encoding == 'gzip':
+            self._brotli = None
+            # wbits 31: gzip container (mtime 0, so identical pages compress identically)
+            self._zlib = zlib.compressobj(levels['gzip'], zlib.DEFLATED, 31)
+        else:
+            raise ValueError(f'Unsupported encoding: {encoding!r}')
+
+    def compress(self, data):
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self):
+        if self._brotli is not None:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def negotiate(accept_encodings):
+    """
+    Pick the encoding for a response from a Werkzeug Accept object (e.g.
+    request.accept_encodings): the one the client rates highest, ties going
+    to the order of ENCODINGS. None means send the body uncompressed.
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def sibling_paths(output_path):
+    """Paths of every precompressed copy output_path can have, available encodings or not."""
+    return [output_path + suffix for suffix in SUFFIXES.values()]
+
+
+def write_siblings(output_path, body):
+    """
+    Write output_path.gz (and output_path.br with Brotli) next to a page,
+    for web servers that serve precompressed files. Each copy is written
+    atomically (see atomic_write).
+    """
+    for encoding, suffix in SUFFIXES.items():
+        if encoding not in ENCODINGS:
+            # e.g. a .br from a build that had Brotli
+            try:
+                os.remove(output_path + suffix)
+            except OSError:
+                pass
+            continue
+        write_atomic(output_path + suffix, compress(body, encoding, STATIC_LEVELS))
+
+
+def remove_siblings(output_path):
+    """Delete precompressed copies left by an earlier build, so they can't go stale."""
+    for path in sibling_paths(output_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from atomic_write import write_atomic
+
+
+def make_cache_key(docx_bytes, car_images, template_version, images=None):
+    """
+    Content-addressed key for a rendered guide: hash of the .docx bytes,
+    the view -> image URL map, the template version and, if any, what the
+    optimized image variants depend on (a JSON-able description of the
+    uploaded images, so the key is known before they are optimized).
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(docx_bytes).digest())
+    h.update(json.dumps(car_images, sort_keys=True).encode('utf-8'))
+    h.update(template_version.encode('utf-8'))
+    if images:
+        h.update(json.dumps(images, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+class _InFlight:
+    """A computation other threads can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of rendered HTML with an optional on-disk tier.
+    Both tiers are bounded by entry count and total characters (bytes on
+    disk); a value larger than max_entry_chars (max_chars by default) is
+    not cached, and get_or_stream() stops collecting it once it gets there.
+    Without a disk tier the values can also be bytes (e.g. compressed pages).
+    get_or_compute() coalesces concurrent misses for the same key so only
+    one caller computes the value while the others wait for it, for at most
+    wait_timeout seconds (None waits as long as it takes); a caller that
+    waited that long computes the value itself.
+    """
+
+    def __init__(self, max_entries=64, max_chars=64 * 1024 * 1024, disk_dir=None, wait_timeout=None,
+                 max_entry_chars=None):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.max_entry_chars = min(max_entry_chars or max_chars, max_chars)
+        self.wait_timeout = wait_timeout
+        self.disk_dir = disk_dir or None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + '.html')
+
+    def _store(self, key, value):
+        # Caller must hold self._lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        if len(value) > self.max_entry_chars:
+            return
+        self._entries[key] = value
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or self._size > self.max_chars:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, key):
+        """Return the cached value for key or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    value = f.read()
+            except OSError:
+                value = None
+            if value is not None:
+                try:
+                    # The disk tier evicts by mtime, so a hit makes the entry recent
+                    os.utime(self._disk_path(key))
+                except OSError:
+                    pass
+                with self._lock:
+                    self._store(key, value)
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store value under key in memory and, if configured, on disk."""
+        with self._lock:
+            self._store(key, value)
+        if self.disk_dir and len(value) <= self.max_entry_chars:
+            # Written atomically so readers never see a partial entry
+            try:
+                write_atomic(self._disk_path(key), value)
+                self._trim_disk()
+            except OSError:
+                pass
+
+    def _trim_disk(self):
+        """Delete the least recently used disk entries past max_entries or max_chars."""
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.html'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # evicted meanwhile by another thread or process
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for count, (_, size, path) in zip(range(len(entries), 0, -1), entries):
+            if count <= self.max_entries and total <= self.max_chars:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() on a miss.
+        Concurrent callers for the same key share a single compute() call;
+        if it raises, every waiting caller gets the same exception.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._inflight[key] = call
+
+        if not leader:
+            if not call.event.wait(self.wait_timeout):
+                # A stuck or very slow compute shouldn't hold up every caller behind it
+                return compute()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            value = compute()
+            self.put(key, value)
+            call.result = value
+            return value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
+
+    def get_or_stream(self, key, stream):
+        """
+        Generator version of get_or_compute(): yields the cached value for key,
+        or the chunks of stream() (str or bytes) as they are produced, storing
+        the joined result afterwards. Concurrent callers for the same key wait for the
+        streaming caller and then get the whole value. If the streaming caller
+        stops early (e.g. the client went away) or takes longer than
+        wait_timeout, waiting callers stream on their own instead.
+        """
+        value = self.get(key)
+        if value is not None:
+            yield value
+            return
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._inflight[key] = call
+
+        if not leader:
+            if not call.event.wait(self.wait_timeout) or isinstance(call.error, GeneratorExit):
+                yield from stream()
+                return
+            if call.error is not None:
+                raise call.error
+            yield call.result
+            return
+
+        # With the cache disabled, or once the page is too large to cache,
+        # nothing is kept, so memory stays at one chunk
+        collect = self.max_entries > 0
+        chunks = []
+        collected = 0
+        try:
+            for chunk in stream():
+                if collect:
+                    chunks.append(chunk)
+                    collected += len(chunk)
+                    if collected > self.max_entry_chars:
+                        collect = False
+                        chunks = []
+                yield chunk
+            if collect:
+                value = (b'' if chunks and isinstance(chunks[0], bytes) else '').join(chunks)
+                self.put(key, value)
+                call.result = value
+            else:
+                call.error = GeneratorExit()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
+
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
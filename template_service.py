@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATE_PATH = os.path.join(BASE_DIR, 'template.html')
+
+# Optional on-disk bytecode cache so freshly forked gunicorn workers can skip
+# compiling template.html. Set VPG_BYTECODE_CACHE_DIR to enable it.
+BYTECODE_CACHE_DIR = os.environ.get('VPG_BYTECODE_CACHE_DIR', '')
+
+# Size of the chunks render_stream() hands to the HTTP response, and of the
+# write buffer used by render_to_file()
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_environments = {}
+_versions = {}
+_lock = threading.Lock()
+
+
+def _make_bytecode_cache():
+    """Return a FileSystemBytecodeCache if a cache directory is configured."""
+    if not BYTECODE_CACHE_DIR:
+        return None
+    os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(BYTECODE_CACHE_DIR, '%s.vpg.cache')
+
+
+def get_environment(template_dir=None):
+    """
+    Return the shared jinja2 Environment for a template directory.
+    Environments are created once per directory and reused. Compiled
+    templates are cached in memory and reloaded when the file's mtime changes.
+    """
+    template_dir = os.path.abspath(template_dir or BASE_DIR)
+    env = _environments.get(template_dir)
+    if env is None:
+        with _lock:
+            env = _environments.get(template_dir)
+            if env is None:
+                # autoescape stays off to match the output of the old
+                # jinja2.Template(template_str) rendering
+                env = Environment(
+                    loader=FileSystemLoader(template_dir, encoding='utf-8'),
+                    autoescape=False,
+                    auto_reload=True,
+                    bytecode_cache=_make_bytecode_cache(),
+                )
+                _environments[template_dir] = env
+    return env
+
+
+def get_template(template_path=None):
+    """Return the compiled template for template_path (default: template.html)."""
+    template_path = os.path.abspath(template_path or DEFAULT_TEMPLATE_PATH)
+    env = get_environment(os.path.dirname(template_path))
+    return env.get_template(os.path.basename(template_path))
+
+
+def render_to_string(data, template_path=None):
+    """Render the guide data with the cached template and return the HTML."""
+    return get_template(template_path).render(**data)
+
+
+def render_stream(data, template_path=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Render the guide data with Template.generate() and yield the HTML in
+    chunks of about chunk_size characters, so the page is never held whole.
+    """
+    pending = []
+    size = 0
+    for piece in get_template(template_path).generate(**data):
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending)
+
+
+def render_to_file(data, output_path, template_path=None, buffer_size=STREAM_CHUNK_SIZE):
+    """
+    Stream the rendered HTML into output_path through a buffered writer.
+    The page is written to a temporary file next to output_path and moved
+    into place at the end, so a failed render never leaves a partial page.
+    """
+    tmp_path = output_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', buffering=buffer_size) as f:
+            for piece in get_template(template_path).generate(**data):
+                f.write(piece)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def template_version(template_path=None):
+    """
+    Return a short content hash of the template file. The hash is cached
+    and only recomputed when the file's mtime or size changes.
+    """
+    template_path = os.path.abspath(template_path or DEFAULT_TEMPLATE_PATH)
+    st = os.stat(template_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _versions.get(template_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(template_path, 'rb') as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:16]
+    _versions[template_path] = (stamp, version)
+    return version
+
+
+def clear_cache():
+    """Drop all cached environments and compiled templates."""
+    with _lock:
+        _environments.clear()
+        _versions.clear()
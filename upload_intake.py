@@ -0,0 +1,178 @@
+"""
+Streaming intake for the upload form. The multipart body is parsed as it
+is read from the request, so a wrong file type or an oversized file is
+rejected as soon as its part arrives instead of after the whole body has
+been buffered, and the .docx is checked cheaply before anything parses it.
+"""
+import io
+import zipfile
+from typing import NamedTuple
+
+from lxml import etree
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Epilogue, NeedData, File, Data
+
+from docx_stream import main_document_path
+
+CHUNK_SIZE = 64 * 1024
+MAX_PARTS = 64
+# Unparsed multipart data held at once; part headers must fit in it
+MAX_PARSER_BUFFER = 1024 * 1024
+# Word documents saved encrypted or in the old .doc format are OLE files
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+class UploadError(Exception):
+    """Invalid upload form; reported to the client as a JSON error with status."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class FileField(NamedTuple):
+    """What a file field of the form accepts."""
+    extensions: frozenset
+    max_bytes: int
+    max_files: int
+    label: str              # for size errors, e.g. 'Document file'
+    invalid_message: str    # format string for a wrong extension, gets {filename}
+
+
+def _megabytes(n):
+    return f'{n / (1024 * 1024):g} MB'
+
+
+def _extension_allowed(filename, extensions):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in extensions
+
+
+def read_files(request, fields):
+    """
+    Read the multipart/form-data body of a request as it streams in and
+    return a MultiDict of field name -> FileStorage (like request.files) for
+    the file fields in `fields` ({name: FileField}). Other parts are skipped
+    without being kept. Raises UploadError as soon as a part breaks the
+    rules: 400 for a wrong extension, too many files or a malformed body,
+    413 for a file or body over its limit. A request that isn't multipart
+    has no files.
+    """
+    mimetype, options = parse_options_header(request.content_type or '')
+    boundary = options.get('boundary', '').encode('latin-1')
+    files = MultiDict()
+    if mimetype != 'multipart/form-data' or not boundary:
+        return files
+    max_content_length = request.max_content_length
+    if max_content_length is not None and (request.content_length or 0) > max_content_length:
+        raise UploadError(f'Upload is too large (max {_megabytes(max_content_length)})', 413)
+    stream = request.stream
+
+    decoder = MultipartDecoder(boundary, max_form_memory_size=MAX_PARSER_BUFFER, max_parts=MAX_PARTS)
+    counts = {}
+    field = container = None
+    size = 0
+    done = False
+    try:
+        while not done:
+            try:
+                chunk = stream.read(CHUNK_SIZE)
+            except RequestEntityTooLarge:
+                raise UploadError(f'Upload is too large (max {_megabytes(max_content_length)})', 413)
+            except ClientDisconnected:
+                chunk = b''
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, NeedData):
+                if isinstance(event, Epilogue):
+                    done = True
+                    break
+                if isinstance(event, File):
+                    field = fields.get(event.name)
+                    container = None
+                    if field is not None:
+                        counts[event.name] = counts.get(event.name, 0) + 1
+                        if counts[event.name] > field.max_files:
+                            raise UploadError(f'Too many files for {event.name} (max {field.max_files})')
+                        if event.filename and not _extension_allowed(event.filename, field.extensions):
+                            raise UploadError(field.invalid_message.format(filename=event.filename))
+                        container = io.BytesIO()
+                        size = 0
+                        files.add(event.name, FileStorage(container, event.filename, event.name,
+                                                          headers=event.headers))
+                elif isinstance(event, Data):
+                    if container is not None:
+                        size += len(event.data)
+                        if size > field.max_bytes:
+                            raise UploadError(f'{field.label} is too large (max {_megabytes(field.max_bytes)})', 413)
+                        container.write(event.data)
+                        if not event.more_data:
+                            container.seek(0)
+                else:
+                    # Preamble or a plain form field: nothing to keep
+                    container = None
+                event = decoder.next_event()
+            if not chunk and not done:
+                raise UploadError('The upload ended before the form was complete')
+    except (ValueError, RequestEntityTooLarge):
+        # The decoder's own limits (part headers, number of parts) end up here too
+        raise UploadError('Malformed multipart upload')
+    return files
+
+
+def validate_docx(docx_bytes, max_uncompressed):
+    """
+    Cheap structural check of an uploaded .docx before it is parsed: a ZIP
+    archive (only its central directory is read), not encrypted, with a
+    main document part, and no more than max_uncompressed bytes when
+    extracted. zipfile never inflates an entry past the size the central
+    directory declares, so checking the declared sizes bounds the work of
+    the real parse. Raises UploadError with status 422.
+    """
+    if docx_bytes.startswith(OLE_SIGNATURE):
+        raise UploadError('The document is password-protected or in the old .doc format; '
+                          'save it as an unprotected .docx', 422)
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(docx_bytes))
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, ValueError):
+        raise UploadError('The document is not a valid .docx file (not a ZIP archive)', 422)
+    with zf:
+        infos = zf.infolist()
+        if any(info.flag_bits & 0x1 for info in infos):
+            raise UploadError('The document is encrypted', 422)
+        if sum(info.file_size for info in infos) > max_uncompressed:
+            raise UploadError(f'The document expands to more than {_megabytes(max_uncompressed)}', 422)
+        try:
+            document_path = main_document_path(zf)
+        except (zipfile.BadZipFile, etree.XMLSyntaxError, AttributeError, ValueError, OSError):
+            raise UploadError('The document is not a valid .docx file (unreadable package relationships)', 422)
+        try:
+            zf.getinfo(document_path)
+        except KeyError:
+            raise UploadError(f'The document is not a valid .docx file ({document_path} is missing)', 422)
+
+
+def validate_archive(zf, max_entries, max_uncompressed):
+    """
+    Check an uploaded bulk ZIP from its central directory alone, before any
+    entry is read: at most max_entries entries and max_uncompressed bytes
+    once extracted. Raises UploadError with status 422.
+    """
+    infos = zf.infolist()
+    if len(infos) > max_entries:
+        raise UploadError(f'The archive has more than {max_entries} entries', 422)
+    if sum(info.file_size for info in infos) > max_uncompressed:
+        raise UploadError(f'The archive expands to more than {_megabytes(max_uncompressed)}', 422)
+
+
+def read_docx_entry(zf, name, max_bytes, max_uncompressed):
+    """
+    Read a .docx out of a bulk ZIP with the checks the upload form applies
+    to its document: no larger than max_bytes (checked before it is read)
+    and passing validate_docx(). Raises UploadError.
+    """
+    if zf.getinfo(name).file_size > max_bytes:
+        raise UploadError(f'Document file is too large (max {_megabytes(max_bytes)})', 413)
+    docx_bytes = zf.read(name)
+    validate_docx(docx_bytes, max_uncompressed)
+    return docx_bytes
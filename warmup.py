@@ -0,0 +1,112 @@
+"""
+Warm-up for web workers: does the one-off work of a first conversion
+(template compilation, the first parse and render, Pillow's plugin
+registry) ahead of the first request. Run in the gunicorn master with
+preload_app, the results are shared copy-on-write by every worker it
+forks, including the ones that replace recycled workers.
+"""
+import io
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from generate_html import parse_word_document, match_car_images, DEFAULT_READER
+from template_service import get_template, render_to_string, template_version
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_SAMPLE_URL = 'https://newparts.com/warm-up-part?utm_source=guide'
+
+# A tiny guide that goes through every part of the parser: specs, a
+# category header, fault codes, symptoms, a hyperlinked part and brands
+SAMPLE_PARAGRAPHS = (
+    'Vehicle Platform Guide: Sample Car 2.0L (2010–2017)',
+    'A short sample guide used to warm up the parser and the template.',
+    'Specifications',
+    'Engine: 2.0L I4',
+    'Horsepower: 150 hp',
+    'Top Common Issues with Sample Car',
+    'Ignition System',
+    '1. Ignition Coil Failure',
+    'Fault Codes: P0300, P0301',
+    'Why it happens: coils crack with heat and age.',
+    'Symptoms:',
+    '1. Rough idle',
+    'Parts to Replace:',
+    None,  # hyperlinked part line
+    'Brands: Bosch, Denso',
+)
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{_R_NS}/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_RELS_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+)
+
+
+def _paragraph_xml(text):
+    if text is None:
+        return ('<w:p><w:hyperlink r:id="rId1"><w:r><w:t>Ignition Coil</w:t></w:r></w:hyperlink>'
+                '<w:r><w:t xml:space="preserve"> for the misfiring cylinder</w:t></w:r></w:p>')
+    return f'<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>'
+
+
+def minimal_docx(body_xml, hyperlink_urls=()):
+    """
+    A minimal .docx package around body_xml (the w:body content, with the
+    w: and r: prefixes bound); hyperlink_urls become the external
+    relationships rId1, rId2, ...
+    """
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}" xmlns:r="{_R_NS}"><w:body>{body_xml}</w:body></w:document>'
+    )
+    document_rels = _RELS_HEADER + ''.join(
+        f'<Relationship Id="rId{i}" Type="{_R_NS}/hyperlink" Target="{escape(url)}" TargetMode="External"/>'
+        for i, url in enumerate(hyperlink_urls, 1)) + '</Relationships>'
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _PACKAGE_RELS)
+        zf.writestr('word/document.xml', document)
+        zf.writestr('word/_rels/document.xml.rels', document_rels)
+    return buf.getvalue()
+
+
+def sample_docx():
+    """The embedded sample guide as .docx bytes (a minimal package built in memory)."""
+    return minimal_docx(''.join(_paragraph_xml(text) for text in SAMPLE_PARAGRAPHS), [_SAMPLE_URL])
+
+
+def warm_up(template_path=None, reader=DEFAULT_READER):
+    """
+    Compile the template and convert the sample guide once. Starts no
+    threads or processes, so it is safe to run before forking. Returns
+    the seconds it took.
+    """
+    start = time.perf_counter()
+    get_template(template_path)
+    template_version(template_path)
+    car_images = match_car_images(['SampleCarFront.jpg', 'SampleCarSide.jpg'])
+    data = parse_word_document(sample_docx(), car_images=car_images, reader=reader)
+    render_to_string(data, template_path)
+
+    from images import HAVE_PILLOW
+    if HAVE_PILLOW:
+        from PIL import Image
+        Image.init()
+    return time.perf_counter() - start
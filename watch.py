@@ -0,0 +1,320 @@
+import ctypes
+import ctypes.util
+import glob
+import os
+import select
+import struct
+import time
+
+from generate_html import parse_word_document, find_car_images, find_car_images_folder
+from template_service import get_template
+from batch import output_path_for, output_version, write_output
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# inotify(7) event masks
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+def is_guide(path):
+    # Word keeps '~$name.docx' lock files next to open documents
+    name = os.path.basename(path)
+    return name.lower().endswith('.docx') and not name.startswith('~$')
+
+
+def list_guides():
+    return sorted(path for path in glob.glob('*.docx') if is_guide(path))
+
+
+class InotifyWatcher:
+    """Directory watcher on Linux inotify, called through ctypes."""
+
+    def __init__(self, is_relevant):
+        self.is_relevant = is_relevant
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}  # watch descriptor -> directory
+
+    def watch(self, directories):
+        """Make sure every directory is watched (already watched ones are skipped)."""
+        watched = set(self._dirs.values())
+        for directory in directories:
+            directory = os.path.abspath(directory)
+            if directory in watched or not os.path.isdir(directory):
+                continue
+            wd = self._add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+            self._dirs[wd] = directory
+
+    def wait(self, timeout=None):
+        """Block up to timeout seconds; True if a relevant file changed."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        relevant = False
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return True
+            directory = self._dirs.get(wd)
+            if directory is not None and (mask & IN_ISDIR or self.is_relevant(os.path.join(directory, os.fsdecode(name)))):
+                relevant = True
+        return relevant
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback watcher: compares the size and mtime of the relevant files every interval seconds."""
+
+    def __init__(self, is_relevant, interval=1.0):
+        self.is_relevant = is_relevant
+        self.interval = interval
+        self._dirs = []
+        self._snapshot = {}
+
+    def watch(self, directories):
+        directories = [os.path.abspath(d) for d in directories]
+        if directories != self._dirs:
+            self._dirs = directories
+            self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for directory in self._dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file() and self.is_relevant(entry.path):
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+                elif entry.is_dir():
+                    snapshot[entry.path] = None
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            snapshot = self._take_snapshot()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        pass
+
+
+class GuideWatch:
+    """
+    Keeps the parsed data of every guide in the current folder and rebuilds
+    only what a change affects: an edited .docx is parsed and rendered
+    again, a template change re-renders every guide from the parsed data,
+    and a change to the car images re-renders the guides whose images changed.
+    Pages are written as a batch run with the same minify, precompress and
+    assets options writes them.
+    """
+
+    def __init__(self, template_path, reader, catalog=None, manifest=None, minify=False, precompress=False,
+                 assets=None):
+        self.template_path = template_path
+        self.reader = reader
+        self.catalog = catalog
+        self.manifest = manifest
+        self.minify = minify
+        self.precompress = precompress
+        self.assets = assets
+        # docx_path -> {'stat': (size, mtime_ns), 'data': parsed data or None, 'car_images': ...}
+        self.guides = {}
+        self.template_hash = None
+
+    def image_dirs(self):
+        """Directories whose contents decide the car images."""
+        if self.catalog is not None:
+            return [os.path.join(self.catalog.root, rel) for rel in self.catalog.directories()]
+        folder = find_car_images_folder()
+        return [folder] if folder else []
+
+    def is_relevant(self, path):
+        if is_guide(path):
+            return True
+        if os.path.abspath(path) == os.path.abspath(self.template_path):
+            return True
+        return path.lower().endswith(IMAGE_EXTENSIONS)
+
+    def _images_for(self, docx_path, default_images):
+        if self.catalog is not None:
+            return self.catalog.lookup_document(docx_path, default_images)
+        return default_images
+
+    def rebuild(self):
+        """Bring every output up to date; returns a list of (docx_path, reason, error) tuples."""
+        # The template is compiled once and only recompiled when it changes
+        get_template(self.template_path)
+        # Same version as a batch run with the same output options, so the two share the manifest
+        template_hash = output_version(self.template_path, self.minify, self.precompress, self.assets)
+        template_changed = template_hash != self.template_hash
+        self.template_hash = template_hash
+
+        if self.catalog is not None:
+            self.catalog.refresh()
+        default_images = find_car_images()
+
+        built = []
+        docx_files = list_guides()
+        for docx_path in set(self.guides) - set(docx_files):
+            del self.guides[docx_path]
+
+        for docx_path in docx_files:
+            car_images = self._images_for(docx_path, default_images)
+            output_path = output_path_for(docx_path)
+            try:
+                st = os.stat(docx_path)
+            except OSError:
+                continue
+            stat = (st.st_size, st.st_mtime_ns)
+            cached = self.guides.get(docx_path)
+
+            data = None
+            if cached is None or cached['stat'] != stat:
+                if cached is None and self.manifest is not None and self.manifest.is_fresh(
+                        docx_path, output_path, template_hash, car_images):
+                    # Built by an earlier run; it is parsed once something affects it
+                    self.guides[docx_path] = {'stat': stat, 'data': None, 'car_images': car_images}
+                    continue
+                reason = 'new' if cached is None else 'document changed'
+            elif template_changed:
+                reason, data = 'template changed', cached['data']
+            elif cached['car_images'] != car_images:
+                reason, data = 'images changed', cached['data']
+            else:
+                continue
+
+            # Failed guides are remembered too, so they are retried only when they change
+            self.guides[docx_path] = entry = {'stat': stat, 'data': None, 'car_images': car_images}
+            try:
+                if data is None:
+                    data = parse_word_document(docx_path, car_images=car_images, reader=self.reader)
+                else:
+                    data.car_images = dict(car_images)
+                entry['data'] = data
+                write_output(data, output_path, self.template_path, self.minify, self.precompress, self.assets)
+                if self.manifest is not None:
+                    self.manifest.record(docx_path, output_path, template_hash, car_images)
+                built.append((docx_path, reason, None))
+            except Exception as e:
+                if self.manifest is not None:
+                    self.manifest.forget(docx_path)
+                built.append((docx_path, reason, str(e)))
+
+        if self.manifest is not None and built:
+            self.manifest.save()
+        return built
+
+
+def make_watcher(is_relevant, poll=False, interval=1.0):
+    """inotify where available, polling otherwise (or when poll is set)."""
+    if not poll:
+        try:
+            return InotifyWatcher(is_relevant)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(is_relevant, interval)
+
+
+def watch_directories(watcher, directories):
+    """Watch directories; returns the watcher to use from now on (polling if inotify runs out of watches)."""
+    try:
+        watcher.watch(directories)
+        return watcher
+    except OSError as e:
+        print(f"inotify unavailable ({e}); polling instead")
+        watcher.close()
+        polling = PollingWatcher(watcher.is_relevant)
+        polling.watch(directories)
+        return polling
+
+
+def run_watch(template_path, reader, catalog=None, manifest=None, debounce=0.3, poll=False, minify=False,
+              precompress=False, assets=None, prune=False):
+    """
+    Build once, then rebuild affected guides after every burst of changes
+    until interrupted. With prune (and a manifest), the outputs of deleted
+    documents are deleted too.
+    """
+    guides = GuideWatch(template_path, reader, catalog, manifest, minify, precompress, assets)
+    watcher = make_watcher(guides.is_relevant, poll=poll)
+
+    def report(built):
+        for docx_path, reason, error in built:
+            if error is None:
+                print(f"Rebuilt {output_path_for(docx_path)} ({reason})")
+            else:
+                print(f"Error processing {docx_path}: {error}")
+
+    def prune_orphans():
+        if not prune or manifest is None:
+            return
+        deleted, kept = manifest.prune(list_guides())
+        for path in deleted:
+            print(f"Deleted orphaned output: {path}")
+        for path in kept:
+            print(f"Kept orphaned output (edited since it was built): {path}")
+        if deleted or kept:
+            manifest.save()
+
+    def directories():
+        dirs = ['.', os.path.dirname(os.path.abspath(template_path))] + guides.image_dirs()
+        return list(dict.fromkeys(os.path.abspath(d) for d in dirs))
+
+    watcher = watch_directories(watcher, directories())
+    prune_orphans()
+    report(guides.rebuild())
+    print(f"Watching {len(guides.guides)} guides for changes "
+          f"({'polling' if isinstance(watcher, PollingWatcher) else 'inotify'}); press Ctrl+C to stop.")
+    try:
+        while True:
+            if not watcher.wait():
+                continue
+            # Debounce: wait until saves have been quiet for `debounce` seconds
+            while watcher.wait(debounce):
+                pass
+            watcher = watch_directories(watcher, directories())
+            start = time.perf_counter()
+            prune_orphans()
+            built = guides.rebuild()
+            report(built)
+            if built:
+                print(f"Rebuilt {len(built)} of {len(guides.guides)} guides in {time.perf_counter() - start:.2f}s")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()